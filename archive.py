@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from archive_search import ArchiveSearchIndex
+from lazysession import LazySession
+from metrics import metrics
+from paths import user_cache_dir
+
+DOWNLOAD_LINKS_URL: str = "https://raw.githubusercontent.com/TheCodingJsoftware/HBNI-Audio-Stream-Recorder/master/downloadLinks.json"
+
+
+class ArchiveIndex:
+    '''
+    The archive's downloadLinks.json, loaded once and kept in memory.
+
+    A copy is persisted in the per-user cache directory together with its
+    ETag so the index is available immediately on start up, and refresh()
+    only downloads the file again when GitHub says it changed. The search
+    index over the names is updated with just the recordings that changed.
+    '''
+
+    def __init__(self, url: str = DOWNLOAD_LINKS_URL,
+                 cache_dir: Optional[str] = None, timeout: float = 10) -> None:
+        self.url: str = url
+        self.timeout: float = timeout
+        cache_dir = cache_dir or user_cache_dir()
+        self.path: str = os.path.join(cache_dir, 'downloadLinks.json')
+        self.etag_path: str = f'{self.path}.etag'
+        self.entries: 'Dict[str, dict]' = {}
+        self.search_index: ArchiveSearchIndex = ArchiveSearchIndex()
+        self.etag: Optional[str] = None
+        self.last_refresh: Optional[float] = None
+        self.session: LazySession = LazySession()
+        self.lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, file_name: str) -> bool:
+        return file_name in self.entries
+
+    def load(self) -> bool:
+        '''
+        load reads the cached copy of the index from disk. Safe to call from
+        a worker thread.
+
+        Returns:
+            bool: True if a cached copy was found and loaded.
+        '''
+        with self.lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries: 'Dict[str, dict]' = json.load(f)
+            except (OSError, ValueError):
+                return False
+            try:
+                with open(self.etag_path, 'r', encoding='utf-8') as f:
+                    self.etag = f.read().strip() or None
+            except OSError:
+                self.etag = None
+            self.entries = entries
+            with metrics.timer('archive_index_build_seconds'):
+                self.search_index.update(entries)
+            return True
+
+    def refresh(self) -> bool:
+        '''
+        refresh revalidates the index against GitHub and downloads it if it
+        changed. Safe to call from a worker thread.
+
+        Returns:
+            bool: True if the index changed.
+        '''
+        with self.lock:
+            headers: 'dict[str, str]' = {}
+            if self.etag is not None and self.entries:
+                headers['If-None-Match'] = self.etag
+            with metrics.timer('archive_index_fetch_seconds'):
+                response = self.session.get(self.url, headers=headers,
+                                            timeout=self.timeout)
+            self.last_refresh = time.monotonic()
+            if response.status_code == 304:
+                return False
+            response.raise_for_status()
+            entries: 'Dict[str, dict]' = dict(response.json())
+            self.etag = response.headers.get('ETag')
+            self.save(response.content)
+            if entries == self.entries:
+                return False
+            self.entries = entries
+            with metrics.timer('archive_index_build_seconds'):
+                self.search_index.update(entries)
+            return True
+
+    def save(self, content: bytes) -> None:
+        temporary_path: str = f'{self.path}.tmp'
+        with open(temporary_path, 'wb') as f:
+            f.write(content)
+        os.replace(temporary_path, self.path)
+        with open(self.etag_path, 'w', encoding='utf-8') as f:
+            f.write(self.etag or '')
+
+    def is_stale(self, max_age: float) -> bool:
+        return self.last_refresh is None or time.monotonic() - self.last_refresh > max_age
+
+    def names(self) -> 'List[str]':
+        return list(self.entries)
+
+    def download_link(self, file_name: str) -> Optional[str]:
+        try:
+            return self.entries[file_name]["downloadLink"]
+        except KeyError:
+            return None
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,224 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+ARCHIVE_NAME_REGEX = re.compile(r'^(?P<prefix>.*?)_?(?P<date>\d{4}-\d{2}-\d{2})(?:_(?P<hour>\d{1,2})_(?P<minute>\d{2}))?')
+SEPARATORS_REGEX = re.compile(r'[_:\s]+')
+
+SORT_NEWEST: str = 'newest'
+SORT_OLDEST: str = 'oldest'
+SORT_NAME: str = 'name'
+
+
+def normalize(text: str) -> str:
+    '''
+    Lowercases text and folds the separators archive names use ("_" on disk,
+    ":" on screen) into single spaces, so queries match either form.
+    '''
+    return SEPARATORS_REGEX.sub(' ', text.lower()).strip()
+
+
+class ArchiveEntry:
+    '''
+    The fields encoded in an archive file name such as
+    Location_Speaker_2022-02-20_14_50.mp3.
+    '''
+    __slots__ = ('file_name', 'location', 'speaker', 'recorded', 'text')
+
+    def __init__(self, file_name: str) -> None:
+        self.file_name: str = file_name
+        self.location: str = ''
+        self.speaker: str = ''
+        self.recorded: Optional[datetime] = None
+        stem: str = file_name[:-4] if file_name.lower().endswith('.mp3') else file_name
+        match = ARCHIVE_NAME_REGEX.match(stem)
+        if match is not None:
+            location, _, speaker = match['prefix'].rpartition('_')
+            self.location = location.replace('_', ' ')
+            self.speaker = speaker.replace('_', ' ')
+            try:
+                self.recorded = datetime.strptime(
+                    f"{match['date']} {match['hour'] or 0}:{match['minute'] or 0}",
+                    '%Y-%m-%d %H:%M')
+            except ValueError:
+                self.recorded = None
+        self.text: str = normalize(stem)
+
+
+class ArchiveSearchIndex:
+    '''
+    A trigram index over archive names for substring search as you type.
+
+    Queries are split into words which must all appear in a name. Words of
+    three or more characters are answered by intersecting trigram postings
+    and verifying the few candidates left; shorter words fall back to a scan
+    of the pre-normalized names. Results are ordered by ranks precomputed per
+    sort order rather than sorted by date on every keystroke. update() only
+    indexes the names that were added or removed since the last call, and
+    keeps the names sorted by date as it goes, so a date range is two
+    bisections.
+    '''
+
+    def __init__(self) -> None:
+        self.entries: 'Dict[str, ArchiveEntry]' = {}
+        self.trigrams: 'Dict[str, Set[str]]' = {}
+        self.orders: 'Dict[str, List[str]]' = {}
+        self.ranks: 'Dict[str, Dict[str, int]]' = {}
+        self.texts: 'Dict[str, str]' = {}
+        self.by_date: 'List[tuple[datetime, str]]' = []
+        self.dates: 'List[datetime]' = []
+        self.last_text: str = ''
+        self.last_words: 'Set[str]' = set()
+        self.last_matches: 'Set[str]' = set()
+        self.lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def trigrams_of(text: str) -> 'Set[str]':
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def update(self, file_names: 'Iterable[str]') -> bool:
+        '''
+        update brings the index in line with the current archive names.
+
+        Args:
+            file_names (Iterable[str]): every file name in the archive
+
+        Returns:
+            bool: True if any name was added or removed.
+        '''
+        file_names = set(file_names)
+        with self.lock:
+            removed: 'Set[str]' = self.entries.keys() - file_names
+            added: 'Set[str]' = file_names - self.entries.keys()
+            bulk: bool = len(removed) + len(added) > len(self.entries) // 8
+            for file_name in removed:
+                entry: ArchiveEntry = self.entries.pop(file_name)
+                del self.texts[file_name]
+                if not bulk:
+                    position: int = bisect_left(self.by_date, (entry.recorded or datetime.min, file_name))
+                    del self.by_date[position]
+                    del self.dates[position]
+                for trigram in self.trigrams_of(entry.text):
+                    postings: 'Set[str]' = self.trigrams[trigram]
+                    postings.discard(file_name)
+                    if not postings:
+                        del self.trigrams[trigram]
+            for file_name in added:
+                entry = ArchiveEntry(file_name)
+                self.entries[file_name] = entry
+                self.texts[file_name] = entry.text
+                for trigram in self.trigrams_of(entry.text):
+                    self.trigrams.setdefault(trigram, set()).add(file_name)
+                if not bulk:
+                    key: 'tuple[datetime, str]' = (entry.recorded or datetime.min, file_name)
+                    position = bisect_left(self.by_date, key)
+                    self.by_date.insert(position, key)
+                    self.dates.insert(position, key[0])
+            if bulk:
+                self.by_date = sorted((entry.recorded or datetime.min, file_name) for file_name, entry in self.entries.items())
+                self.dates = [recorded for recorded, _ in self.by_date]
+            if removed or added:
+                self.orders = {}
+                self.ranks = {}
+                self.last_text = ''
+                self.last_words = set()
+                self.last_matches = set()
+            return bool(removed or added)
+
+    def ordered(self, sort: str) -> 'List[str]':
+        order: Optional['List[str]'] = self.orders.get(sort)
+        if order is None:
+            if sort == SORT_NAME:
+                order = sorted(self.entries, key=str.lower)
+            else:
+                order = [file_name for _, file_name in self.by_date]
+                if sort == SORT_NEWEST:
+                    order.reverse()
+            self.orders[sort] = order
+            self.ranks[sort] = {file_name: rank for rank, file_name in enumerate(order)}
+        return order
+
+    def matches(self, word: str) -> 'Set[str]':
+        texts: 'Dict[str, str]' = self.texts
+        if len(word) < 3:
+            return {file_name for file_name, text in texts.items() if word in text}
+        postings: 'List[Set[str]]' = []
+        for trigram in self.trigrams_of(word):
+            posting: Optional['Set[str]'] = self.trigrams.get(trigram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates: 'Set[str]' = postings[0].intersection(*postings[1:])
+        if len(word) == 3:
+            return candidates
+        return {file_name for file_name in candidates if word in texts[file_name]}
+
+    def narrow(self, matches: 'Set[str]', word: str) -> 'Set[str]':
+        texts: 'Dict[str, str]' = self.texts
+        if len(word) >= 3 and len(matches) > len(texts) // 4:
+            return matches & self.matches(word)
+        return {file_name for file_name in matches if word in texts[file_name]}
+
+    def in_date_range(self, date_from: Optional[date], date_to: Optional[date]) -> 'List[str]':
+        '''
+        in_date_range returns the names recorded from date_from to date_to,
+        oldest first. Names without a date are never in a range.
+        '''
+        start: datetime = datetime.combine(date_from, datetime.min.time()) if date_from else datetime.min + timedelta(microseconds=1)
+        end: datetime = datetime.combine(date_to or date.max, datetime.max.time())
+        return [file_name for _, file_name in self.by_date[bisect_left(self.dates, start):bisect_right(self.dates, end)]]
+
+    def search(self, query: str = '', date_from: Optional[date] = None,
+               date_to: Optional[date] = None, sort: str = SORT_NEWEST) -> 'List[str]':
+        '''
+        search finds the archive names matching a query.
+
+        Args:
+            query (str): words that must all appear in the name
+            date_from (date): earliest recording date to include
+            date_to (date): latest recording date to include
+            sort (str): SORT_NEWEST, SORT_OLDEST or SORT_NAME
+
+        Returns:
+            list[str]: the matching file names in the requested order.
+        '''
+        text: str = normalize(query)
+        words: 'List[str]' = sorted(set(text.split()), key=len, reverse=True)
+        with self.lock:
+            order: 'List[str]' = self.ordered(sort)
+            if not words and date_from is None and date_to is None:
+                return list(order)
+            matches: Optional['Set[str]'] = None
+            if words:
+                if self.last_text and text.startswith(self.last_text):
+                    # Typing more of the last query can only narrow its matches.
+                    matches = self.last_matches
+                    for word in words:
+                        if word not in self.last_words:
+                            matches = self.narrow(matches, word)
+                else:
+                    for word in words:
+                        matches = self.matches(word) if matches is None else self.narrow(matches, word)
+                        if not matches:
+                            break
+                self.last_text, self.last_words, self.last_matches = text, set(words), matches
+            if date_from is not None or date_to is not None:
+                in_range: 'List[str]' = self.in_date_range(date_from, date_to)
+                if matches is None and sort != SORT_NAME:
+                    return in_range[::-1] if sort == SORT_NEWEST else in_range
+                if matches is None:
+                    matches = set(in_range)
+                elif len(in_range) < len(matches):
+                    matches = matches.intersection(in_range)
+                else:
+                    in_range_set: 'Set[str]' = set(in_range)
+                    matches = {file_name for file_name in matches if file_name in in_range_set}
+            if len(matches) * 16 < len(order):
+                return sorted(matches, key=self.ranks[sort].__getitem__)
+            return [file_name for file_name in order if file_name in matches]
@@ -0,0 +1,196 @@
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QPoint, QSize, Qt
+from PyQt5.QtGui import QFontMetrics, QIcon, QPalette
+from PyQt5.QtWidgets import (QAbstractItemView, QListView, QPushButton,
+                             QStyle, QStyledItemDelegate, QStyleOptionButton)
+
+from archive import ArchiveIndex
+from archive_search import ArchiveEntry
+from downloads import DONE, DOWNLOADING, FAILED, QUEUED, DownloadManager
+from metadata import MetadataFetcher
+
+FileNameRole: int = Qt.UserRole + 1
+DownloadLinkRole: int = Qt.UserRole + 2
+DownloadRole: int = Qt.UserRole + 3
+DetailsRole: int = Qt.UserRole + 4
+
+
+class ArchiveListModel(QAbstractListModel):
+    '''
+    One row per archive search result. Rows are just file names; everything
+    else is looked up in the ArchiveIndex, DownloadManager and
+    MetadataFetcher when a row is painted.
+    '''
+
+    def __init__(self, archiveIndex: ArchiveIndex, downloadManager: Optional[DownloadManager] = None,
+                 metadataFetcher: Optional[MetadataFetcher] = None, parent=None):
+        super(ArchiveListModel, self).__init__(parent)
+        self.archiveIndex: ArchiveIndex = archiveIndex
+        self.downloadManager: Optional[DownloadManager] = downloadManager
+        self.metadataFetcher: Optional[MetadataFetcher] = metadataFetcher
+        self.fileNames: 'List[str]' = []
+        self.rows: 'Dict[str, int]' = {}
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.fileNames)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        fileName: str = self.fileNames[index.row()]
+        if role == Qt.DisplayRole:
+            entry: Optional[ArchiveEntry] = self.archiveIndex.search_index.entries.get(fileName)
+            if entry is not None and entry.location and entry.speaker:
+                return f'{entry.location} - {entry.speaker}'
+            return fileName.replace('_', ':').replace('.mp3', '')
+        if role == FileNameRole:
+            return fileName
+        if role in (DownloadLinkRole, Qt.ToolTipRole):
+            return self.archiveIndex.download_link(fileName)
+        if role == DownloadRole and self.downloadManager is not None:
+            return self.downloadManager.get(fileName)
+        if role == DetailsRole:
+            return self.details(fileName)
+        return None
+
+    def details(self, fileName: str) -> str:
+        '''
+        details is the recording's date, and its length, bitrate and size
+        once the MetadataFetcher has them.
+        '''
+        details: 'List[str]' = []
+        entry: Optional[ArchiveEntry] = self.archiveIndex.search_index.entries.get(fileName)
+        if entry is not None and entry.recorded is not None:
+            details.append(entry.recorded.strftime('%a %d %b %Y, %H:%M'))
+        metadata = self.metadataFetcher.get(fileName) if self.metadataFetcher is not None else None
+        if metadata is not None and metadata.text:
+            details.append(metadata.text)
+        return ' - '.join(details)
+
+    def setFileNames(self, fileNames: 'List[str]') -> None:
+        if fileNames == self.fileNames:
+            return
+        self.beginResetModel()
+        self.fileNames = fileNames
+        self.rows = {fileName: row for row, fileName in enumerate(fileNames)}
+        self.endResetModel()
+
+    def downloadsChanged(self) -> None:
+        if self.fileNames:
+            self.dataChanged.emit(self.index(0), self.index(len(self.fileNames) - 1), [DownloadRole])
+
+    def metadataChanged(self, fileNames: 'List[str]') -> None:
+        for fileName in fileNames:
+            row: Optional[int] = self.rows.get(fileName)
+            if row is not None:
+                self.dataChanged.emit(self.index(row), self.index(row), [DetailsRole])
+
+
+class ArchiveItemDelegate(QStyledItemDelegate):
+    '''
+    Paints each row as the download button the archive used to be made of,
+    borrowing the look of a hidden template QPushButton so the theme's
+    stylesheet still applies. The recording's details are written small on
+    the right; rows being downloaded get a progress bar along the bottom of
+    the button and their status there instead.
+    '''
+
+    def __init__(self, view: QListView):
+        super(ArchiveItemDelegate, self).__init__(view)
+        self.template: QPushButton = QPushButton(view)
+        self.template.setStyleSheet('font-size: 18px')
+        self.template.setVisible(False)
+        self.icon: QIcon = QIcon()
+        self.rowHeight: int = 50
+
+    def setIcon(self, icon: QIcon) -> None:
+        self.icon = icon
+
+    def sizeHint(self, option, index: QModelIndex) -> QSize:
+        return QSize(option.rect.width(), self.rowHeight)
+
+    def paint(self, painter, option, index: QModelIndex) -> None:
+        self.template.ensurePolished()
+        button: QStyleOptionButton = QStyleOptionButton()
+        button.initFrom(self.template)
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = index.data(Qt.DisplayRole)
+        button.icon = self.icon
+        button.iconSize = self.template.iconSize()
+        button.fontMetrics = QFontMetrics(self.template.font())
+        button.state = QStyle.State_Enabled | QStyle.State_Raised
+        if option.state & QStyle.State_MouseOver:
+            button.state |= QStyle.State_MouseOver
+        painter.save()
+        painter.setFont(self.template.font())
+        self.template.style().drawControl(QStyle.CE_PushButton, button, painter, self.template)
+        download = index.data(DownloadRole)
+        if download is not None:
+            self.paintDownload(painter, button.rect.adjusted(6, 0, -6, -4), download)
+        else:
+            self.paintDetails(painter, button.rect.adjusted(6, 0, -6, -4), index.data(DetailsRole))
+        painter.restore()
+
+    def paintDetails(self, painter, rect, details: Optional[str]) -> None:
+        if not details:
+            return
+        font = painter.font()
+        font.setPixelSize(12)
+        painter.setFont(font)
+        painter.setPen(self.template.palette().color(QPalette.ButtonText))
+        painter.drawText(rect, Qt.AlignRight | Qt.AlignBottom, details)
+
+    def paintDownload(self, painter, rect, download) -> None:
+        palette: QPalette = self.template.palette()
+        if download.status == DOWNLOADING:
+            status: str = f'{download.progress:.0%}'
+        elif download.status == QUEUED:
+            status = 'Queued'
+        elif download.status == DONE:
+            status = 'Downloaded'
+        elif download.status == FAILED:
+            status = 'Failed'
+        else:
+            status = 'Cancelled'
+        if download.status in (DOWNLOADING, DONE):
+            bar = rect.adjusted(0, rect.height() - 3, 0, 0)
+            bar.setWidth(int(bar.width() * download.progress))
+            painter.fillRect(bar, palette.color(QPalette.Highlight))
+        font = painter.font()
+        font.setPixelSize(12)
+        painter.setFont(font)
+        painter.setPen(palette.color(QPalette.ButtonText))
+        painter.drawText(rect, Qt.AlignRight | Qt.AlignVCenter, status)
+
+
+class ArchiveListView(QListView):
+    def __init__(self, parent=None):
+        super(ArchiveListView, self).__init__(parent)
+        self.setUniformItemSizes(True)
+        self.setMouseTracking(True)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.viewport().setCursor(Qt.PointingHandCursor)
+        self.archiveDelegate: ArchiveItemDelegate = ArchiveItemDelegate(self)
+        self.setItemDelegate(self.archiveDelegate)
+
+    def setIcon(self, icon: Optional[QIcon]) -> None:
+        self.archiveDelegate.setIcon(icon or QIcon())
+        self.viewport().update()
+
+    def visibleRows(self, margin: int = 0) -> 'List[int]':
+        '''
+        visibleRows returns the rows on screen, top to bottom, then up to
+        margin rows below them and margin rows above them.
+        '''
+        count: int = self.model().rowCount() if self.model() is not None else 0
+        if not count:
+            return []
+        first: int = max(self.indexAt(QPoint(0, 0)).row(), 0)
+        last: int = self.indexAt(QPoint(0, self.viewport().height() - 1)).row()
+        last = count - 1 if last < 0 else last
+        return (list(range(first, last + 1))
+                + list(range(last + 1, min(last + margin, count - 1) + 1))
+                + list(range(first - 1, max(first - margin, 0) - 1, -1)))
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from metrics import metrics
+from paths import user_cache_dir
+
+DEFAULT_BUDGET_BYTES: int = 1024 * 1024 * 1024
+INDEX_FILE_NAME: str = 'index.json'
+SAVE_INTERVAL: float = 2
+
+
+def cache_key(url: str, size: int, validator: Optional[str]) -> str:
+    '''
+    cache_key names a version of a recording: its download link, size and
+    ETag (or Last-Modified), so a file replaced on the server is never
+    served from the copy of the old one.
+    '''
+    return hashlib.sha1(f'{url}\n{size}\n{validator or ""}'.encode('utf-8')).hexdigest()
+
+
+def add_range(ranges: 'List[List[int]]', start: int, end: int) -> 'List[List[int]]':
+    '''
+    add_range merges the bytes start to end (exclusive) into sorted,
+    non-overlapping ranges.
+    '''
+    merged: 'List[List[int]]' = []
+    for range_start, range_end in ranges:
+        if range_end < start or range_start > end:
+            merged.append([range_start, range_end])
+        else:
+            start, end = min(start, range_start), max(end, range_end)
+    merged.append([start, end])
+    merged.sort()
+    return merged
+
+
+class CacheEntry:
+    '''
+    One recording in the cache: a sparse file of its full size, and the byte
+    ranges of it that have been written so far.
+    '''
+    __slots__ = ('key', 'url', 'size', 'validator', 'ranges', 'used')
+
+    def __init__(self, key: str, url: str, size: int, validator: Optional[str],
+                 ranges: Optional['List[List[int]]'] = None, used: float = 0) -> None:
+        self.key: str = key
+        self.url: str = url
+        self.size: int = size
+        self.validator: Optional[str] = validator
+        self.ranges: 'List[List[int]]' = ranges or []
+        self.used: float = used
+
+    @property
+    def cached_bytes(self) -> int:
+        return sum(end - start for start, end in self.ranges)
+
+    @property
+    def complete(self) -> bool:
+        return self.ranges == [[0, self.size]]
+
+    def available(self, position: int) -> int:
+        '''
+        available is how many bytes from position on are cached without a
+        gap.
+        '''
+        for start, end in self.ranges:
+            if start <= position < end:
+                return end - position
+        return 0
+
+    def next_cached(self, position: int) -> int:
+        '''
+        next_cached is where the next cached range after position starts,
+        or the size if there is none.
+        '''
+        for start, _ in self.ranges:
+            if start > position:
+                return start
+        return self.size
+
+    def to_dict(self) -> 'dict[str, object]':
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class AudioCache:
+    '''
+    Archive recordings played in the app, kept on disk so replaying them
+    doesn't download them again. Files are named after cache_key and filled
+    in as playback fetches them, so a recording played halfway and seeked
+    around is partly cached and the rest is fetched when needed.
+
+    A range is only added to the index once its bytes are written, and the
+    index is replaced atomically, so a crash can lose cached audio but never
+    serve bytes that aren't there. When the cache grows past budget bytes
+    the recordings played longest ago are deleted.
+    '''
+
+    def __init__(self, directory: Optional[str] = None, budget: int = DEFAULT_BUDGET_BYTES) -> None:
+        self.directory: str = directory or os.path.join(user_cache_dir(), 'audio')
+        self.index_path: str = os.path.join(self.directory, INDEX_FILE_NAME)
+        self.budget: int = budget
+        self.entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self.loaded: bool = False
+        self.saved: float = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.bytes_saved: int = 0
+        self.lock: threading.RLock = threading.RLock()
+
+    def path(self, entry: CacheEntry) -> str:
+        return os.path.join(self.directory, f'{entry.key}.mp3')
+
+    def load(self) -> None:
+        '''
+        load reads the index the first time the cache is used, dropping
+        entries whose file has gone.
+        '''
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    entries: 'List[dict]' = json.load(f)
+            except (OSError, ValueError):
+                entries = []
+            for values in sorted(entries, key=lambda values: values.get('used', 0)):
+                try:
+                    entry: CacheEntry = CacheEntry(**values)
+                except TypeError:
+                    continue
+                if os.path.exists(self.path(entry)):
+                    self.entries[entry.key] = entry
+
+    def save(self, force: bool = False) -> None:
+        with self.lock:
+            if not self.loaded or not force and time.monotonic() - self.saved < SAVE_INTERVAL:
+                return
+            self.saved = time.monotonic()
+            temporary_path: str = f'{self.index_path}.tmp'
+            try:
+                with open(temporary_path, 'w', encoding='utf-8') as f:
+                    json.dump([entry.to_dict() for entry in self.entries.values()], f)
+                os.replace(temporary_path, self.index_path)
+            except OSError as e:
+                print(f"Could not save the audio cache index: {e}")
+
+    def entry(self, url: str, size: int, validator: Optional[str]) -> Optional[CacheEntry]:
+        '''
+        entry returns the cache entry of this version of url, creating it if
+        needed, and drops entries of other versions of it.
+
+        Returns:
+            CacheEntry: the entry, or None if the recording is bigger than
+            the whole budget.
+        '''
+        if size <= 0 or size > self.budget:
+            return None
+        self.load()
+        key: str = cache_key(url, size, validator)
+        with self.lock:
+            for stale in [other for other in self.entries.values() if other.url == url and other.key != key]:
+                self.remove(stale)
+            entry: Optional[CacheEntry] = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = CacheEntry(key, url, size, validator)
+                try:
+                    open(self.path(entry), 'ab').close()
+                except OSError as e:
+                    print(f"Could not write to the audio cache: {e}")
+                    del self.entries[key]
+                    return None
+            entry.used = time.time()
+            self.entries.move_to_end(key)
+            return entry
+
+    def read(self, entry: CacheEntry, position: int, length: int) -> bytes:
+        '''
+        read returns up to length cached bytes from position on, or b'' if
+        position isn't cached, counting it as a hit or a miss.
+        '''
+        with self.lock:
+            length = min(length, entry.available(position))
+            if length <= 0 or entry.key not in self.entries:
+                self.misses += 1
+                metrics.increment('audio_cache_misses')
+                return b''
+        try:
+            with open(self.path(entry), 'rb') as f:
+                f.seek(position)
+                data: bytes = f.read(length)
+        except OSError:
+            data = b''
+        if len(data) < length:
+            # The file was changed behind our back; forget what it held.
+            with self.lock:
+                entry.ranges = []
+                self.misses += 1
+            metrics.increment('audio_cache_misses')
+            return b''
+        with self.lock:
+            self.hits += 1
+            self.bytes_saved += len(data)
+        metrics.increment('audio_cache_hits')
+        metrics.increment('audio_cache_bytes_saved', len(data))
+        return data
+
+    def write(self, entry: CacheEntry, position: int, data: bytes) -> None:
+        '''
+        write stores bytes just downloaded at position, then records them as
+        cached and evicts old recordings if the cache is over budget.
+        '''
+        if not data or entry.key not in self.entries:
+            return
+        try:
+            with open(self.path(entry), 'r+b') as f:
+                f.seek(position)
+                f.write(data)
+        except OSError as e:
+            print(f"Could not write to the audio cache: {e}")
+            return
+        with self.lock:
+            if entry.key not in self.entries:
+                return
+            entry.ranges = add_range(entry.ranges, position, min(position + len(data), entry.size))
+            self.evict(keep=entry)
+            self.save(force=entry.complete)
+
+    def evict(self, keep: Optional[CacheEntry] = None) -> None:
+        with self.lock:
+            total: int = self.total_bytes()
+            for entry in list(self.entries.values()):
+                if total <= self.budget:
+                    break
+                if entry is keep:
+                    continue
+                total -= entry.cached_bytes
+                metrics.increment('audio_cache_evictions')
+                self.remove(entry)
+
+    def remove(self, entry: CacheEntry) -> None:
+        with self.lock:
+            self.entries.pop(entry.key, None)
+            entry.ranges = []
+            try:
+                os.remove(self.path(entry))
+            except OSError:
+                pass
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            return sum(entry.cached_bytes for entry in self.entries.values())
+
+    def set_budget(self, budget: int) -> None:
+        self.budget = budget
+        self.load()
+        self.evict()
+        self.save(force=True)
+
+    def clear(self) -> None:
+        self.load()
+        with self.lock:
+            for entry in list(self.entries.values()):
+                self.remove(entry)
+            self.save(force=True)
+
+    def stats(self) -> 'dict[str, object]':
+        with self.lock:
+            return {
+                'recordings': len(self.entries),
+                'bytes': self.total_bytes(),
+                'budget': self.budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes_saved': self.bytes_saved,
+            }
+
+    def gauges(self) -> 'dict[str, float]':
+        '''
+        gauges returns the cache's size, for metrics.add_collector.
+        '''
+        with self.lock:
+            return {
+                'audio_cache_bytes': self.total_bytes(),
+                'audio_cache_recordings': len(self.entries),
+            }
+
+    def close(self) -> None:
+        self.save(force=True)
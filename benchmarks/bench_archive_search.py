@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+'''
+Build, incremental update and per-keystroke query times of the archive
+search index on synthetic archives.
+
+    python benchmarks/bench_archive_search.py [--sizes 1000 10000 50000]
+'''
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive_search import SORT_OLDEST, ArchiveSearchIndex  # noqa: E402
+from bench_archive_view import make_archive  # noqa: E402
+
+TYPED: str = 'oak bluff peter 2001'
+
+
+def timed(fn) -> float:
+    start: float = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    for entries in args.sizes:
+        names: 'list[str]' = list(make_archive(entries + 50))
+        index = ArchiveSearchIndex()
+        build: float = timed(lambda: index.update(names[:entries]))
+        update: float = timed(lambda: index.update(names[50:]))
+        index.search()
+        index.search(sort=SORT_OLDEST)
+        keystrokes: 'list[float]' = [timed(lambda: index.search(TYPED[:i])) for i in range(1, len(TYPED) + 1)]
+        cold: float = timed(lambda: index.search('peter'))
+        index.last_text = ''
+        cold = timed(lambda: index.search('bluff'))
+        dates: float = timed(lambda: index.search('', date(2001, 1, 1), date(2001, 6, 30), sort=SORT_OLDEST))
+        print(f'{entries:>6} entries: build {build:7.1f} ms, update(+50/-50) {update:5.2f} ms, '
+              f'keystroke max {max(keystrokes):5.2f} ms / mean {sum(keystrokes) / len(keystrokes):5.2f} ms, '
+              f'fresh query {cold:5.2f} ms, date range {dates:5.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+'''
+Render time and resident memory of the Archives tab for synthetic archives,
+comparing the QListView model/view against the old one-Button-per-recording
+layout.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_archive_view.py [--sizes 1000 10000 50000] [--legacy]
+
+Every size runs in its own process so RSS figures don't bleed into each other.
+'''
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LOCATIONS: 'tuple[str, ...]' = ('Pineland', 'Springfield', 'Riverside', 'Oak_Bluff', 'Sturgeon_Creek')
+SPEAKERS: 'tuple[str, ...]' = ('Jacob', 'Peter', 'David', 'Paul', 'John', 'Samuel')
+
+
+def rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_archive(entries: int) -> 'dict[str, dict]':
+    archive: 'dict[str, dict]' = {}
+    for i in range(entries):
+        day: int = i // 4
+        name: str = f'{LOCATIONS[i % len(LOCATIONS)]}_{SPEAKERS[i % len(SPEAKERS)]}_{2000 + day // 336}-{day // 28 % 12 + 1:02d}-{day % 28 + 1:02d}_{9 + i % 4 * 2}_{i % 60:02d}.mp3'
+        archive[name] = {'downloadLink': f'http://hbniaudio.hbni.net/archive/{name}'}
+    return archive
+
+
+def run(entries: int, legacy: bool) -> None:
+    from PyQt5.QtWidgets import (QApplication, QPushButton, QScrollArea,
+                                 QVBoxLayout, QWidget)
+
+    from archive import ArchiveIndex
+    from archive_view import ArchiveListModel, ArchiveListView
+
+    app = QApplication([])
+    baseline: float = rss_mb()
+    index = ArchiveIndex(cache_dir=tempfile.mkdtemp())
+    index.entries = make_archive(entries)
+    index.search_index.update(index.entries)
+
+    start: float = time.perf_counter()
+    if legacy:
+        view = QScrollArea()
+        view.setWidgetResizable(True)
+        content = QWidget(view)
+        layout = QVBoxLayout(content)
+        for fileName in reversed(index.names()):
+            button = QPushButton(fileName.replace('_', ':').replace('.mp3', ''))
+            button.setStyleSheet('font-size: 18px')
+            button.setFixedHeight(50)
+            layout.addWidget(button)
+        view.setWidget(content)
+    else:
+        model = ArchiveListModel(index)
+        view = ArchiveListView()
+        view.setModel(model)
+        model.setFileNames(index.search_index.search())
+    view.resize(480, 600)
+    view.show()
+    app.processEvents()
+    rendered: float = time.perf_counter() - start
+
+    search: float = float('nan')
+    if not legacy:
+        start = time.perf_counter()
+        model.setFileNames(index.search_index.search('peter'))
+        app.processEvents()
+        search = time.perf_counter() - start
+
+    gc.collect()
+    print(f'{"legacy" if legacy else "model/view":>10} {entries:>7} {rendered * 1000:>11.1f} {search * 1000:>10.1f} {rss_mb() - baseline:>9.1f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--legacy', action='store_true', help='also time the one-Button-per-recording layout')
+    parser.add_argument('--run', nargs=2, metavar=('ENTRIES', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(int(args.run[0]), args.run[1] == 'legacy')
+        return
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    print(f'{"mode":>10} {"entries":>7} {"render ms":>11} {"search ms":>10} {"RSS MB":>9}')
+    for entries in args.sizes:
+        for mode in (('view', 'legacy') if args.legacy else ('view',)):
+            subprocess.run([sys.executable, __file__, '--run', str(entries), mode], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+'''
+update_ui and loadArchive times of the real MainWindow, fed by the local
+stand-in server: status pages with 1 to 100 live streams, and archives of
+1k to 50k recordings.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_main_window.py [--streams 1 10 100] [--archives 1000 10000 50000] [--repeat 5]
+
+Settings are kept in a temporary directory, so the benchmark doesn't touch
+the app's own.
+'''
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARKS: str = os.path.dirname(os.path.abspath(__file__))
+ROOT: str = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS)
+
+from bench_archive_view import rss_mb  # noqa: E402
+from standin_server import StandInServer  # noqa: E402
+
+
+def make_window(server: StandInServer, auto_start: bool = False):
+    '''
+    make_window builds a MainWindow whose status poller, stream links and
+    archive index all point at server instead of the HBNI servers. It must
+    be called with a QApplication running.
+    '''
+    from PyQt5.QtCore import QSettings
+
+    QSettings.setDefaultFormat(QSettings.IniFormat)
+    QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, tempfile.mkdtemp())
+    settings = QSettings("A", "B")
+    settings.setValue("Auto start stream", auto_start)
+    settings.setValue("Enable notifications", False)
+    settings.sync()
+
+    os.chdir(ROOT)
+    import status
+    status.ICECAST_URL = server.url
+    import main
+    from archive import ArchiveIndex
+    from poller import StatusPoller
+    main.ICECAST_URL = server.url
+
+    window = main.MainWindow()
+    window.statusPoller.close()
+    window.statusPoller = StatusPoller(icecast_url=f'{server.url}/status-json.xsl', html_url=f'{server.url}/')
+    window.archiveIndex.close()
+    window.archiveIndex = ArchiveIndex(url=f'{server.url}/downloadLinks.json', cache_dir=tempfile.mkdtemp())
+    window.archiveModel.archiveIndex = window.archiveIndex
+    return window
+
+
+def timed(app, fn) -> float:
+    start: float = time.perf_counter()
+    fn()
+    app.processEvents()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_update_ui(app, window, server: StandInServer, sizes: 'list[int]', repeat: int) -> None:
+    print(f'{"streams":>8} {"first ms":>9} {"update ms":>10} {"offline ms":>11} {"RSS MB":>8}')
+    for streams in sizes:
+        server.streams = 0
+        offline = window.statusPoller.fetch()
+        server.streams = streams
+        online = window.statusPoller.fetch()
+        server.streams = max(streams - 1, 0)
+        fewer = window.statusPoller.fetch()
+        window.website_checked(offline)
+        app.processEvents()
+        first: float = timed(app, lambda: window.website_checked(online))
+        # Alternate between streams and streams - 1, like a mount dropping out.
+        updates: 'list[float]' = []
+        for i in range(repeat):
+            updates.append(timed(app, lambda: window.website_checked(fewer if i % 2 == 0 else online)))
+        gone: float = timed(app, lambda: window.website_checked(offline))
+        print(f'{streams:>8} {first:>9.2f} {statistics.median(updates):>10.2f} {gone:>11.2f} {rss_mb():>8.1f}')
+
+
+def bench_load_archive(app, window, server: StandInServer, sizes: 'list[int]') -> None:
+    print(f'{"entries":>8} {"refresh ms":>11} {"load ms":>8} {"search ms":>10} {"RSS MB":>8}')
+    window.tabWidget.setCurrentWidget(window.archivesTab)
+    for entries in sizes:
+        server.archive = entries
+        server.links = None
+        refresh: float = timed(app, window.archiveIndex.refresh)
+        load: float = timed(app, window.loadArchive)
+        window.inputArchiveSearch.setText('peter')
+        search: float = timed(app, window.search_archive)
+        window.inputArchiveSearch.setText('')
+        print(f'{entries:>8} {refresh:>11.1f} {load:>8.1f} {search:>10.1f} {rss_mb():>8.1f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 5, 20, 50, 100])
+    parser.add_argument('--archives', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+
+    server = StandInServer(streams=0).start()
+    app = QApplication([])
+    window = make_window(server)
+    window.timerCheckForStreams.stop()
+    app.processEvents()
+    window.threadpool.waitForDone()
+    app.processEvents()
+    try:
+        bench_update_ui(app, window, server, args.streams, args.repeat)
+        print()
+        bench_load_archive(app, window, server, args.archives)
+    finally:
+        window.close()
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
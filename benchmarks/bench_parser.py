@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+'''
+Compares parse_status_page against the regex helpers MainWindow used to run
+over the status page on every poll.
+
+    python benchmarks/bench_parser.py [--repeat 20]
+'''
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from status import parse_status_page  # noqa: E402
+
+
+def legacy_find_active_events(html: str) -> str:
+    regex: re = r'(?=(<div class="event">))(\w|\W)*(?<=<\/div>)'
+    matches = re.finditer(regex, html, re.MULTILINE)
+    for match in matches:
+        if 'no schedule' in match[0].lower() or 'no upcoming events' in match[0].lower() or 'no events' in match[0].lower():
+            return ''
+        return match[0]
+    return ''
+
+
+def legacy_find_active_lisenters(html: str) -> str:
+    regex: re = r'Current Number of Listeners: ([0-9]*)'
+    matches = re.finditer(regex, html, re.MULTILINE)
+    for match in matches:
+        return match[0]
+    return ''
+
+
+def legacy_find_active_streams(tag: str, html: str,
+                               replace_text: bool = True) -> 'list[str]':
+    regex = r"{}=([\"'])((?:(?=(?:\\)*)\\.|.)*?)\1".format(tag)
+    matches = re.finditer(regex, html, re.MULTILINE)
+    list_matches: list[str] = []
+    for match in matches:
+        m = match.group()
+        m = m.replace(tag, '').replace('=', '').replace('\'', '')
+        if replace_text:
+            m = m.replace('/', '').title()
+        list_matches.append(m)
+    return list_matches
+
+
+def legacy_parse(html: str) -> None:
+    legacy_find_active_events(html=html)
+    if 'No streams currently online.' not in html:
+        legacy_find_active_streams(tag='data-mnt', html=html)
+        legacy_find_active_streams(tag='data-stream', html=html)
+        legacy_find_active_streams(tag='data-mnt', html=html, replace_text=False)
+    legacy_find_active_lisenters(html=html)
+
+
+def make_page(streams: int, events: int, filler: int = 200) -> str:
+    '''
+    make_page builds a page shaped like hbniaudio.hbni.net.
+
+    Args:
+        streams (int): number of live mounts, 0 for the offline page
+        events (int): number of scheduled events
+        filler (int): paragraphs of unrelated markup after the events
+    '''
+    parts: 'list[str]' = ['<html><head><title>HBNI Audio</title></head><body><div class="content">']
+    if streams:
+        for i in range(streams):
+            parts.append(f"<div class='stream'><button data-mnt='/colony{i}' data-stream='Sunday service from colony {i}'>Listen</button></div>")
+    else:
+        parts.append('<p>No streams currently online.</p>')
+    parts.append('<div class="events">')
+    for i in range(events):
+        parts.append(f'<div class="event"><h3>Event {i}</h3><p class="date">2022-02-{i % 28 + 1:02d} 10:00</p><p>Service at colony {i}</p></div>')
+    parts.append('</div>')
+    parts.extend(f'<div class="footer"><p>Filler paragraph {i}</p></div>' for i in range(filler))
+    parts.append(f'<p>Current Number of Listeners: {streams * 7}</p></div></body></html>')
+    return '\n'.join(parts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f'{"streams":>8} {"events":>7} {"bytes":>9} {"legacy ms":>10} {"parser ms":>10} {"speedup":>8}')
+    for streams, events in ((0, 5), (5, 0), (20, 20), (100, 50), (0, 500), (100, 1000)):
+        html: str = make_page(streams, events)
+        legacy: float = min(timeit.repeat(lambda: legacy_parse(html), number=1, repeat=args.repeat))
+        current: float = min(timeit.repeat(lambda: parse_status_page(html), number=1, repeat=args.repeat))
+        print(f'{streams:>8} {events:>7} {len(html):>9} {legacy * 1000:>10.3f} {current * 1000:>10.3f} {legacy / current:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
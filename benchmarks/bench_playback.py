@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+'''
+Start latency, seek latency, underruns and reconnects of the playback
+engine against the local stand-in server, per playback profile. Audio goes
+to miniaudio's null backend, so no sound card is needed.
+
+    python benchmarks/bench_playback.py [--seconds 20] [--drop-every 8] [--hover 1] [--profiles Balanced "Low latency"]
+
+Live start latency is measured three times: the first play (which also
+opens the audio device), playing again with the device open, and playing
+after hovering over the stream for --hover seconds, i.e. prewarmed.
+'''
+import argparse
+import os
+import sys
+import time
+
+BENCHMARKS: str = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+import miniaudio  # noqa: E402
+
+from playback import PROFILES, PlaybackEngine  # noqa: E402
+from standin_server import StandInServer  # noqa: E402
+
+
+def wait_for(engine: PlaybackEngine, predicate, timeout: float) -> bool:
+    deadline: float = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate(engine.stats()):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def start_latency(engine: PlaybackEngine, start, timeout: float = 15) -> float:
+    '''
+    start_latency calls start, e.g. engine.seek, and returns how long the
+    first sample it asked for took to reach the device, in ms.
+    '''
+    engine.start_latencies.clear()
+    start()
+    if not wait_for(engine, lambda _: bool(engine.start_latencies), timeout):
+        return float('nan')
+    return engine.start_latencies[-1] * 1000
+
+
+def run(profile: str, server: StandInServer, seconds: float, hover: float) -> None:
+    engine = PlaybackEngine(PROFILES[profile], backends=[miniaudio.Backend.NULL])
+    url: str = f'{server.url}/colony0'
+    try:
+        live_start: float = start_latency(engine, lambda: engine.play(url))
+        time.sleep(seconds)
+        live: dict = engine.stats()
+
+        engine.stop()
+        cold_start: float = start_latency(engine, lambda: engine.play(url))
+        engine.stop()
+        engine.prewarm(url)
+        time.sleep(hover)
+        warm_start: float = start_latency(engine, lambda: engine.play(url))
+
+        archive_start: float = start_latency(engine, lambda: engine.play_archive(f'{server.url}/archive/recording.mp3'))
+        seeks: 'list[float]' = [start_latency(engine, lambda position=position: engine.seek(position))
+                                for position in (300, 60, 540)]
+        print(f'{profile:>16} {live_start:>9.0f} {cold_start:>8.0f} {warm_start:>8.0f} {archive_start:>10.0f} {sum(seeks) / len(seeks):>8.0f} '
+              f'{live["underruns"]:>9} {live["reconnects"]:>10} {live["buffer_depth_msec"]:>9}')
+    finally:
+        engine.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=20, help='how long to listen to the live mount')
+    parser.add_argument('--drop-every', type=float, default=0, help='drop the live connection every this many seconds')
+    parser.add_argument('--hover', type=float, default=1, help='seconds between prewarming the stream and playing it')
+    parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES))
+    args = parser.parse_args()
+
+    server = StandInServer(streams=1, drop_every=args.drop_every).start()
+    try:
+        print(f'{"profile":>16} {"first ms":>9} {"cold ms":>8} {"warm ms":>8} {"archive ms":>10} {"seek ms":>8} {"underruns":>9} {"reconnects":>10} {"depth ms":>9}')
+        for profile in args.profiles:
+            run(profile, server, args.seconds, args.hover)
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
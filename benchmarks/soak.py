@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+'''
+Runs the app for hours against the local stand-in server while streams come
+and go and connections drop, sampling resident memory, live Qt objects and
+threads, to catch slow leaks on long-running kiosks.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/soak.py [--hours 4] [--sample 60] [--cycle 300] [--drop-every 120] [--auto-start] [--csv soak.csv]
+    python benchmarks/soak.py --headless [same options]
+
+Every cycle seconds the number of live streams moves on to the next of
+0, 1, 3 and 10, so the stream buttons are created and removed all the time.
+With --auto-start the first stream is also played, through miniaudio's null
+backend. A summary of how much each figure grew per hour is printed at the
+end.
+'''
+import argparse
+import csv
+import gc
+import itertools
+import os
+import sys
+import threading
+import time
+from typing import Callable, List, Optional
+
+BENCHMARKS: str = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+from bench_archive_view import rss_mb  # noqa: E402
+from standin_server import StandInServer  # noqa: E402
+
+STREAM_COUNTS: 'tuple[int, ...]' = (0, 1, 3, 10)
+FIELDS: 'tuple[str, ...]' = ('elapsed_sec', 'rss_mb', 'qt_objects', 'widgets', 'python_threads',
+                             'os_threads', 'python_objects', 'streams', 'playback_state', 'underruns', 'reconnects')
+
+
+def os_threads() -> Optional[int]:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class Soak:
+    '''
+    Collects one row of FIELDS every sample, with qt_objects counting
+    everything a Qt application can still reach. The stand-in server's
+    stream count is moved on every cycle.
+    '''
+
+    def __init__(self, server: StandInServer, engine, count_qt_objects: 'Callable[[], tuple[int, int]]',
+                 cycle: float, writer) -> None:
+        self.server: StandInServer = server
+        self.engine = engine
+        self.count_qt_objects: 'Callable[[], tuple[int, int]]' = count_qt_objects
+        self.cycle: float = cycle
+        self.writer = writer
+        self.stream_counts = itertools.cycle(STREAM_COUNTS[1:] + STREAM_COUNTS[:1])
+        self.started: float = time.monotonic()
+        self.changed: float = self.started
+        self.rows: 'List[dict]' = []
+
+    def tick(self) -> None:
+        now: float = time.monotonic()
+        if now - self.changed >= self.cycle:
+            self.changed = now
+            self.server.streams = next(self.stream_counts)
+
+    def sample(self) -> None:
+        gc.collect()
+        qt_objects, widgets = self.count_qt_objects()
+        stats: dict = self.engine.stats()
+        row: dict = {
+            'elapsed_sec': round(time.monotonic() - self.started),
+            'rss_mb': round(rss_mb(), 1),
+            'qt_objects': qt_objects,
+            'widgets': widgets,
+            'python_threads': threading.active_count(),
+            'os_threads': os_threads(),
+            'python_objects': len(gc.get_objects()),
+            'streams': self.server.streams,
+            'playback_state': stats['state'],
+            'underruns': stats['underruns'],
+            'reconnects': stats['reconnects'],
+        }
+        self.rows.append(row)
+        self.writer.writerow(row)
+        print(' '.join(f'{field}={row[field]}' for field in FIELDS), flush=True)
+
+    def summary(self) -> None:
+        '''
+        summary prints how much every numeric figure grew per hour, from a
+        least squares fit over the samples after the first (which still
+        includes start up).
+        '''
+        rows: 'List[dict]' = self.rows[1:]
+        if len(rows) < 2:
+            return
+        print('\nGrowth per hour:')
+        xs: 'List[float]' = [row['elapsed_sec'] / 3600 for row in rows]
+        mean_x: float = sum(xs) / len(xs)
+        spread: float = sum((x - mean_x) ** 2 for x in xs)
+        for field in FIELDS[1:7]:
+            ys: 'List[float]' = [row[field] for row in rows if row[field] is not None]
+            if len(ys) != len(xs) or not spread:
+                continue
+            mean_y: float = sum(ys) / len(ys)
+            slope: float = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+            print(f'{field:>16} {rows[0][field]:>10} -> {rows[-1][field]:>10} {slope:>+12.1f}/h')
+
+
+def run_gui(args: argparse.Namespace, server: StandInServer, writer) -> Soak:
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import miniaudio
+    from PyQt5.QtCore import QObject, QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    from bench_main_window import make_window
+
+    app = QApplication([])
+    window = make_window(server, auto_start=args.auto_start)
+    window.playbackEngine.backends = [miniaudio.Backend.NULL]
+
+    def count_qt_objects() -> 'tuple[int, int]':
+        widgets = QApplication.allWidgets()
+        objects: int = len(window.findChildren(QObject)) + len(widgets)
+        return objects, len(widgets)
+
+    soak = Soak(server, window.playbackEngine, count_qt_objects, args.cycle, writer)
+    timerTick = QTimer()
+    timerTick.setInterval(1000)
+    timerTick.timeout.connect(soak.tick)
+    timerTick.start()
+    timerSample = QTimer()
+    timerSample.setInterval(int(args.sample * 1000))
+    timerSample.timeout.connect(soak.sample)
+    timerSample.start()
+    QTimer.singleShot(int(args.hours * 3600 * 1000), app.quit)
+    QTimer.singleShot(0, soak.sample)
+    app.exec_()
+    window.close()
+    return soak
+
+
+def run_headless(args: argparse.Namespace, server: StandInServer, writer) -> Soak:
+    import miniaudio
+
+    from headless import HeadlessListener
+    from playback import PlaybackEngine
+    from poller import StatusPoller
+
+    engine = PlaybackEngine(backends=[miniaudio.Backend.NULL])
+    poller = StatusPoller(icecast_url=f'{server.url}/status-json.xsl', html_url=f'{server.url}/')
+    listener = HeadlessListener(engine, poller, args.auto_start)
+    thread = threading.Thread(target=listener.run, daemon=True)
+    thread.start()
+    soak = Soak(server, engine, lambda: (None, None), args.cycle, writer)
+    deadline: float = time.monotonic() + args.hours * 3600
+    next_sample: float = time.monotonic()
+    try:
+        while time.monotonic() < deadline:
+            if time.monotonic() >= next_sample:
+                soak.sample()
+                next_sample += args.sample
+            soak.tick()
+            time.sleep(1)
+    finally:
+        listener.stop()
+        thread.join()
+        engine.shutdown()
+        poller.close()
+    return soak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, default=4)
+    parser.add_argument('--sample', type=float, default=60, help='seconds between samples')
+    parser.add_argument('--cycle', type=float, default=300, help='seconds between changes to the live streams')
+    parser.add_argument('--drop-every', type=float, default=120, help='drop stream connections after this many seconds')
+    parser.add_argument('--auto-start', action='store_true', help='play the first live stream')
+    parser.add_argument('--headless', action='store_true', help='soak the headless listener instead of the window')
+    parser.add_argument('--csv', default='soak.csv', help='where to write the samples')
+    args = parser.parse_args()
+
+    import status
+    server = StandInServer(streams=STREAM_COUNTS[0], drop_every=args.drop_every).start()
+    status.ICECAST_URL = server.url
+    with open(args.csv, 'w', newline='') as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        try:
+            soak: Soak = (run_headless if args.headless else run_gui)(args, server, writer)
+        finally:
+            server.close()
+    soak.summary()
+
+
+if __name__ == '__main__':
+    main()
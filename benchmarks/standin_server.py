@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+'''
+A local stand-in for the HBNI servers, for benchmarks and soak tests: the
+hbniaudio status page, Icecast's status-json.xsl, live MP3 mounts, the
+archive's downloadLinks.json and the archive recordings it points at.
+
+    python benchmarks/standin_server.py [--port 8000] [--streams 3] [--events 5] [--archive 1000] [--drop-every 60]
+
+The audio is generated: silent 64 kbps, 48 kHz mono MPEG-1 layer III frames,
+which every decoder accepts without any encoder being installed. Mounts are
+sent at the real bitrate, and --drop-every closes every listener's
+connection after that many seconds to exercise reconnects.
+'''
+import argparse
+import http.server
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Optional
+
+BENCHMARKS: str = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+from bench_archive_view import make_archive  # noqa: E402
+from bench_parser import make_page  # noqa: E402
+
+# MPEG-1 layer III, 64 kbps, 48 kHz, mono: 1152 samples in 192 bytes.
+FRAME_HEADER: bytes = b'\xff\xfb\x54\xc4'
+FRAME_BYTES: int = 192
+FRAME_SECONDS: float = 1152 / 48000
+SILENT_FRAME: bytes = FRAME_HEADER + bytes(FRAME_BYTES - len(FRAME_HEADER))
+BYTES_PER_SECOND: int = 8000
+RANGE_REGEX = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def silent_mp3(seconds: float) -> bytes:
+    return SILENT_FRAME * max(1, int(seconds / FRAME_SECONDS))
+
+
+class StandInRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self.respond(head=True)
+
+    def do_GET(self) -> None:
+        self.respond(head=False)
+
+    def respond(self, head: bool) -> None:
+        server: StandInServer = self.server
+        path: str = self.path.split('?')[0]
+        server.requests += 1
+        if path == '/':
+            self.send_body(make_page(server.streams, server.events).encode('utf-8'), 'text/html', head)
+        elif path == '/status-json.xsl':
+            self.send_body(json.dumps(server.icecast_status()).encode('utf-8'), 'application/json', head)
+        elif path == '/downloadLinks.json':
+            self.send_body(server.download_links(), 'application/json', head)
+        elif path.startswith('/archive/'):
+            self.send_recording(head)
+        elif path.lstrip('/') in server.mounts():
+            self.send_stream(head)
+        else:
+            self.send_error(404)
+
+    def send_body(self, body: bytes, content_type: str, head: bool) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def send_recording(self, head: bool) -> None:
+        body: bytes = self.server.recording
+        match = RANGE_REGEX.fullmatch(self.headers.get('Range', ''))
+        if match is None or not (match[1] or match[2]):
+            self.send_response(200)
+            start, end = 0, len(body) - 1
+        else:
+            if match[1]:
+                start, end = int(match[1]), min(int(match[2]) if match[2] else len(body) - 1, len(body) - 1)
+            else:
+                start, end = max(len(body) - int(match[2]), 0), len(body) - 1
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body[start:end + 1])
+
+    def send_stream(self, head: bool) -> None:
+        server: StandInServer = self.server
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('icy-name', self.path.lstrip('/').title())
+        self.send_header('icy-br', '64')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        if head:
+            return
+        started: float = time.monotonic()
+        sent: int = 0
+        # A burst of a few seconds first, like Icecast's burst-on-connect.
+        burst: int = 4 * BYTES_PER_SECOND
+        try:
+            while not server.stopping.is_set():
+                elapsed: float = time.monotonic() - started
+                if server.drop_every and elapsed > server.drop_every:
+                    return
+                due: int = burst + int(elapsed * BYTES_PER_SECOND)
+                if sent < due:
+                    frames: int = (due - sent) // FRAME_BYTES + 1
+                    self.wfile.write(SILENT_FRAME * frames)
+                    sent += frames * FRAME_BYTES
+                time.sleep(FRAME_SECONDS * 4)
+        except OSError:
+            pass
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    '''
+    Serves streams live mounts named colony0, colony1, ..., events scheduled
+    events and an archive of archive recordings, each a copy of the same
+    recording_seconds long silent MP3. streams, events and drop_every can be
+    changed while it runs.
+    '''
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0, streams: int = 1, events: int = 5, archive: int = 1000,
+                 recording_seconds: float = 600, drop_every: float = 0, host: str = '127.0.0.1') -> None:
+        super().__init__((host, port), StandInRequestHandler)
+        self.streams: int = streams
+        self.events: int = events
+        self.archive: int = archive
+        self.drop_every: float = drop_every
+        self.recording: bytes = silent_mp3(recording_seconds)
+        self.requests: int = 0
+        self.links: Optional[bytes] = None
+        self.stopping: threading.Event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def mounts(self) -> 'list[str]':
+        return [f'colony{i}' for i in range(self.streams)]
+
+    def icecast_status(self) -> dict:
+        return {'icestats': {'source': [{
+            'listenurl': f'{self.url}/{mount}',
+            'server_description': f'Sunday service from {mount}',
+            'listeners': 7,
+            'bitrate': 64,
+            'server_type': 'audio/mpeg',
+            'stream_start_iso8601': '2022-02-20T10:00:00-0600',
+        } for mount in self.mounts()]}}
+
+    def download_links(self) -> bytes:
+        if self.links is None:
+            self.links = json.dumps({name: {'downloadLink': f'{self.url}/archive/{name}'}
+                                     for name in make_archive(self.archive)}).encode('utf-8')
+        return self.links
+
+    def handle_error(self, request, client_address) -> None:
+        # Players hang up mid-response all the time; that is not an error here.
+        if not isinstance(sys.exc_info()[1], OSError):
+            super().handle_error(request, client_address)
+
+    def start(self) -> 'StandInServer':
+        self.thread = threading.Thread(target=self.serve_forever, name='StandInServer', daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self) -> None:
+        self.stopping.set()
+        if self.thread is not None:
+            self.shutdown()
+        self.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--streams', type=int, default=3)
+    parser.add_argument('--events', type=int, default=5)
+    parser.add_argument('--archive', type=int, default=1000)
+    parser.add_argument('--drop-every', type=float, default=0, help='close stream connections after this many seconds')
+    args = parser.parse_args()
+
+    server = StandInServer(args.port, args.streams, args.events, args.archive, drop_every=args.drop_every)
+    print(f'Status page     {server.url}/')
+    print(f'Icecast status  {server.url}/status-json.xsl')
+    print(f'Archive         {server.url}/downloadLinks.json')
+    for mount in server.mounts():
+        print(f'Mount           {server.url}/{mount}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
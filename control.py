@@ -0,0 +1,159 @@
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, TextIO
+
+from paths import user_cache_dir
+
+DEFAULT_CONTROL_PORT: int = 47651
+MAX_LINE_BYTES: int = 4096
+LOCK_FILE_NAME: str = 'instance.lock'
+# Windows locks byte ranges mandatorily, so lock one past the port number
+# and leave the number itself readable.
+LOCK_OFFSET: int = 64
+
+
+class ControlRequestHandler(socketserver.StreamRequestHandler):
+    '''
+    Reads one command per line, such as "play /pineland" or "status", and
+    answers each with one line of JSON.
+    '''
+
+    def handle(self) -> None:
+        while True:
+            line: bytes = self.rfile.readline(MAX_LINE_BYTES)
+            if not line:
+                return
+            words: 'List[str]' = line.decode('utf-8', 'replace').split()
+            if not words:
+                continue
+            try:
+                reply: dict = self.server.handler(words[0].lower(), words[1:])
+            except Exception as e:
+                reply = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+
+class ControlServer(socketserver.ThreadingTCPServer):
+    '''
+    A line based control socket on localhost. handler gets the command and
+    its arguments and returns the reply.
+    '''
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handler: 'Callable[[str, List[str]], dict]',
+                 port: int = DEFAULT_CONTROL_PORT, host: str = '127.0.0.1') -> None:
+        self.handler: 'Callable[[str, List[str]], dict]' = handler
+        self.thread: Optional[threading.Thread] = None
+        super().__init__((host, port), ControlRequestHandler)
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.serve_forever, name='ControlServer', daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        if self.thread is not None:
+            self.shutdown()
+        self.server_close()
+
+
+class InstanceLock:
+    '''
+    An exclusive lock on a file in the cache directory, held while the app
+    or the headless listener runs, so only one of them plays per user. The
+    file holds the holder's control socket port for a second launch to get
+    in touch with it. The lock goes with the process, even if it crashes.
+    '''
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path: str = path or os.path.join(user_cache_dir(), LOCK_FILE_NAME)
+        self.file: Optional[TextIO] = None
+
+    def acquire(self, port: int) -> bool:
+        '''
+        acquire takes the lock and records port in it.
+
+        Returns:
+            bool: False if another instance holds the lock.
+        '''
+        f: TextIO = open(self.path, 'a+')
+        try:
+            if sys.platform == 'win32':
+                import msvcrt
+                f.seek(LOCK_OFFSET)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(port))
+        f.flush()
+        self.file = f
+        return True
+
+    def port(self) -> Optional[int]:
+        '''
+        The control socket port the holder recorded, or None if there is no
+        lock file or it is being written.
+        '''
+        try:
+            with open(self.path) as f:
+                return int(f.read(LOCK_OFFSET).strip())
+        except (OSError, ValueError):
+            return None
+
+    def release(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def send_command(command: str, port: int = DEFAULT_CONTROL_PORT,
+                 host: str = '127.0.0.1', timeout: float = 3) -> dict:
+    '''
+    send_command sends one command to a running control socket.
+
+    Returns:
+        dict: the reply.
+
+    Raises:
+        OSError: if nothing is listening or it doesn't answer in time.
+    '''
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        connection.sendall(command.encode('utf-8') + b'\n')
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile('rb') as f:
+            line: bytes = f.readline()
+    if not line:
+        raise ConnectionError('The control socket closed without answering')
+    return json.loads(line)
+
+
+def send_to_running_instance(command: str, port: Optional[int] = None,
+                             attempts: int = 10, delay: float = 0.5) -> dict:
+    '''
+    send_to_running_instance sends one command to the instance holding the
+    InstanceLock, on the port it recorded unless port is given. The holder
+    may still be starting up, so connecting is retried attempts times.
+
+    Returns:
+        dict: the reply.
+
+    Raises:
+        OSError: if it doesn't answer.
+    '''
+    for _ in range(attempts - 1):
+        try:
+            return send_command(command, port or InstanceLock().port() or DEFAULT_CONTROL_PORT)
+        except OSError:
+            time.sleep(delay)
+    return send_command(command, port or InstanceLock().port() or DEFAULT_CONTROL_PORT)
@@ -0,0 +1,470 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from lazysession import LazySession
+from metrics import metrics
+
+QUEUED: str = 'queued'
+DOWNLOADING: str = 'downloading'
+DONE: str = 'done'
+FAILED: str = 'failed'
+CANCELLED: str = 'cancelled'
+
+MIN_SEGMENT_BYTES: int = 1024 * 1024
+CHUNK_BYTES: int = 64 * 1024
+TAIL_BYTES: int = 4 * 1024
+SAVE_INTERVAL: float = 2
+
+
+class TokenBucket:
+    '''
+    A bandwidth cap shared by every connection: each chunk read takes its
+    size in tokens, which refill at rate bytes per second. A rate of 0 means
+    unlimited.
+    '''
+
+    def __init__(self, rate: int = 0) -> None:
+        self.rate: int = rate
+        self.tokens: float = 0
+        self.updated: float = time.monotonic()
+        self.lock: threading.Lock = threading.Lock()
+
+    def set_rate(self, rate: int) -> None:
+        with self.lock:
+            self.rate = rate
+            self.tokens = 0
+
+    def consume(self, amount: int, cancelled: threading.Event) -> bool:
+        '''
+        consume waits until amount bytes may be transferred.
+
+        Returns:
+            bool: False if cancelled was set while waiting.
+        '''
+        while True:
+            with self.lock:
+                if self.rate <= 0:
+                    return True
+                now: float = time.monotonic()
+                self.tokens = min(self.tokens + (now - self.updated) * self.rate, self.rate)
+                self.updated = now
+                if self.tokens >= amount or self.tokens >= self.rate:
+                    self.tokens -= amount
+                    return True
+                wait: float = (min(amount, self.rate) - self.tokens) / self.rate
+            if cancelled.wait(min(wait, 0.5)):
+                return False
+
+
+class Segment:
+    '''
+    Bytes start to end (inclusive) of a download, or start to the end of
+    the file if end is None because the size isn't known. position is the
+    first byte not yet written, durable the first byte not yet synced to
+    disk; only durable is saved for resuming.
+    '''
+    __slots__ = ('start', 'end', 'position', 'durable')
+
+    def __init__(self, start: int, end: Optional[int], position: Optional[int] = None) -> None:
+        self.start: int = start
+        self.end: Optional[int] = end
+        self.position: int = start if position is None else position
+        self.durable: int = self.position
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None and self.position > self.end
+
+
+class Download:
+    '''
+    One archive recording being downloaded to path.
+
+    The file is split into byte ranges fetched over separate connections and
+    written in place into path + ".part". How far each range got is saved
+    next to it every few seconds, so a download that is interrupted, even by
+    closing the app, picks up where it left off. The finished file is only
+    renamed into place once its size, and its MD5 if the server sent a
+    Content-MD5, match what the server reported.
+    '''
+
+    def __init__(self, url: str, path: str) -> None:
+        self.url: str = url
+        self.path: str = path
+        self.part_path: str = f'{path}.part'
+        self.state_path: str = f'{path}.part.json'
+        self.size: Optional[int] = None
+        self.validator: Optional[str] = None
+        self.md5: Optional[str] = None
+        self.segments: 'List[Segment]' = []
+        self.status: str = QUEUED
+        self.error: Optional[Exception] = None
+        self.running: int = 0
+        self.cancelled: threading.Event = threading.Event()
+        self.lock: threading.Lock = threading.Lock()
+        self.saved: float = 0
+
+    @property
+    def file_name(self) -> str:
+        return os.path.basename(self.path)
+
+    @property
+    def downloaded(self) -> int:
+        return sum(segment.position - segment.start for segment in self.segments)
+
+    @property
+    def progress(self) -> float:
+        if self.status == DONE:
+            return 1
+        if not self.size:
+            return 0
+        return self.downloaded / self.size
+
+    def prepare(self, session: 'requests.Session', connections: int, timeout: float) -> None:
+        '''
+        prepare finds the size of the file and plans the ranges to fetch,
+        reusing the saved plan of an earlier attempt when it still fits.
+        '''
+        response = session.head(self.url, allow_redirects=True, timeout=timeout)
+        response.raise_for_status()
+        length: Optional[str] = response.headers.get('Content-Length')
+        self.size = int(length) if length else None
+        self.validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        self.md5 = response.headers.get('Content-MD5')
+        ranges: bool = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+        if self.size is None or not ranges:
+            # Without ranges the only way to resume is to start over.
+            self.segments = [Segment(0, self.size - 1 if self.size is not None else None)]
+            with open(self.part_path, 'wb'):
+                pass
+            return
+        if self.load_state():
+            self.check_tails(session, timeout)
+            return
+        count: int = max(1, min(connections, self.size // MIN_SEGMENT_BYTES))
+        step: int = self.size // count
+        self.segments = [Segment(i * step, self.size - 1 if i == count - 1 else (i + 1) * step - 1) for i in range(count)]
+        with open(self.part_path, 'wb') as f:
+            f.truncate(self.size)
+        self.save_state()
+
+    def load_state(self) -> bool:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state: dict = json.load(f)
+            if state['url'] != self.url or state['size'] != self.size or state.get('validator') != self.validator \
+               or os.path.getsize(self.part_path) != self.size:
+                return False
+            self.segments = [Segment(*segment) for segment in state['segments']]
+            return bool(self.segments)
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def check_tails(self, session: 'requests.Session', timeout: float) -> None:
+        '''
+        check_tails compares the last saved bytes of each resumed segment with
+        the server's and starts a segment over if they differ, so bytes lost
+        in a crash aren't built on.
+        '''
+        with open(self.part_path, 'rb') as f:
+            for segment in self.segments:
+                start: int = max(segment.start, segment.position - TAIL_BYTES)
+                if start >= segment.position:
+                    continue
+                f.seek(start)
+                saved: bytes = f.read(segment.position - start)
+                response = session.get(self.url, headers={'Range': f'bytes={start}-{segment.position - 1}'}, timeout=timeout)
+                response.raise_for_status()
+                if response.status_code != 206 or response.content != saved:
+                    metrics.increment('download_tail_mismatches')
+                    segment.position = segment.durable = segment.start
+
+    def save_state(self) -> None:
+        with self.lock:
+            state: dict = {
+                'url': self.url,
+                'size': self.size,
+                'validator': self.validator,
+                'segments': [[segment.start, segment.end, segment.durable] for segment in self.segments],
+            }
+            self.saved = time.monotonic()
+        temporary_path: str = f'{self.state_path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temporary_path, self.state_path)
+
+    def fetch(self, segment: Segment, session: 'requests.Session', bucket: TokenBucket, timeout: float) -> None:
+        '''
+        fetch downloads what is left of one segment. It raises on network
+        errors, leaving segment.position at the first byte still missing.
+        '''
+        headers: 'dict[str, str]' = {}
+        if segment.end is not None:
+            headers['Range'] = f'bytes={segment.position}-{segment.end}'
+        with session.get(self.url, headers=headers, timeout=timeout, stream=True) as response, \
+             open(self.part_path, 'r+b') as f:
+            response.raise_for_status()
+            # A server that ignores Range sends the whole file from byte 0;
+            # what comes before the range is already on disk or another
+            # segment's.
+            skip: int = segment.position if response.status_code != 206 else 0
+            f.seek(segment.position)
+            try:
+                for data in response.iter_content(CHUNK_BYTES):
+                    if self.cancelled.is_set() or not bucket.consume(len(data), self.cancelled):
+                        return
+                    if skip:
+                        skipped: int = min(skip, len(data))
+                        data, skip = data[skipped:], skip - skipped
+                        if not data:
+                            continue
+                    if segment.end is not None:
+                        data = data[:segment.end + 1 - segment.position]
+                    f.write(data)
+                    segment.position += len(data)
+                    metrics.increment('download_bytes', len(data))
+                    if segment.done:
+                        break
+                    if time.monotonic() - self.saved > SAVE_INTERVAL:
+                        self.sync(segment, f)
+                        self.save_state()
+                if segment.end is None:
+                    f.truncate(segment.position)
+                    segment.end = segment.position - 1
+                    self.size = segment.position
+            finally:
+                self.sync(segment, f)
+
+    @staticmethod
+    def sync(segment: Segment, f) -> None:
+        '''
+        sync flushes segment's file handle to disk and only then counts what
+        it wrote as durable.
+        '''
+        try:
+            f.flush()
+            os.fsync(f.fileno())
+            segment.durable = segment.position
+        except OSError:
+            segment.position = segment.durable
+
+    def verify(self) -> None:
+        '''
+        verify checks the finished .part file and moves it into place.
+
+        Raises:
+            ValueError: if the file isn't the size the server reported, or its
+                MD5 doesn't match the server's Content-MD5.
+        '''
+        size: int = os.path.getsize(self.part_path)
+        if not all(segment.done for segment in self.segments) or size != self.size:
+            # Start from scratch next time rather than trust the saved ranges.
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+            raise ValueError(f'{self.file_name} is {size} bytes, expected {self.size}')
+        if self.md5 is not None and self.file_md5() != self.md5:
+            self.discard()
+            raise ValueError(f"{self.file_name} doesn't match its Content-MD5")
+        os.replace(self.part_path, self.path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def file_md5(self) -> str:
+        digest = hashlib.md5()
+        with open(self.part_path, 'rb') as f:
+            for data in iter(lambda: f.read(CHUNK_BYTES), b''):
+                digest.update(data)
+        return base64.b64encode(digest.digest()).decode('ascii')
+
+    def discard(self) -> None:
+        '''
+        discard deletes what was downloaded so far, so it isn't resumed.
+        '''
+        for path in (self.part_path, self.state_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class DownloadManager:
+    '''
+    Downloads archive recordings into directory with bounded concurrency:
+    at most max_downloads files at a time, each over up to connections
+    range requests, all sharing one TokenBucket bandwidth cap.
+
+    The manager doesn't own any threads; every file preparation and segment
+    fetch is handed to spawn, which the GUI points at its QThreadPool. A
+    failed segment is retried with backoff from where it stopped, up to
+    retries times in a row.
+    '''
+
+    def __init__(self, directory: str, spawn: Callable[[Callable[[], None]], None],
+                 max_downloads: int = 2, connections: int = 3, rate_limit: int = 0,
+                 timeout: float = 15, retries: int = 5) -> None:
+        self.directory: str = directory
+        self.spawn: Callable[[Callable[[], None]], None] = spawn
+        self.max_downloads: int = max_downloads
+        self.connections: int = connections
+        self.bucket: TokenBucket = TokenBucket(rate_limit)
+        self.timeout: float = timeout
+        self.retries: int = retries
+        self.session: LazySession = LazySession(pool_maxsize=max(10, max_downloads * connections))
+        self.downloads: 'Dict[str, Download]' = {}
+        self.queue: 'Deque[Download]' = deque()
+        self.lock: threading.RLock = threading.RLock()
+
+    def configure(self, max_downloads: int, connections: int, rate_limit: int) -> None:
+        with self.lock:
+            self.max_downloads = max_downloads
+            self.connections = connections
+            self.bucket.set_rate(rate_limit)
+        self.schedule()
+
+    def get(self, file_name: str) -> Optional[Download]:
+        return self.downloads.get(file_name)
+
+    def active(self) -> bool:
+        with self.lock:
+            return any(download.status in (QUEUED, DOWNLOADING) for download in self.downloads.values())
+
+    def submit(self, url: str, file_name: str) -> Download:
+        '''
+        submit queues a recording for download, unless it is already
+        downloaded or queued. A failed or cancelled download is retried.
+        '''
+        with self.lock:
+            download: Optional[Download] = self.downloads.get(file_name)
+            if download is not None and download.status in (QUEUED, DOWNLOADING, DONE):
+                return download
+            download = Download(url, os.path.join(self.directory, file_name))
+            if os.path.exists(download.path):
+                download.status = DONE
+            else:
+                self.queue.append(download)
+            self.downloads[file_name] = download
+        self.schedule()
+        return download
+
+    def cancel(self, file_name: str) -> None:
+        with self.lock:
+            download: Optional[Download] = self.downloads.get(file_name)
+            if download is None or download.status not in (QUEUED, DOWNLOADING):
+                return
+            download.cancelled.set()
+            download.status = CANCELLED
+            queued: bool = download in self.queue
+            if queued:
+                self.queue.remove(download)
+        if queued:
+            # Started downloads are cleaned up in finish once their segments stop.
+            download.discard()
+
+    def schedule(self) -> None:
+        with self.lock:
+            running: int = sum(download.status == DOWNLOADING for download in self.downloads.values())
+            while self.queue and running < self.max_downloads:
+                download: Download = self.queue.popleft()
+                download.status = DOWNLOADING
+                running += 1
+                self.spawn(lambda download=download: self.start(download))
+
+    def start(self, download: Download) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            download.prepare(self.session, self.connections, self.timeout)
+        except Exception as e:
+            self.finish(download, e)
+            return
+        with self.lock:
+            pending: 'List[Segment]' = [segment for segment in download.segments if not segment.done]
+            download.running = len(pending)
+        if not pending:
+            self.finish(download)
+            return
+        for segment in pending:
+            self.spawn(lambda segment=segment: self.fetch(download, segment))
+
+    def fetch(self, download: Download, segment: Segment) -> None:
+        import requests
+
+        error: Optional[Exception] = None
+        failures: int = 0
+        while not download.cancelled.is_set() and not segment.done:
+            position: int = segment.position
+            try:
+                download.fetch(segment, self.session, self.bucket, self.timeout)
+            except (requests.RequestException, OSError) as e:
+                metrics.increment('download_retries')
+                failures = failures + 1 if segment.position == position else 1
+                if failures > self.retries:
+                    error = e
+                    break
+                download.cancelled.wait(min(0.5 * 2 ** failures, 30))
+        with self.lock:
+            download.running -= 1
+            if error is not None and download.error is None:
+                download.error = error
+                download.cancelled.set()
+            last: bool = download.running == 0
+        if last:
+            self.finish(download, download.error)
+
+    def finish(self, download: Download, error: Optional[Exception] = None) -> None:
+        # Closing the app stops downloads without cancelling them; they are
+        # left to be resumed next time.
+        interrupted: bool = error is None and download.cancelled.is_set() and download.status == DOWNLOADING
+        try:
+            if download.status == CANCELLED:
+                with self.lock:
+                    replaced: bool = self.downloads.get(download.file_name) is not download
+                if not replaced:
+                    download.discard()
+            else:
+                if download.segments and download.size is not None:
+                    download.save_state()
+                if error is None and not interrupted and download.status == DOWNLOADING:
+                    download.verify()
+        except (OSError, ValueError) as e:
+            error = e
+        with self.lock:
+            if download.status == DOWNLOADING and not interrupted:
+                download.status = FAILED if error is not None else DONE
+                download.error = error
+                metrics.increment(f'downloads_{download.status}')
+                if error is not None:
+                    metrics.event('download_failed', file_name=download.file_name, error=str(error))
+        self.schedule()
+
+    def resume_pending(self, links: 'Callable[[str], Optional[str]]') -> None:
+        '''
+        resume_pending queues again every download left unfinished in
+        directory when the app was last closed.
+
+        Args:
+            links (Callable[[str], str]): looks up the download link of a file name
+        '''
+        try:
+            names: 'List[str]' = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.part.json'):
+                file_name: str = name[:-len('.part.json')]
+                url: Optional[str] = links(file_name)
+                if url is not None:
+                    self.submit(url, file_name)
+
+    def close(self) -> None:
+        with self.lock:
+            self.queue.clear()
+            for download in self.downloads.values():
+                if download.status in (QUEUED, DOWNLOADING):
+                    download.cancelled.set()
+        self.session.close()
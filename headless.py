@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+'''
+Runs the listener without a window for unattended listening stations: the
+status poller and the playback engine, auto-starting the first live stream,
+controlled through a socket on localhost. Nothing from PyQt5, qdarktheme or
+win10toast is imported.
+
+    python headless.py [--no-auto-start] [--interval 5] [--port 47651] [--profile "Low latency"] [--record]
+                       [--stop-after-silence 30] [--metrics-port [47652]] [--metrics-log metrics.jsonl]
+    python main.py --headless [same options]
+    python headless.py --send status|play [mount or url]|stop
+
+Only one listener runs per user, with or without a window; starting a
+second one exits straight away.
+'''
+import argparse
+import json
+import signal
+import sys
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from control import (DEFAULT_CONTROL_PORT, ControlServer, InstanceLock,
+                     send_command)
+from metrics import add_metrics_arguments, configure_metrics, metrics
+from paths import user_recordings_dir
+from playback import BALANCED, PROFILES, STOPPED, PlaybackEngine
+from poller import StatusPoller
+from recorder import StreamRecorder
+from scheduler import DUE, PollScheduler
+from status import StatusSnapshot, StreamInfo
+
+
+class HeadlessListener:
+    '''
+    Polls the stream status as often as the scheduler decides, which is
+    every interval seconds while a stream starts or an event is due and
+    less often otherwise, as if the window were hidden, and keeps the first
+    live stream playing while auto_start is on. A stream stopped over the control
+    socket, or for staying silent, stays stopped until the streams go
+    offline.
+    '''
+
+    def __init__(self, engine: PlaybackEngine, poller: StatusPoller,
+                 auto_start: bool = True, interval: float = 5) -> None:
+        self.engine: PlaybackEngine = engine
+        self.poller: StatusPoller = poller
+        self.auto_start: bool = auto_start
+        self.scheduler: PollScheduler = PollScheduler(fast=interval)
+        self.snapshot: Optional[StatusSnapshot] = None
+        self.checked: Optional[datetime] = None
+        self.force_stopped: bool = False
+        self.network_error: Optional[str] = None
+        self.stopping: threading.Event = threading.Event()
+        self.lock: threading.Lock = threading.Lock()
+
+    def run(self) -> None:
+        while not self.stopping.is_set():
+            self.check()
+            auto_start: bool = self.auto_start and not self.force_stopped and self.engine.state == STOPPED
+            interval: float = self.scheduler.next_interval(hidden=True, auto_start=auto_start)
+            metrics.set_gauge('status_poll_interval_seconds', interval)
+            if auto_start and self.scheduler.state == DUE:
+                self.engine.prewarm()
+            self.stopping.wait(interval)
+
+    def stop(self) -> None:
+        self.stopping.set()
+
+    def check(self) -> None:
+        try:
+            snapshot: Optional[StatusSnapshot] = self.poller.poll()
+        except Exception as e:
+            if self.network_error is None:
+                print(f"Could not check for streams: {e}")
+            self.network_error = str(e)
+            self.scheduler.failed()
+            self.poller.reset()
+            return
+        self.network_error = None
+        self.checked = datetime.now()
+        self.scheduler.polled(snapshot)
+        with self.lock:
+            if snapshot is not None:
+                self.snapshot = snapshot
+                print(f"{len(snapshot.streams)} stream{'' if len(snapshot.streams) == 1 else 's'} online")
+            self.update()
+
+    def update(self) -> None:
+        snapshot: Optional[StatusSnapshot] = self.snapshot
+        if snapshot is None:
+            return
+        if not snapshot.online or not snapshot.streams:
+            self.force_stopped = False
+            self.engine.silence_stopped = False
+            if self.engine.state != STOPPED:
+                self.engine.stop()
+        elif self.engine.silence_stopped:
+            self.engine.silence_stopped = False
+            self.force_stopped = True
+        elif self.auto_start and not self.force_stopped and self.engine.state == STOPPED:
+            self.play(snapshot.streams[0])
+
+    def play(self, stream: StreamInfo) -> None:
+        print(f"Playing {stream.title} - {stream.description}")
+        self.force_stopped = False
+        self.engine.play(stream.url, stream.metadata())
+
+    def find_stream(self, name: str) -> Optional[StreamInfo]:
+        streams: 'List[StreamInfo]' = self.snapshot.streams if self.snapshot is not None else []
+        for stream in streams:
+            if name in (stream.url, stream.mount, stream.mount.lstrip('/'), stream.title):
+                return stream
+        return None
+
+    def handle(self, command: str, args: 'List[str]') -> dict:
+        '''
+        handle answers a control socket command.
+
+        Args:
+            command (str): play, stop or status
+            args (list[str]): for play, the mount, title or URL of a stream;
+                the first live stream otherwise
+        '''
+        with self.lock:
+            if command == 'play':
+                stream: Optional[StreamInfo] = self.find_stream(' '.join(args)) if args else None
+                if stream is None and args:
+                    return {'ok': False, 'error': f"No live stream called {' '.join(args)}"}
+                if stream is None:
+                    if self.snapshot is None or not self.snapshot.streams:
+                        return {'ok': False, 'error': 'No streams online'}
+                    stream = self.snapshot.streams[0]
+                self.play(stream)
+                return {'ok': True}
+            if command == 'stop':
+                self.force_stopped = True
+                self.engine.stop()
+                return {'ok': True}
+            if command == 'status':
+                return {'ok': True, **self.status()}
+            if command == 'show':
+                return {'ok': False, 'error': 'The listener is running without a window'}
+        return {'ok': False, 'error': f'Unknown command {command}'}
+
+    def status(self) -> dict:
+        snapshot: Optional[StatusSnapshot] = self.snapshot
+        return {
+            **(snapshot.metadata() if snapshot is not None else {'online': None, 'listeners': None, 'streams': [], 'events': []}),
+            'checked': self.checked.isoformat(timespec='seconds') if self.checked is not None else None,
+            'window': False,
+            'network_error': self.network_error,
+            'polling': self.scheduler.state,
+            'auto_start': self.auto_start,
+            'playback': self.engine.stats(),
+        }
+
+
+def main(argv: Optional['List[str]'] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--no-auto-start', action='store_true', help="don't start live streams by themselves")
+    parser.add_argument('--interval', type=float, default=5, help='seconds between status checks while a stream is starting or an event is due')
+    parser.add_argument('--port', type=int, help=f'control socket port on localhost ({DEFAULT_CONTROL_PORT} by default)')
+    parser.add_argument('--profile', choices=list(PROFILES), default=BALANCED.name, help='playback profile')
+    parser.add_argument('--record', action='store_true', help=f'record live streams to {user_recordings_dir()}')
+    parser.add_argument('--stop-after-silence', type=float, default=0, metavar='MINUTES',
+                        help='stop a live stream that stays silent this long (needs NumPy)')
+    parser.add_argument('--send', nargs='+', metavar='COMMAND', help='send a command to a running listener and exit')
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    lock: InstanceLock = InstanceLock()
+    if args.send:
+        port: int = args.port or lock.port() or DEFAULT_CONTROL_PORT
+        try:
+            print(json.dumps(send_command(' '.join(args.send), port), indent=4))
+        except OSError as e:
+            print(f"No listener is running on port {port}: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    args.port = args.port or DEFAULT_CONTROL_PORT
+    if not lock.acquire(args.port):
+        print(f"A listener is already running, see python headless.py --send status (port {lock.port()})", file=sys.stderr)
+        return 1
+    configure_metrics(args)
+    engine: PlaybackEngine = PlaybackEngine(PROFILES[args.profile])
+    metrics.add_collector(engine.gauges)
+    if args.stop_after_silence:
+        try:
+            engine.set_silence_timeout(args.stop_after_silence * 60)
+        except ImportError:
+            print("Detecting silence needs NumPy: pip install numpy", file=sys.stderr)
+    if args.record:
+        engine.set_recorder(StreamRecorder(user_recordings_dir()))
+    poller: StatusPoller = StatusPoller()
+    listener: HeadlessListener = HeadlessListener(engine, poller, not args.no_auto_start, args.interval)
+    try:
+        server: ControlServer = ControlServer(listener.handle, args.port)
+    except OSError as e:
+        print(f"Could not open the control socket on port {args.port}: {e}", file=sys.stderr)
+        engine.shutdown()
+        poller.close()
+        metrics.close()
+        lock.release()
+        return 1
+    server.start()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: listener.stop())
+    print(f"Listening for commands on 127.0.0.1:{args.port}")
+    try:
+        listener.run()
+    finally:
+        server.close()
+        engine.shutdown()
+        poller.close()
+        metrics.close()
+        lock.release()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
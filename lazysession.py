@@ -0,0 +1,42 @@
+import threading
+from typing import Optional
+
+
+class LazySession:
+    '''
+    Stands in for a requests.Session that is only made, and requests only
+    imported, when the first request goes out. Importing requests takes
+    longer than building the whole window, and nothing is fetched before the
+    window is up.
+
+    Anything else is passed on to the session, so it can be handed to
+    whatever takes a requests.Session. close() before the first request does
+    nothing.
+    '''
+
+    def __init__(self, pool_maxsize: int = 0) -> None:
+        self.pool_maxsize: int = pool_maxsize
+        self.session: Optional['requests.Session'] = None
+        self.lock: threading.Lock = threading.Lock()
+
+    def resolve(self) -> 'requests.Session':
+        with self.lock:
+            if self.session is None:
+                import requests
+
+                session: requests.Session = requests.Session()
+                if self.pool_maxsize:
+                    adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.pool_maxsize)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                self.session = session
+            return self.session
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+
+    def close(self) -> None:
+        with self.lock:
+            session, self.session = self.session, None
+        if session is not None:
+            session.close()
@@ -0,0 +1,59 @@
+import math
+from array import array
+
+import numpy as np
+
+FULL_SCALE: float = 32768
+FLOOR_DB: float = -90
+
+
+def to_db(level: float) -> float:
+    return 20 * math.log10(level) if level > 0 else FLOOR_DB
+
+
+class LevelTracker:
+    '''
+    The RMS and peak level of the audio going to the device, block by block,
+    and for how long it has stayed below threshold_db.
+
+    update runs on the audio thread for every block, so it only does two
+    vectorised reductions over the block and a few float assignments; the
+    values are read from other threads without locking.
+    '''
+
+    def __init__(self, sample_rate: int, threshold_db: float = -50) -> None:
+        self.sample_rate: int = sample_rate
+        self.threshold: float = 10 ** (threshold_db / 20)
+        self.rms: float = 0
+        self.peak: float = 0
+        self.silent_frames: int = 0
+
+    @property
+    def rms_db(self) -> float:
+        return to_db(self.rms)
+
+    @property
+    def peak_db(self) -> float:
+        return to_db(self.peak)
+
+    @property
+    def silent_seconds(self) -> float:
+        return self.silent_frames / self.sample_rate
+
+    def reset(self, sample_rate: int) -> None:
+        self.sample_rate = sample_rate
+        self.rms = 0
+        self.peak = 0
+        self.silent_frames = 0
+
+    def update(self, samples: array, nchannels: int) -> None:
+        pcm: np.ndarray = np.frombuffer(samples, dtype=np.int16).astype(np.float32)
+        if not len(pcm):
+            return
+        rms: float = float(np.sqrt(np.dot(pcm, pcm) / len(pcm))) / FULL_SCALE
+        self.peak = float(np.abs(pcm).max()) / FULL_SCALE
+        self.rms = rms
+        if rms < self.threshold:
+            self.silent_frames += len(pcm) // nchannels
+        else:
+            self.silent_frames = 0
@@ -0,0 +1,77 @@
+import socket
+import threading
+from typing import Optional
+
+import miniaudio
+import requests
+import urllib3
+
+CONNECT_TIMEOUT: float = 5
+READ_TIMEOUT: float = 5
+FORMATS: 'dict[str, miniaudio.FileFormat]' = {
+    'audio/mpeg': miniaudio.FileFormat.MP3,
+    'audio/mp3': miniaudio.FileFormat.MP3,
+    'audio/ogg': miniaudio.FileFormat.VORBIS,
+    'application/ogg': miniaudio.FileFormat.VORBIS,
+    'audio/flac': miniaudio.FileFormat.FLAC,
+    'audio/x-flac': miniaudio.FileFormat.FLAC,
+    'audio/wav': miniaudio.FileFormat.WAV,
+    'audio/x-wav': miniaudio.FileFormat.WAV,
+}
+
+
+class HttpStreamSource(miniaudio.StreamableSource):
+    '''
+    A live Icecast mount read straight off its HTTP response, on the
+    decoder's thread, in place of miniaudio's IceCastClient: that one waits
+    in read() for data forever once the server has closed the connection,
+    and holds back audio until its own buffer is full.
+
+    read() returns whatever has arrived, and b'' once the server closes the
+    connection, nothing arrives for read_timeout seconds or close() is
+    called, so the decoder sees the end of the stream and the session can
+    reconnect.
+    '''
+
+    def __init__(self, url: str, session: Optional[requests.Session] = None,
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT) -> None:
+        self.url: str = url
+        self.session: requests.Session = session or requests.Session()
+        self.closed: threading.Event = threading.Event()
+        self.error: Optional[Exception] = None
+        self.response: requests.Response = self.session.get(url, stream=True, timeout=(connect_timeout, read_timeout))
+        try:
+            self.response.raise_for_status()
+        except requests.RequestException:
+            self.response.close()
+            raise
+        content_type: str = self.response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        self.audio_format: miniaudio.FileFormat = FORMATS.get(content_type, miniaudio.FileFormat.UNKNOWN)
+        self.station_name: Optional[str] = self.response.headers.get('icy-name')
+
+    def read(self, num_bytes: int) -> bytes:
+        if self.closed.is_set():
+            return b''
+        raw = self.response.raw
+        try:
+            # read1 returns what has arrived instead of waiting for num_bytes;
+            # urllib3 before 2.0 doesn't have it.
+            data: bytes = raw.read1(num_bytes) if hasattr(raw, 'read1') else raw.read(num_bytes)
+        except (requests.RequestException, urllib3.exceptions.HTTPError, OSError, ValueError, AttributeError) as e:
+            if not self.closed.is_set():
+                self.error = e
+            return b''
+        return b'' if self.closed.is_set() else data
+
+    def close(self) -> None:
+        self.closed.set()
+        # Shutting the socket down wakes a read blocked on it right away;
+        # closing the response alone waits for the read timeout.
+        connection = getattr(self.response.raw, '_connection', None)
+        sock: Optional[socket.socket] = getattr(connection, 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.response.close()
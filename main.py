@@ -12,32 +12,104 @@ __maintainer__ = "Jared Gross"
 __email__ = "jared@pinelandfarms.ca"
 __status__ = "Production"
 
-import json
+import argparse
 import os
-import re
 import sys
 import threading
-import urllib
-import urllib.request
 import webbrowser
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import partial
 
-import miniaudio
-import qdarktheme
-import requests
-from PyQt5 import uic
-from PyQt5.QtCore import (QCoreApplication, QProcess, QRunnable, QSettings, Qt,
-                          QThreadPool, QTimer, pyqtSignal, pyqtSlot)
-from PyQt5.QtGui import QFont, QIcon, QPalette, QPixmap
-from PyQt5.QtWidgets import (QAction, QActionGroup, QApplication, QDialog,
-                             QGroupBox, QLabel, QLineEdit, QMainWindow, QMenu,
-                             QMessageBox, QPushButton, QScrollArea, QStyle,
-                             QSystemTrayIcon, QTabWidget, QToolButton,
-                             QVBoxLayout, QWidget, qApp)
-from win10toast import ToastNotifier
-
-toaster = ToastNotifier()
+# __name__ holds the app's display name, so look for the entry module directly.
+# --send only talks to the running instance, so it doesn't need Qt either.
+if ('--headless' in sys.argv[1:] or '--send' in sys.argv[1:]) and sys.modules['__main__'].__dict__ is globals():
+    import headless
+    sys.exit(headless.main([arg for arg in sys.argv[1:] if arg != '--headless']))
+
+from profiling import profiler
+
+# miniaudio, win10toast, requests (see lazysession), qdarktheme (see
+# resources) and PyQt5.uic are imported on first use, not here.
+with profiler.phase('import PyQt5'):
+    from PyQt5.QtCore import (QCoreApplication, QDate, QObject, QProcess,
+                              QRunnable, QSettings, Qt, QThreadPool, QTimer,
+                              pyqtSignal, pyqtSlot)
+    from PyQt5.QtGui import QColor, QFont, QIcon, QPainter, QPalette, QPixmap
+    from PyQt5.QtWidgets import (QAction, QActionGroup, QApplication,
+                                 QCheckBox, QComboBox, QDateEdit, QDialog,
+                                 QDialogButtonBox, QFormLayout, QGroupBox,
+                                 QHBoxLayout, QLabel, QLineEdit, QMainWindow,
+                                 QMenu, QMessageBox, QPushButton, QScrollArea,
+                                 QSlider, QSpinBox, QStyle, QSystemTrayIcon,
+                                 QTabWidget, QToolButton, QVBoxLayout, QWidget,
+                                 qApp)
+with profiler.phase('import resources'):
+    from resources import DARK, LIGHT, resources
+with profiler.phase('import app modules'):
+    from archive import ArchiveIndex
+    from audiocache import AudioCache
+    from archive_search import SORT_NAME, SORT_NEWEST, SORT_OLDEST
+    from archive_view import (ArchiveListModel, ArchiveListView,
+                              DownloadLinkRole, FileNameRole)
+    from control import (DEFAULT_CONTROL_PORT, ControlServer, InstanceLock,
+                         send_to_running_instance)
+    from downloads import DOWNLOADING, QUEUED, DownloadManager
+    from metadata import MetadataFetcher
+    from metrics import add_metrics_arguments, configure_metrics, metrics
+    from paths import user_downloads_dir, user_recordings_dir
+    from playback import (BALANCED, BUFFERING, CONNECTING, PROFILES,
+                          RECONNECTING, STOPPED, PlaybackEngine,
+                          PlaybackProfile)
+    from poller import StatusPoller
+    from recorder import StreamRecorder
+    from scheduler import DUE, PollScheduler
+    from status import ICECAST_URL, StatusSnapshot
+
+RELEASES_URL: str = "https://api.github.com/repos/thecodingjsoftware/HBNI-Audio-Stream-Listener/releases/latest"
+ARCHIVE_METADATA_MARGIN: int = 20
+ARCHIVE_METADATA_WORKERS: int = 3
+MAX_DOWNLOADS: int = 3
+MAX_CONNECTIONS: int = 3
+
+toaster = None
+
+
+def show_toast(message: str) -> None:
+    '''
+    Shows a Windows toast notification. win10toast is loaded with the first
+    one rather than at start up.
+    '''
+    global toaster
+    if toaster is None:
+        from win10toast import ToastNotifier
+        toaster = ToastNotifier()
+    toaster.show_toast(__name__,
+                       message,
+                       icon_path='icons/icon.ico',
+                       duration=3,
+                       threaded=True)
+
+
+def fetch_latest_version() -> str:
+    import requests
+
+    response = requests.get(RELEASES_URL, timeout=5)
+    response.raise_for_status()
+    return response.json()["name"].replace(' ', '')
+
+
+class WorkerSignals(QObject):
+    result = pyqtSignal(object)
+    error = pyqtSignal(Exception)
+    finished = pyqtSignal()
+
+
+class PlaybackSignals(QObject):
+    stateChanged = pyqtSignal(str)
+
+
+class ControlSignals(QObject):
+    showRequested = pyqtSignal()
 
 
 class Worker(QRunnable):
@@ -45,10 +117,20 @@ class Worker(QRunnable):
     def __init__(self, fn, *args, **kwargs):
         super(Worker, self).__init__()
         self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
 
     @pyqtSlot()
     def run(self):
-        self.fn()
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(e)
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
 
 
 class ScrollLabel(QScrollArea):
@@ -64,7 +146,8 @@ class ScrollLabel(QScrollArea):
         lay.addWidget(self.label)
 
     def setText(self, text):
-        self.label.setText(text)
+        if text != self.label.text():
+            self.label.setText(text)
 
 class Button(QPushButton):
     entered = pyqtSignal()
@@ -79,18 +162,52 @@ class Button(QPushButton):
         self.leaved.emit()
 
 
+class LevelMeter(QWidget):
+    '''
+    A horizontal bar showing the RMS level of what is playing, with a tick
+    for the peak, from FLOOR_DB to 0 dBFS. Both fall back slowly rather
+    than jumping, so the meter is readable at 20 updates a second.
+    '''
+    FLOOR_DB: float = -60
+    FALL_DB: float = 1.5
+
+    def __init__(self, parent=None):
+        super(LevelMeter, self).__init__(parent)
+        self.rms_db: float = self.FLOOR_DB
+        self.peak_db: float = self.FLOOR_DB
+        self.setFixedHeight(10)
+        self.setMinimumWidth(200)
+
+    def setLevels(self, rms_db: float, peak_db: float) -> None:
+        self.rms_db = max(rms_db, self.rms_db - self.FALL_DB, self.FLOOR_DB)
+        self.peak_db = max(peak_db, self.peak_db - self.FALL_DB / 2, self.FLOOR_DB)
+        self.update()
+
+    def fraction(self, db: float) -> float:
+        return min(max((db - self.FLOOR_DB) / -self.FLOOR_DB, 0), 1)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().color(QPalette.Base))
+        color = QColor('#3cb043') if self.rms_db < -12 else QColor('#e8b923') if self.rms_db < -3 else QColor('#d0312d')
+        painter.fillRect(0, 0, int(self.width() * self.fraction(self.rms_db)), self.height(), color)
+        x: int = int((self.width() - 2) * self.fraction(self.peak_db))
+        painter.fillRect(x, 0, 2, self.height(), self.palette().color(QPalette.Text))
+        painter.end()
+
+
 class licensewindowUI(QDialog):
     def __init__(self):
         super(licensewindowUI, self).__init__()
+        from PyQt5 import uic
+
         uic.loadUi('license.ui', self)
         self.setWindowTitle(__name__)
         self.settings = QSettings("A", "B")
-        self.setWindowIcon(QIcon('icons/icon.png'))
+        self.setWindowIcon(resources.icon('icons/icon.png'))
         self.icon = self.findChild(QLabel, 'lblIcon')
         self.icon.setFixedSize(128, 128)
-        pixmap = QPixmap('icons/icon.png')
-        myScaledPixmap = pixmap.scaled(self.icon.size(), Qt.KeepAspectRatio)
-        self.icon.setPixmap(myScaledPixmap)
+        self.icon.setPixmap(resources.pixmap('icons/icon.png', 128))
         self.lisenceText = self.findChild(QLabel, 'label_2')
         with open('LICENSE', 'r') as f:
             self.lisenceText.setText(f.read())
@@ -104,33 +221,130 @@ class licensewindowUI(QDialog):
             self.toggle_lighttheme()
 
     def toggle_darktheme(self):
-        self.setStyleSheet(qdarktheme.load_stylesheet())
+        self.setStyleSheet(resources.stylesheet(DARK))
 
     def toggle_lighttheme(self):
-        self.setStyleSheet(qdarktheme.load_stylesheet("light"))
+        self.setStyleSheet(resources.stylesheet(LIGHT))
+
+
+class PlaybackProfileDialog(QDialog):
+    FIELDS: 'list[tuple[str, str, int, int, int]]' = [
+        ('buffer_msec', 'Jitter buffer (ms)', 100, 30000, 100),
+        ('prefill_msec', 'Prefill before playing (ms)', 0, 30000, 50),
+        ('device_buffer_msec', 'Device buffer (ms)', 5, 2000, 5),
+        ('device_periods', 'Device periods (0 = default)', 0, 16, 1),
+        ('frames_to_read', 'Decode chunk (frames)', 128, 16384, 128),
+        ('sample_rate', 'Sample rate (Hz)', 8000, 96000, 100),
+    ]
+
+    def __init__(self, profile: PlaybackProfile, parent=None):
+        super(PlaybackProfileDialog, self).__init__(parent)
+        self.setWindowTitle('Custom playback profile')
+        self.spinBoxes: 'dict[str, QSpinBox]' = {}
+        layout = QFormLayout(self)
+        for field, label, minimum, maximum, step in self.FIELDS:
+            spinBox = QSpinBox(self)
+            spinBox.setRange(minimum, maximum)
+            spinBox.setSingleStep(step)
+            spinBox.setValue(getattr(profile, field))
+            self.spinBoxes[field] = spinBox
+            layout.addRow(label, spinBox)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, parent=self)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+
+    def profile(self) -> PlaybackProfile:
+        values: 'dict[str, int]' = {field: spinBox.value() for field, spinBox in self.spinBoxes.items()}
+        values['prefill_msec'] = min(values['prefill_msec'], values['buffer_msec'])
+        return PlaybackProfile('Custom', **values)
+
+
+class DownloadSettingsDialog(QDialog):
+    def __init__(self, maxDownloads: int, connections: int, rateLimit: int, parent=None):
+        super(DownloadSettingsDialog, self).__init__(parent)
+        self.setWindowTitle('Download settings')
+        layout = QFormLayout(self)
+        # Every connection holds a thread of the transfer pool for the whole
+        # download; the pool is sized for the largest values allowed here.
+        self.spinMaxDownloads = QSpinBox(self)
+        self.spinMaxDownloads.setRange(1, MAX_DOWNLOADS)
+        self.spinMaxDownloads.setValue(maxDownloads)
+        layout.addRow('Files at a time', self.spinMaxDownloads)
+        self.spinConnections = QSpinBox(self)
+        self.spinConnections.setRange(1, MAX_CONNECTIONS)
+        self.spinConnections.setValue(connections)
+        layout.addRow('Connections per file', self.spinConnections)
+        self.spinRateLimit = QSpinBox(self)
+        self.spinRateLimit.setRange(0, 100000)
+        self.spinRateLimit.setSingleStep(50)
+        self.spinRateLimit.setSpecialValueText('Unlimited')
+        self.spinRateLimit.setSuffix(' KB/s')
+        self.spinRateLimit.setValue(rateLimit)
+        layout.addRow('Bandwidth limit', self.spinRateLimit)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel, parent=self)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
 
 
 class MainWindow(QMainWindow):
     def __init__(self, *args, **kwargs):
         super(MainWindow, self).__init__(*args, **kwargs)
-        self.hbni_html: str
+        self.statusSnapshot: StatusSnapshot
         self.active_events: str
         self.active_listeners: str
-        self.active_streams: str
         self.threadpool: QThreadPool() = QThreadPool()
         self.threadpool.setMaxThreadCount(12)
+        # Downloads and archive metadata lookups hold their threads for long
+        # stretches, so they get their own pool and can't hold up polling.
+        self.transferPool: QThreadPool() = QThreadPool()
+        self.transferPool.setMaxThreadCount(MAX_DOWNLOADS * MAX_CONNECTIONS + ARCHIVE_METADATA_WORKERS)
         self.startTime: datetime.now() = datetime.now()
         self.currentTime: datetime.now() = datetime.now()
         self.settings = QSettings("A", "B")
         self.streamPlaying: bool = False
+        self.mixedStreams: 'list[str]' = []
+        self.archivePlaying: bool = False
         self.streamsOnline: bool = False
         self.streamsForceStop: bool = False
         self.enabledNotifications: bool = True
         self.darkThemeEnabled: bool = False
         self.isFullScreen: bool = False
+        self.statusPoller: StatusPoller = StatusPoller()
+        self.checkingForWebsiteChanges: bool = False
+        self.pollScheduler: PollScheduler = PollScheduler()
+        self.networkError: bool = False
+        self.statusChecked: datetime = None
+        self.controlServer: ControlServer = None
+        self.controlSignals: ControlSignals = ControlSignals()
+        self.controlSignals.showRequested.connect(self.bring_to_front)
+        self.archiveIndex: ArchiveIndex = ArchiveIndex()
+        self.refreshingArchiveIndex: bool = False
+        self.downloadManager: DownloadManager = DownloadManager(
+            user_downloads_dir(),
+            lambda fn: self.transferPool.start(Worker(fn)),
+            max_downloads=self.settings.value("Download files at a time", 2, type=int),
+            connections=self.settings.value("Download connections per file", 3, type=int),
+            rate_limit=self.settings.value("Download bandwidth limit", 0, type=int) * 1024)
+        self.downloadsResumed: bool = False
+        self.metadataFetcher: MetadataFetcher = MetadataFetcher(
+            lambda fn: self.transferPool.start(Worker(fn)),
+            self.archiveIndex.download_link,
+            workers=ARCHIVE_METADATA_WORKERS)
+        self.playbackEngine: PlaybackEngine = PlaybackEngine(self.load_playback_profile())
+        metrics.add_collector(self.playbackEngine.gauges)
+        self.audioCache: AudioCache = AudioCache(budget=self.settings.value("Archive cache size", 1024, type=int) * 1024 * 1024)
+        metrics.add_collector(self.audioCache.gauges)
+        if self.audioCache.budget:
+            self.playbackEngine.set_audio_cache(self.audioCache)
+        self.playbackSignals: PlaybackSignals = PlaybackSignals()
+        self.playbackSignals.stateChanged.connect(self.playback_state_changed)
+        self.playbackEngine.add_listener(self.playbackSignals.stateChanged.emit)
+        self.archiveLoaded: bool = False
 
         self.tabWidget: QTabWidget() = QTabWidget()
-        self.tabWidget.tabBarClicked.connect(self.loadArchive)
+        self.tabWidget.tabBarClicked.connect(self.tab_clicked)
         self.tabWidget.setMovable(True)
         self.tabWidget.setStyleSheet("QTabBar{font-size: 12pt} QTabBar::tab { width: 150px; height: 25px} QTabWidget::tab-bar{alignment: center}")
 
@@ -139,22 +353,38 @@ class MainWindow(QMainWindow):
 
         self.tabWidget.addTab(self.streamsTab, "Streams/Events Tab")
         self.tabWidget.addTab(self.archivesTab, "Archives Tab")
-        self.loadStreamsLayoutTab()
-        self.loadArchivesLayoutTab()
-        self._extracted_from_toggle_lighttheme_10()
-        self.loadFileMenu()
-        self.loadTrayMenu()
+        with profiler.phase('MainWindow: tabs'):
+            self.loadStreamsLayoutTab()
+            self.loadArchivesLayoutTab()
+            self.update_logos()
+        with profiler.phase('MainWindow: menus and theme'):
+            self.loadFileMenu()
         self.setCentralWidget(self.tabWidget)
-        self.check_for_updates(on_start_up=True)
         self.setMinimumSize(400, 700)
+        with profiler.phase('MainWindow: tray and show'):
+            self.loadTrayMenu()
+        # Network work waits until the window has been painted.
+        QTimer.singleShot(0, self.start_background_work)
 
     def loadStreamsLayoutTab(self):
         streamsLayout: QVBoxLayout() = QVBoxLayout()
 
         self.layoutStreams: QVBoxLayout() = QVBoxLayout()
+        self.layoutStreamButtons: QVBoxLayout() = QVBoxLayout()
+        self.layoutStreams.addLayout(self.layoutStreamButtons)
+        self.streamButtons: 'dict[str, Button]' = {}
+
+        self.lblEvents: ScrollLabel() = ScrollLabel()
+        self.lblEvents.setVisible(False)
+        self.layoutStreams.addWidget(self.lblEvents)
+
+        self.lblNetworkError: ScrollLabel() = ScrollLabel()
+        self.lblNetworkError.setText('<h3>Check if you are connected to the internet or logged into your network.</h3>')
+        self.lblNetworkError.setVisible(False)
+        self.layoutStreams.addWidget(self.lblNetworkError)
 
         self.setWindowTitle(__name__)
-        self.setWindowIcon(QIcon('icons/icon.png'))
+        self.setWindowIcon(resources.icon('icons/icon.png'))
 
         self.hbnilogo: QLabel() = QLabel()
         self.hbnilogo.setAlignment(Qt.AlignCenter | Qt.AlignTop)
@@ -175,6 +405,23 @@ class MainWindow(QMainWindow):
 
         streamsLayout.addWidget(self.lblActiveListeners)
 
+        self.levelMeter: LevelMeter = LevelMeter()
+        self.levelMeter.setVisible(False)
+        streamsLayout.addWidget(self.levelMeter, alignment=Qt.AlignCenter)
+        self.timerLevelMeter: QTimer = QTimer(self)
+        self.timerLevelMeter.setInterval(50)
+        self.timerLevelMeter.timeout.connect(self.update_level_meter)
+
+        # Connect to a stream once the mouse rests on its button, not while it passes over.
+        self.hoveredStream: str = None
+        self.timerPrewarm: QTimer = QTimer(self)
+        self.timerPrewarm.setSingleShot(True)
+        self.timerPrewarm.setInterval(150)
+        self.timerPrewarm.timeout.connect(self.prewarm_hovered_stream)
+
+        self.layoutMixer: QVBoxLayout() = QVBoxLayout()
+        streamsLayout.addLayout(self.layoutMixer)
+
         self.btnKillAllStreams: Button = Button(' Stop')
         self.btnKillAllStreams.clicked.connect(partial(self.kill_all_threads,
                                                        True))
@@ -191,7 +438,7 @@ class MainWindow(QMainWindow):
 
 
         self.setWindowTitle(__name__)
-        self.setWindowIcon(QIcon('icons/icon.png'))
+        self.setWindowIcon(resources.icon('icons/icon.png'))
 
         self.hbnilogo2: QLabel() = QLabel()
         self.hbnilogo2.setAlignment(Qt.AlignCenter | Qt.AlignTop)
@@ -204,21 +451,83 @@ class MainWindow(QMainWindow):
         l: QLabel() = QLabel("Search:")
         archivesLayout.addWidget(l)
 
+        self.timerArchiveSearch: QTimer = QTimer(self)
+        self.timerArchiveSearch.setSingleShot(True)
+        self.timerArchiveSearch.setInterval(150)
+        self.timerArchiveSearch.timeout.connect(self.search_archive)
+
         self.inputArchiveSearch: QLineEdit() = QLineEdit(self)
-        self.inputArchiveSearch.returnPressed.connect(self.loadArchive)
+        self.inputArchiveSearch.setPlaceholderText('Location, speaker or date')
+        self.inputArchiveSearch.textChanged.connect(self.timerArchiveSearch.start)
+        self.inputArchiveSearch.returnPressed.connect(self.search_archive)
         self.inputArchiveSearch.setFont(QFont('Arial', 14))
         archivesLayout.addWidget(self.inputArchiveSearch)
 
-        scroll = QScrollArea(self)
-        scroll.setWidgetResizable(True)
-        scrollContent = QWidget(scroll)
-
-        self.layoutArchive: QVBoxLayout(scrollContent) = QVBoxLayout(scrollContent)
-        self.layoutArchive.setStretch(11, 1)
-        scrollContent.setLayout(self.layoutArchive)
-
-        scroll.setWidget(scrollContent)
-        archivesLayout.addWidget(scroll)
+        layoutArchiveFilters: QHBoxLayout() = QHBoxLayout()
+        self.checkArchiveDates: QCheckBox() = QCheckBox('From')
+        self.checkArchiveDates.toggled.connect(self.search_archive)
+        layoutArchiveFilters.addWidget(self.checkArchiveDates)
+        self.inputArchiveDateFrom: QDateEdit() = QDateEdit(QDate.currentDate().addMonths(-1))
+        self.inputArchiveDateTo: QDateEdit() = QDateEdit(QDate.currentDate())
+        for inputDate in (self.inputArchiveDateFrom, self.inputArchiveDateTo):
+            inputDate.setCalendarPopup(True)
+            inputDate.setDisplayFormat('yyyy-MM-dd')
+            inputDate.setEnabled(False)
+            inputDate.dateChanged.connect(self.search_archive)
+            self.checkArchiveDates.toggled.connect(inputDate.setEnabled)
+        layoutArchiveFilters.addWidget(self.inputArchiveDateFrom)
+        layoutArchiveFilters.addWidget(QLabel('to'))
+        layoutArchiveFilters.addWidget(self.inputArchiveDateTo)
+        layoutArchiveFilters.addStretch()
+        self.comboArchiveSort: QComboBox() = QComboBox()
+        self.comboArchiveSort.addItem('Newest first', SORT_NEWEST)
+        self.comboArchiveSort.addItem('Oldest first', SORT_OLDEST)
+        self.comboArchiveSort.addItem('By name', SORT_NAME)
+        self.comboArchiveSort.currentIndexChanged.connect(self.search_archive)
+        layoutArchiveFilters.addWidget(self.comboArchiveSort)
+        archivesLayout.addLayout(layoutArchiveFilters)
+
+        self.archiveModel: ArchiveListModel = ArchiveListModel(self.archiveIndex, self.downloadManager,
+                                                               self.metadataFetcher, self)
+
+        self.archiveView: ArchiveListView = ArchiveListView(self)
+        self.archiveView.setModel(self.archiveModel)
+        self.archiveView.clicked.connect(self.archive_clicked)
+        self.archiveView.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.archiveView.customContextMenuRequested.connect(self.archive_context_menu)
+        archivesLayout.addWidget(self.archiveView)
+
+        # Look up the details of the rows on screen once scrolling pauses.
+        self.timerArchiveMetadata: QTimer = QTimer(self)
+        self.timerArchiveMetadata.setSingleShot(True)
+        self.timerArchiveMetadata.setInterval(100)
+        self.timerArchiveMetadata.timeout.connect(self.request_archive_metadata)
+        self.archiveView.verticalScrollBar().valueChanged.connect(lambda *_: self.timerArchiveMetadata.start())
+        self.archiveView.verticalScrollBar().rangeChanged.connect(lambda *_: self.timerArchiveMetadata.start())
+        self.archiveModel.modelReset.connect(lambda: self.timerArchiveMetadata.start())
+        self.timerArchiveMetadataProgress: QTimer = QTimer(self)
+        self.timerArchiveMetadataProgress.setInterval(250)
+        self.timerArchiveMetadataProgress.timeout.connect(self.update_archive_metadata)
+
+        self.archivePlayer: QWidget() = QWidget()
+        layoutArchivePlayer: QHBoxLayout() = QHBoxLayout(self.archivePlayer)
+        layoutArchivePlayer.setContentsMargins(0, 0, 0, 0)
+        self.lblArchiveNowPlaying: QLabel() = QLabel()
+        layoutArchivePlayer.addWidget(self.lblArchiveNowPlaying)
+        self.sliderArchivePosition: QSlider() = QSlider(Qt.Horizontal)
+        self.sliderArchivePosition.sliderReleased.connect(self.seek_archive)
+        layoutArchivePlayer.addWidget(self.sliderArchivePosition, stretch=1)
+        self.lblArchivePosition: QLabel() = QLabel()
+        layoutArchivePlayer.addWidget(self.lblArchivePosition)
+        self.btnArchiveStop: QPushButton() = QPushButton('Stop')
+        self.btnArchiveStop.clicked.connect(self.stop_archive)
+        layoutArchivePlayer.addWidget(self.btnArchiveStop)
+        self.archivePlayer.setVisible(False)
+        archivesLayout.addWidget(self.archivePlayer)
+
+        self.timerDownloadProgress: QTimer = QTimer(self)
+        self.timerDownloadProgress.setInterval(500)
+        self.timerDownloadProgress.timeout.connect(self.update_download_progress)
 
         self.archivesTab.setLayout(archivesLayout)
 
@@ -263,6 +572,58 @@ class MainWindow(QMainWindow):
                                          checkBox))
         settingsMenu.addAction(checkBox)
 
+        checkBox = QAction('Record while listening', self, checkable=True)
+        checkBox.setChecked(self.settings.value("Record while listening") == 'true')
+        checkBox.setToolTip(f'Saves live streams to {user_recordings_dir()}')
+        checkBox.toggled.connect(partial(self.saved_toggle_menu_settings,
+                                         checkBox))
+        settingsMenu.addAction(checkBox)
+        self.update_recorder(checkBox.isChecked())
+
+        settingsMenu.addSeparator()
+        profileMenu = QMenu("Playback profile", self)
+        self.playbackProfileActions = QActionGroup(self)
+        for name in [*PROFILES, 'Custom']:
+            action = QAction(name if name != 'Custom' else 'Custom...', self, checkable=True)
+            action.setChecked(name == self.playbackEngine.profile.name)
+            action.triggered.connect(partial(self.select_playback_profile, name))
+            self.playbackProfileActions.addAction(action)
+            profileMenu.addAction(action)
+        settingsMenu.addMenu(profileMenu)
+
+        silenceMenu = QMenu("Stop streams after silence", self)
+        self.silenceTimeout: int = self.settings.value("Stop after silence", 0, type=int)
+        self.silenceTimeoutActions = QActionGroup(self)
+        for minutes in (0, 5, 15, 30, 60):
+            action = QAction(f'{minutes} minutes' if minutes else 'Never', self, checkable=True)
+            action.setChecked(minutes == self.silenceTimeout)
+            action.triggered.connect(partial(self.select_silence_timeout, minutes))
+            self.silenceTimeoutActions.addAction(action)
+            silenceMenu.addAction(action)
+        settingsMenu.addMenu(silenceMenu)
+
+        cacheMenu = QMenu("Keep played archives", self)
+        self.audioCacheActions = QActionGroup(self)
+        for megabytes in (0, 256, 1024, 4096, 16384):
+            action = QAction(f'Up to {megabytes // 1024} GB' if megabytes >= 1024 else f'Up to {megabytes} MB' if megabytes else 'Off', self, checkable=True)
+            action.setChecked(megabytes * 1024 * 1024 == self.audioCache.budget)
+            action.triggered.connect(partial(self.select_audio_cache_size, megabytes))
+            self.audioCacheActions.addAction(action)
+            cacheMenu.addAction(action)
+        cacheMenu.addSeparator()
+        actionClearAudioCache = QAction('Clear', self)
+        actionClearAudioCache.triggered.connect(self.clear_audio_cache)
+        cacheMenu.addAction(actionClearAudioCache)
+        settingsMenu.addMenu(cacheMenu)
+
+        actionDownloadSettings = QAction('Download settings...', self)
+        actionDownloadSettings.triggered.connect(self.open_download_settings)
+        settingsMenu.addAction(actionDownloadSettings)
+
+        actionPlaybackStatistics = QAction('Playback statistics', self)
+        actionPlaybackStatistics.triggered.connect(self.open_playback_statistics)
+        settingsMenu.addAction(actionPlaybackStatistics)
+
         helpMenu = QMenu("Help", self)
         actionAbout_Qt = QAction('About Qt', self)
         actionAbout_Qt.triggered.connect(qApp.aboutQt)
@@ -300,7 +661,7 @@ class MainWindow(QMainWindow):
 
     def loadTrayMenu(self):
         self.tray_icon = QSystemTrayIcon(self)
-        self.tray_icon.setIcon(QIcon("icons/icon.png"))
+        self.tray_icon.setIcon(resources.icon("icons/icon.png"))
         show_action = QAction("Show", self)
         quit_action = QAction("Exit", self)
         show_action.triggered.connect(self.show)
@@ -311,12 +672,10 @@ class MainWindow(QMainWindow):
         self.tray_icon.setContextMenu(tray_menu)
         self.tray_icon.show()
 
-        self.check_for_website_changes()
-
+        # Started again after every check, by schedule_website_check.
         self.timerCheckForStreams = QTimer()
-        self.timerCheckForStreams.setInterval(5000)
+        self.timerCheckForStreams.setSingleShot(True)
         self.timerCheckForStreams.timeout.connect(self.check_for_website_changes)
-        self.timerCheckForStreams.start()
 
         self.timerUpdateTimer = QTimer()
         self.timerUpdateTimer.setInterval(1000)
@@ -328,25 +687,77 @@ class MainWindow(QMainWindow):
             self.settings.setValue("fullscreen", False)
         else:
             self.isFullScreen = self.settings.value("fullscreen") == 'true'
-            if self.isFullScreen:
-                self.show()
-                self.showFullScreen()
-            else:
-                self.load_geometry()
-                self.show()
+        if self.isFullScreen:
+            self.show()
+            self.showFullScreen()
+        else:
+            self.load_geometry()
+            self.show()
+
+    def start_background_work(self) -> None:
+        profiler.mark('window shown')
+        self.threadpool.start(Worker(resources.precompute_stylesheets))
+        self.check_for_website_changes()
+        self.load_archive_index()
+        self.check_for_updates(on_start_up=True)
+        profiler.report()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Catch up straight away if the window was hidden through a long wait.
+        interval: int = int(self.pollScheduler.next_interval() * 1000)
+        if self.timerCheckForStreams.isActive() and self.timerCheckForStreams.remainingTime() > interval:
+            self.timerCheckForStreams.start(interval)
 
     def closeEvent(self, event):
-        try:
-            self.timerUpdateTimer.stop()
-            self.timerCheckForStreams.stop()
-            self.device.stop()
-        except AttributeError:
-            pass
+        if self.controlServer is not None:
+            self.controlServer.close()
+        self.statusPoller.close()
+        self.archiveIndex.close()
+        self.downloadManager.close()
+        self.metadataFetcher.close()
+        self.playbackEngine.shutdown()
+        self.audioCache.close()
+        metrics.close()
         self.timerUpdateTimer.stop()
         self.timerCheckForStreams.stop()
         self.save_geometry()
         super().closeEvent(event)
 
+    def start_control_server(self, port: int) -> None:
+        try:
+            self.controlServer = ControlServer(self.handle_control_command, port)
+        except OSError as e:
+            print(f"Could not open the control socket on port {port}: {e}")
+            return
+        self.controlServer.start()
+
+    def handle_control_command(self, command: str, args: 'list[str]') -> dict:
+        # Runs on the control socket's threads: it may only read and emit signals.
+        if command == 'show':
+            self.controlSignals.showRequested.emit()
+            return {'ok': True}
+        if command == 'status':
+            snapshot: StatusSnapshot = getattr(self, 'statusSnapshot', None)
+            return {
+                'ok': True,
+                **(snapshot.metadata() if snapshot is not None else {'online': None, 'listeners': None, 'streams': [], 'events': []}),
+                'checked': self.statusChecked.isoformat(timespec='seconds') if self.statusChecked is not None else None,
+                'window': True,
+                'network_error': self.networkError,
+                'polling': self.pollScheduler.state,
+                'playback': self.playbackEngine.stats(),
+            }
+        return {'ok': False, 'error': f'Unknown command {command}'}
+
+    def bring_to_front(self) -> None:
+        if self.isFullScreen:
+            self.showFullScreen()
+        else:
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
     def save_geometry(self):
         self.settings.setValue("geometry", self.saveGeometry())
 
@@ -367,30 +778,34 @@ class MainWindow(QMainWindow):
                                 QMessageBox.Ok)
 
     def check_for_updates(self, on_start_up: bool = False) -> None:
-        try:
-            response = requests.get("https://api.github.com/repos/thecodingjsoftware/HBNI-Audio-Stream-Listener/releases/latest")
-            version: str = response.json()["name"].replace(' ', '')
-            if version != __version__:
-                QMessageBox.information(self,
-                                        __name__,
-                                        "There is a new update available",
-                                        QMessageBox.Ok,
-                                        QMessageBox.Ok)
-            elif not on_start_up:
-                QMessageBox.information(self,
-                                        __name__,
-                                        "There are currently no updates available.",
-                                        QMessageBox.Ok,
-                                        QMessageBox.Ok)
-        except Exception as e:
-            if not on_start_up:
-                QMessageBox.information(
-                    self,
-                    __name__,
-                    f'Error!\n\n{e}',
-                    QMessageBox.Ok,
-                    QMessageBox.Ok,
-                )
+        worker = Worker(fetch_latest_version)
+        worker.signals.result.connect(partial(self.update_checked, on_start_up))
+        worker.signals.error.connect(partial(self.update_check_failed, on_start_up))
+        self.threadpool.start(worker)
+
+    def update_checked(self, on_start_up: bool, version: str) -> None:
+        if version != __version__:
+            QMessageBox.information(self,
+                                    __name__,
+                                    "There is a new update available",
+                                    QMessageBox.Ok,
+                                    QMessageBox.Ok)
+        elif not on_start_up:
+            QMessageBox.information(self,
+                                    __name__,
+                                    "There are currently no updates available.",
+                                    QMessageBox.Ok,
+                                    QMessageBox.Ok)
+
+    def update_check_failed(self, on_start_up: bool, error: Exception) -> None:
+        if not on_start_up:
+            QMessageBox.information(
+                self,
+                __name__,
+                f'Error!\n\n{error}',
+                QMessageBox.Ok,
+                QMessageBox.Ok,
+            )
 
     def open_license_window(self) -> None:
         self.licenseUI = licensewindowUI()
@@ -398,12 +813,109 @@ class MainWindow(QMainWindow):
 
     def saved_toggle_menu_settings(self, checkBox: QAction()) -> None:
         self.settings.setValue(checkBox.text(), checkBox.isChecked())
-        self.btnKillAllStreams.setIcon(QIcon('icons/stop_black.png'))
         if checkBox.text() == 'Dark theme':
             if checkBox.isChecked():
                 self.toggle_darktheme()
             elif not checkBox.isChecked():
                 self.toggle_lighttheme()
+        elif checkBox.text() == 'Record while listening':
+            self.update_recorder(checkBox.isChecked())
+
+    def update_recorder(self, enabled: bool) -> None:
+        self.playbackEngine.set_recorder(StreamRecorder(user_recordings_dir()) if enabled else None)
+
+    def load_playback_profile(self) -> PlaybackProfile:
+        name: str = self.settings.value("Playback profile", BALANCED.name)
+        if name in PROFILES:
+            return PROFILES[name]
+        try:
+            return PlaybackProfile('Custom', **{field: self.settings.value(f"Custom playback profile/{field}", getattr(BALANCED, field), type=int)
+                                                for field, *_ in PlaybackProfileDialog.FIELDS})
+        except (TypeError, ValueError):
+            return BALANCED
+
+    def select_playback_profile(self, name: str) -> None:
+        if name in PROFILES:
+            profile: PlaybackProfile = PROFILES[name]
+        else:
+            dialog = PlaybackProfileDialog(self.playbackEngine.profile, self)
+            if dialog.exec_() != QDialog.Accepted:
+                for action in self.playbackProfileActions.actions():
+                    action.setChecked(action.text().rstrip('.') == self.playbackEngine.profile.name)
+                return
+            profile = dialog.profile()
+            for field, *_ in PlaybackProfileDialog.FIELDS:
+                self.settings.setValue(f"Custom playback profile/{field}", getattr(profile, field))
+        self.settings.setValue("Playback profile", profile.name)
+        self.playbackEngine.set_profile(profile)
+
+    def select_silence_timeout(self, minutes: int) -> None:
+        try:
+            self.playbackEngine.set_silence_timeout(minutes * 60)
+        except ImportError:
+            QMessageBox.warning(self, 'Stop streams after silence', 'Detecting silence needs NumPy: pip install numpy')
+            minutes = 0
+            self.silenceTimeoutActions.actions()[0].setChecked(True)
+        self.silenceTimeout = minutes
+        self.settings.setValue("Stop after silence", minutes)
+
+    def select_audio_cache_size(self, megabytes: int) -> None:
+        self.settings.setValue("Archive cache size", megabytes)
+        self.playbackEngine.set_audio_cache(self.audioCache if megabytes else None)
+        self.threadpool.start(Worker(self.audioCache.set_budget, megabytes * 1024 * 1024))
+
+    def clear_audio_cache(self) -> None:
+        self.threadpool.start(Worker(self.audioCache.clear))
+
+    def start_level_meter(self) -> None:
+        '''
+        start_level_meter turns on level tracking (and silence detection if
+        it is set) with the first stream played, keeping NumPy out of start
+        up. Without NumPy there is simply no meter.
+        '''
+        try:
+            self.playbackEngine.enable_levels()
+            self.playbackEngine.set_silence_timeout(self.silenceTimeout * 60)
+        except ImportError:
+            return
+        self.levelMeter.setVisible(True)
+        self.timerLevelMeter.start()
+
+    def stop_level_meter(self) -> None:
+        self.timerLevelMeter.stop()
+        self.levelMeter.setLevels(LevelMeter.FLOOR_DB, LevelMeter.FLOOR_DB)
+        self.levelMeter.setVisible(False)
+
+    def update_level_meter(self) -> None:
+        tracker = self.playbackEngine.level_tracker
+        if tracker is None or not self.isVisible():
+            return
+        self.levelMeter.setLevels(tracker.rms_db, tracker.peak_db)
+        silent: int = int(tracker.silent_seconds)
+        self.levelMeter.setToolTip(f'Silent for {timedelta(seconds=silent)}' if silent >= 10 else f'{tracker.rms_db:.0f} dB')
+
+    def open_playback_statistics(self) -> None:
+        stats: dict = self.playbackEngine.stats()
+        latency = stats['start_latency_msec']
+        average = stats['average_start_latency_msec']
+        warm = stats['average_warm_start_latency_msec']
+        warm_line: str = '' if warm is None else f"Click to first sample after hovering: {warm} ms average\n"
+        cache: dict = self.audioCache.stats()
+        QMessageBox.information(self,
+                                __name__,
+                                f"Profile: {stats['profile']}\n"
+                                f"State: {stats['state']}\n"
+                                f"Click to first sample: {'-' if latency is None else f'{latency} ms'}"
+                                f"{'' if average is None else f' (average {average} ms)'}\n"
+                                f"{warm_line}"
+                                f"Buffered: {stats['buffered_msec']} of {stats['buffer_capacity_msec']} ms\n"
+                                f"Steady-state buffer depth: {stats['buffer_depth_msec']} ms\n"
+                                f"Underruns: {stats['underruns']}\n"
+                                f"Reconnects: {stats['reconnects']}\n"
+                                f"Archive cache: {cache['bytes'] // (1024 * 1024)} of {cache['budget'] // (1024 * 1024)} MB, "
+                                f"{cache['hits']} hits, {cache['misses']} misses, {cache['bytes_saved'] // (1024 * 1024)} MB not downloaded again",
+                                QMessageBox.Ok,
+                                QMessageBox.Ok)
 
     def toggle_fullscreen(self):
         if self.isFullScreen:
@@ -415,24 +927,22 @@ class MainWindow(QMainWindow):
 
     def toggle_darktheme(self) -> None:
         self.darkThemeEnabled = True
-        logo: QPixmap = QPixmap('icons/hbni_logo_dark.png')
-        self.btnKillAllStreams.setIcon(QIcon('icons/stop_white.png'))
-        self._extracted_from__extracted_from_toggle_lighttheme_10_5(logo)
-        self.setStyleSheet(qdarktheme.load_stylesheet())
+        self.apply_theme(DARK)
 
     def toggle_lighttheme(self) -> None:
         self.darkThemeEnabled = False
-        self._extracted_from_toggle_lighttheme_10()
-        self.setStyleSheet(qdarktheme.load_stylesheet("light"))
-
-    # TODO Rename this here and in `loadStreamsLayoutTab` and `toggle_lighttheme`
-    def _extracted_from_toggle_lighttheme_10(self):
-        logo: QPixmap = QPixmap('icons/hbni_logo_light.png')
-        self._extracted_from__extracted_from_toggle_lighttheme_10_5(logo)
-
-    # TODO Rename this here and in `toggle_darktheme` and `_extracted_from_toggle_lighttheme_10`
-    def _extracted_from__extracted_from_toggle_lighttheme_10_5(self, logo):
-        logo = logo.scaled(200, 200, Qt.KeepAspectRatio)
+        self.apply_theme(LIGHT)
+
+    def apply_theme(self, theme: str) -> None:
+        resources.set_theme(theme)
+        self.update_logos()
+        self.btnKillAllStreams.setIcon(resources.icon('icons/stop_{color}.png'))
+        self.update_stream_button_icons()
+        self.archiveView.setIcon(resources.icon('icons/download_{color}.png'))
+        self.setStyleSheet(resources.stylesheet())
+
+    def update_logos(self) -> None:
+        logo: QPixmap = resources.pixmap('icons/hbni_logo_{theme}.png', 200)
         self.hbnilogo.setPixmap(logo)
         self.hbnilogo2.setPixmap(logo)
 
@@ -446,201 +956,435 @@ class MainWindow(QMainWindow):
                 else:
                     self.clearLayout(item.layout())
 
-    def play_stream(self, stream_link: str) -> None:
-        try:
-            with miniaudio.IceCastClient(stream_link) as source:
-                stream = miniaudio.stream_any(source, source.audio_format)
-                with miniaudio.PlaybackDevice() as self.device:
-                    self.device.start(stream)
-                    input()
-        except Exception:
-            pass
+    def stream_metadata(self, stream_link: str) -> 'dict[str, object]':
+        for stream in self.statusSnapshot.streams:
+            if stream.url == stream_link:
+                return stream.metadata()
+        return {}
+
+    def stream_hovered(self, stream_link: str) -> None:
+        if stream_link in self.mixedStreams:
+            return
+        self.hoveredStream = stream_link
+        self.timerPrewarm.start()
+
+    def prewarm_hovered_stream(self) -> None:
+        self.playbackEngine.prewarm(self.hoveredStream, self.stream_metadata(self.hoveredStream))
 
     def listen_to_stream(self, stream_link: str) -> None:
+        if self.archivePlaying:
+            self.archive_stopped()
         self.streamsForceStop = False
         self.startTime = datetime.now().replace(microsecond=0)
         self.streamPlaying = True
+        self.mixedStreams = [stream_link]
         self.btnKillAllStreams.setVisible(True)
-        self.worker = Worker(partial(self.play_stream, stream_link))
-        self.threadpool.start(self.worker)
+        self.update_stream_buttons_enabled()
+        self.playbackEngine.play(stream_link, self.stream_metadata(stream_link))
+        self.render_mixer()
+        self.start_level_meter()
+
+    def listen_alongside(self, stream_link: str) -> None:
+        if not self.streamPlaying:
+            self.listen_to_stream(stream_link)
+            return
+        try:
+            self.playbackEngine.add_stream(stream_link, self.stream_metadata(stream_link))
+        except ImportError:
+            QMessageBox.warning(self, 'Listen alongside', 'Listening to several streams at once needs NumPy: pip install numpy')
+            return
+        self.mixedStreams.append(stream_link)
+        self.update_stream_buttons_enabled()
+        self.render_mixer()
+
+    def stop_mixed_stream(self, stream_link: str) -> None:
+        if stream_link not in self.mixedStreams:
+            return
+        if len(self.mixedStreams) == 1:
+            self.kill_all_threads(True)
+            return
+        self.playbackEngine.remove_stream(stream_link)
+        self.mixedStreams.remove(stream_link)
+        self.update_stream_buttons_enabled()
+        self.render_mixer()
+
+    def set_stream_mix(self, stream_link: str, **mix) -> None:
+        try:
+            self.playbackEngine.set_mix(stream_link, **mix)
+        except ImportError:
+            QMessageBox.warning(self, 'Volume', 'Changing the volume of a stream needs NumPy: pip install numpy')
+
+    def render_mixer(self) -> None:
+        '''
+        render_mixer shows a volume, pan and mute control for every stream
+        playing, and a button to stop it when there are several.
+        '''
+        self.clearLayout(self.layoutMixer)
+        titles: 'dict[str, str]' = {stream.url: stream.title for stream in self.statusSnapshot.streams} \
+            if hasattr(self, 'statusSnapshot') else {}
+        for stream_link in self.mixedStreams:
+            channel = self.playbackEngine.channels.get(stream_link)
+            rowWidget: QWidget() = QWidget()
+            row: QHBoxLayout() = QHBoxLayout(rowWidget)
+            row.setContentsMargins(0, 0, 0, 0)
+            row.addWidget(QLabel(titles.get(stream_link, stream_link)), stretch=1)
+            sliderVolume: QSlider() = QSlider(Qt.Horizontal)
+            sliderVolume.setRange(0, 200)
+            sliderVolume.setValue(int((channel.volume if channel is not None else 1) * 100))
+            sliderVolume.setToolTip('Volume')
+            sliderVolume.valueChanged.connect(lambda value, link=stream_link: self.set_stream_mix(link, volume=value / 100))
+            row.addWidget(sliderVolume, stretch=1)
+            sliderPan: QSlider() = QSlider(Qt.Horizontal)
+            sliderPan.setRange(-100, 100)
+            sliderPan.setValue(int((channel.pan if channel is not None else 0) * 100))
+            sliderPan.setToolTip('Left or right ear')
+            sliderPan.valueChanged.connect(lambda value, link=stream_link: self.set_stream_mix(link, pan=value / 100))
+            row.addWidget(sliderPan, stretch=1)
+            checkMute: QCheckBox() = QCheckBox('Mute')
+            checkMute.setChecked(channel is not None and channel.muted)
+            checkMute.toggled.connect(lambda checked, link=stream_link: self.set_stream_mix(link, muted=checked))
+            row.addWidget(checkMute)
+            if len(self.mixedStreams) > 1:
+                btnStop: QToolButton() = QToolButton()
+                btnStop.setIcon(resources.icon('icons/stop_{color}.png'))
+                btnStop.setToolTip('Stop this stream')
+                btnStop.clicked.connect(partial(self.stop_mixed_stream, stream_link))
+                row.addWidget(btnStop)
+            self.layoutMixer.addWidget(rowWidget)
+
+    def stream_context_menu(self, stream_link: str, btnStream: Button, position) -> None:
+        menu = QMenu(self)
+        actionListen = QAction('Listen', self)
+        actionListen.triggered.connect(partial(self.listen_to_stream, stream_link))
+        menu.addAction(actionListen)
+        actionAlongside = QAction('Listen alongside the current stream', self)
+        actionAlongside.setEnabled(self.streamPlaying and stream_link not in self.mixedStreams)
+        actionAlongside.triggered.connect(partial(self.listen_alongside, stream_link))
+        menu.addAction(actionAlongside)
+        menu.exec_(btnStream.mapToGlobal(position))
 
     @pyqtSlot()
     def kill_all_threads(self, pressed_by_button: bool = False) -> None:
-        try:
-            self.device.close()
-            self.device.stop()
-        except AttributeError:
-            pass
+        if not self.archivePlaying:
+            self.playbackEngine.stop()
         if pressed_by_button:
             self.streamsForceStop = True
         self.btnKillAllStreams.setVisible(False)
         if self.streamPlaying:
             self.streamPlaying = False
-            # restart()
-
-    def find_active_events(self, html: str) -> str:
-        regex: re = r'(?=(<div class="event">))(\w|\W)*(?<=<\/div>)'
-        matches = re.finditer(regex, html, re.MULTILINE)
-        for match in matches:
-            if 'no schedule' in match[0].lower() or 'no upcoming events' in match[0].lower() or 'no events' in match[0].lower():
-                return ''
-            return match[0]
-        return ''
-
-    def find_active_lisenters(self, html: str) -> str:
-        regex: re = r'Current Number of Listeners: ([0-9]*)'
-        matches = re.finditer(regex, html, re.MULTILINE)
-        for match in matches:
-            return match[0]
-        return ''
-
-    def find_active_streams(self, tag: str, html: str,
-                            replace_text: bool = True) -> 'list[str]':
-        '''
-        regex_finder finds strings after a tag using regex matching
-
-        Args:
-            tag (str): a tag in the html such as "data-mnt" or "data-streams"
-            html (str): the html string to parserTest
-
-        Returns:
-            str: the string attached to the tag.
-        '''
-        regex = r"{}=([\"'])((?:(?=(?:\\)*)\\.|.)*?)\1".format(tag)
-        matches = re.finditer(regex, html, re.MULTILINE)
-
-        list_matches: list[str] = []
-
-        for match in matches:
-            m = match.group()
-            m = m.replace(tag, '').replace('=', '').replace('\'', '')
-            if replace_text:
-                m = m.replace('/', '').title()
-            list_matches.append(m)
-        return list_matches
+            self.mixedStreams = []
+            self.update_stream_buttons_enabled()
+            self.render_mixer()
+            self.stop_level_meter()
+
+    def playback_state_changed(self, state: str) -> None:
+        if state == STOPPED and self.streamPlaying and self.playbackEngine.silence_stopped:
+            # Don't let auto start pick the silent stream straight back up.
+            self.streamsForceStop = True
+            if self.enabledNotifications:
+                show_toast(f'Stopped listening after {self.silenceTimeout} minutes of silence.')
+            self.kill_all_threads()
+        elif state == STOPPED and self.streamPlaying:
+            self.kill_all_threads()
+        elif state == STOPPED and self.archivePlaying:
+            self.archive_stopped()
 
     def update_timer(self) -> None:
         try:
             if self.streamPlaying:
                 self.currentTime = datetime.now().replace(microsecond=0)
                 timeDifference: datetime = self.currentTime - self.startTime
-                self.lblActiveListeners.setText(f'{self.active_listeners}\nStreaming for:\n{timeDifference}')
+                stats: dict = self.playbackEngine.stats()
+                if stats['state'] == RECONNECTING:
+                    status: str = f"Connection lost, reconnecting (attempt {stats['reconnect_attempts']}, {int(stats['outage_sec'])}s)..."
+                elif stats['state'] in (CONNECTING, BUFFERING):
+                    status = 'Buffering...'
+                else:
+                    status = 'Streaming for:'
+                text: str = f'{self.active_listeners}\n{status}\n{timeDifference}'
+                if stats['reconnects']:
+                    text += f"\nReconnected {stats['reconnects']} time{'' if stats['reconnects'] == 1 else 's'}, last outage {stats['last_outage_sec']:.1f}s"
+                self.lblActiveListeners.setText(text)
             else:
                 self.lblActiveListeners.setText(f'{self.active_listeners}')
+            if self.archivePlaying:
+                self.update_archive_position()
         except AttributeError:
             pass
 
-    def loadArchive(self) -> None:
-        self.downloadArchiveDatabase()
-        data = self.loadJson()
-
-        self.clearLayout(self.layoutArchive)
+    def tab_clicked(self, index: int) -> None:
+        if self.tabWidget.widget(index) is not self.archivesTab:
+            return
+        if not self.archiveLoaded:
+            self.loadArchive()
+        if self.archiveIndex.is_stale(max_age=300):
+            self.refresh_archive_index()
+
+    def load_archive_index(self) -> None:
+        self.refreshingArchiveIndex = True
+        worker = Worker(self.archiveIndex.load)
+        worker.signals.result.connect(self.archive_index_refreshed)
+        worker.signals.finished.connect(self.archive_index_refresh_finished)
+        worker.signals.finished.connect(self.refresh_archive_index)
+        self.threadpool.start(worker)
+
+    def refresh_archive_index(self) -> None:
+        if self.refreshingArchiveIndex:
+            return
+        self.refreshingArchiveIndex = True
+        worker = Worker(self.archiveIndex.refresh)
+        worker.signals.result.connect(self.archive_index_refreshed)
+        worker.signals.error.connect(self.archive_index_refresh_failed)
+        worker.signals.finished.connect(self.archive_index_refresh_finished)
+        self.threadpool.start(worker)
+
+    def archive_index_refreshed(self, changed: bool) -> None:
+        if changed and self.archiveLoaded:
+            self.loadArchive()
+
+    def archive_index_refresh_failed(self, error: Exception) -> None:
+        print(f"Could not refresh the archive: {error}")
+        metrics.increment('archive_index_refresh_failures')
+        metrics.event('archive_index_refresh_failed', error=str(error))
+
+    def archive_index_refresh_finished(self) -> None:
+        self.refreshingArchiveIndex = False
+        if not self.downloadsResumed and len(self.archiveIndex):
+            self.downloadsResumed = True
+            self.downloadManager.resume_pending(self.archiveIndex.download_link)
+            self.update_download_progress()
 
-        allFileNames = [
-            fileName
-            for fileName in data
-            if self.inputArchiveSearch.text().lower() in fileName.lower()
-        ]
-
-
-        allFileNames.reverse()
-
-        for fileName in allFileNames:
-            text = fileName.replace('_', ':').replace('.mp3', '')
-            btnDownloadArchive: Button = Button(text)
-            btnDownloadArchive.setStyleSheet('font-size: 18px')
-            btnDownloadArchive.setFixedHeight(50)
-            btnDownloadArchive.entered.connect(self.handle_entered)
-            btnDownloadArchive.leaved.connect(self.handle_leaved)
-            if self.darkThemeEnabled:
-                btnDownloadArchive.setIcon(QIcon('icons/download_white.png'))
-            else:
-                btnDownloadArchive.setIcon(QIcon('icons/download_black.png'))
-            btnDownloadArchive.clicked.connect(partial(self.open_website, self.getDownloadLink(fileName=fileName)))
-            self.layoutArchive.addWidget(btnDownloadArchive)
-
-    def downloadArchiveDatabase(self) -> None:
-        url = "https://raw.githubusercontent.com/TheCodingJsoftware/HBNI-Audio-Stream-Recorder/master/downloadLinks.json"
-        req = requests.get(url)
-        if req.status_code == requests.codes.ok:
-            data = dict(req.json())  # the response is a JSON
-            with open("/websiteDownloadLinks.json", "w+") as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
+    def loadArchive(self) -> None:
+        self.archiveLoaded = True
+        with metrics.timer('archive_load_seconds'):
+            self.search_archive()
+
+    def search_archive(self) -> None:
+        self.timerArchiveSearch.stop()
+        if not self.archiveLoaded:
+            return
+        date_from = date_to = None
+        if self.checkArchiveDates.isChecked():
+            date_from = self.inputArchiveDateFrom.date().toPyDate()
+            date_to = self.inputArchiveDateTo.date().toPyDate()
+        with metrics.timer('archive_search_seconds'):
+            self.archiveModel.setFileNames(self.archiveIndex.search_index.search(
+                self.inputArchiveSearch.text(),
+                date_from=date_from,
+                date_to=date_to,
+                sort=self.comboArchiveSort.currentData(),
+            ))
+
+    def archive_clicked(self, index) -> None:
+        self.play_archive(index.data(FileNameRole))
+
+    def archive_context_menu(self, position) -> None:
+        index = self.archiveView.indexAt(position)
+        if not index.isValid():
+            return
+        menu = QMenu(self)
+        actionPlay = QAction('Play', self)
+        actionPlay.triggered.connect(partial(self.play_archive, index.data(FileNameRole)))
+        menu.addAction(actionPlay)
+        fileName: str = index.data(FileNameRole)
+        download = self.downloadManager.get(fileName)
+        if download is not None and download.status in (QUEUED, DOWNLOADING):
+            actionCancel = QAction('Cancel download', self)
+            actionCancel.triggered.connect(partial(self.cancel_download, fileName))
+            menu.addAction(actionCancel)
         else:
-            print("Content was not found.")
-
-    def loadJson(self) -> dict:
-        with open("/websiteDownloadLinks.json", "r") as f:
-            data = json.load(f)
-        return data
+            actionDownload = QAction('Download', self)
+            actionDownload.triggered.connect(partial(self.download_archives, [fileName]))
+            menu.addAction(actionDownload)
+        fileNames: 'list[str]' = self.archiveModel.fileNames
+        actionDownloadAll = QAction(f'Download all {len(fileNames)} results', self)
+        actionDownloadAll.triggered.connect(partial(self.download_archives, list(fileNames)))
+        menu.addAction(actionDownloadAll)
+        menu.addSeparator()
+        actionBrowser = QAction('Download in browser', self)
+        actionBrowser.triggered.connect(partial(self.open_website, index.data(DownloadLinkRole)))
+        menu.addAction(actionBrowser)
+        menu.exec_(self.archiveView.viewport().mapToGlobal(position))
+
+    def download_archives(self, fileNames: 'list[str]') -> None:
+        for fileName in fileNames:
+            link = self.getDownloadLink(fileName)
+            if link is not None:
+                self.downloadManager.submit(link, fileName)
+        self.update_download_progress()
+
+    def cancel_download(self, fileName: str) -> None:
+        self.downloadManager.cancel(fileName)
+        self.update_download_progress()
+
+    def update_download_progress(self) -> None:
+        self.archiveModel.downloadsChanged()
+        if self.downloadManager.active():
+            self.timerDownloadProgress.start()
+        else:
+            self.timerDownloadProgress.stop()
+
+    def request_archive_metadata(self) -> None:
+        fileNames: 'list[str]' = self.archiveModel.fileNames
+        rows: 'list[int]' = self.archiveView.visibleRows(ARCHIVE_METADATA_MARGIN)
+        if not rows:
+            return
+        self.metadataFetcher.request([fileNames[row] for row in rows])
+        self.timerArchiveMetadataProgress.start()
+
+    def update_archive_metadata(self) -> None:
+        self.archiveModel.metadataChanged(self.metadataFetcher.take_fetched())
+        if not self.metadataFetcher.busy():
+            self.timerArchiveMetadataProgress.stop()
+
+    def open_download_settings(self) -> None:
+        dialog = DownloadSettingsDialog(self.downloadManager.max_downloads,
+                                        self.downloadManager.connections,
+                                        self.downloadManager.bucket.rate // 1024,
+                                        self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        self.settings.setValue("Download files at a time", dialog.spinMaxDownloads.value())
+        self.settings.setValue("Download connections per file", dialog.spinConnections.value())
+        self.settings.setValue("Download bandwidth limit", dialog.spinRateLimit.value())
+        self.downloadManager.configure(dialog.spinMaxDownloads.value(),
+                                       dialog.spinConnections.value(),
+                                       dialog.spinRateLimit.value() * 1024)
+
+    def play_archive(self, fileName: str) -> None:
+        # Set first so kill_all_threads leaves the engine alone: starting the
+        # archive replaces the stream, and a separate stop would come back as
+        # STOPPED after this and hide the player.
+        self.archivePlaying = True
+        if self.streamPlaying:
+            self.kill_all_threads()
+            self.streamsForceStop = True
+        self.playbackEngine.play_archive(self.getDownloadLink(fileName))
+        self.lblArchiveNowPlaying.setText(fileName.replace('_', ':').replace('.mp3', ''))
+        self.sliderArchivePosition.setValue(0)
+        self.lblArchivePosition.setText('Buffering...')
+        self.archivePlayer.setVisible(True)
+
+    def seek_archive(self) -> None:
+        if self.archivePlaying:
+            self.playbackEngine.seek(self.sliderArchivePosition.value())
+
+    def stop_archive(self) -> None:
+        self.playbackEngine.stop()
+        self.archive_stopped()
+
+    def archive_stopped(self) -> None:
+        self.archivePlaying = False
+        self.archivePlayer.setVisible(False)
+
+    def update_archive_position(self) -> None:
+        position, duration = self.playbackEngine.position()
+        if position is None or duration is None:
+            return
+        self.sliderArchivePosition.setMaximum(int(duration))
+        if not self.sliderArchivePosition.isSliderDown():
+            self.sliderArchivePosition.setValue(int(position))
+        self.lblArchivePosition.setText(f'{timedelta(seconds=int(position))} / {timedelta(seconds=int(duration))}')
 
     def getDownloadLink(self, fileName: str) -> str:
-        data = self.loadJson()
-        try:
-            return data[fileName]["downloadLink"]
-        except KeyError:
-            return None
+        return self.archiveIndex.download_link(fileName)
+
+    def create_stream_button(self, host_address: str) -> Button:
+        stream_link: str = f'{ICECAST_URL}{host_address}'
+        btnStream: Button = Button()
+        btnStream.setIcon(resources.icon('icons/play_{color}.png'))
+        btnStream.setStyleSheet('font-size: 18px')
+        btnStream.setEnabled(stream_link not in self.mixedStreams)
+        btnStream.clicked.connect(partial(self.listen_to_stream, stream_link))
+        btnStream.entered.connect(partial(self.stream_hovered, stream_link))
+        btnStream.leaved.connect(self.timerPrewarm.stop)
+        btnStream.setContextMenuPolicy(Qt.CustomContextMenu)
+        btnStream.customContextMenuRequested.connect(partial(self.stream_context_menu, stream_link, btnStream))
+        return btnStream
+
+    def render_stream_buttons(self, streams: 'list[tuple[str, str, str]]') -> None:
+        '''
+        render_stream_buttons brings the stream buttons in line with the
+        streams that are online, only touching the buttons that changed.
+
+        Args:
+            streams (list[tuple[str, str, str]]): (host address, button text,
+                tooltip) of every online stream, in the order they should be
+                shown.
+        '''
+        host_addresses: 'set[str]' = {host_address for host_address, _, _ in streams}
+        for host_address in list(self.streamButtons):
+            if host_address not in host_addresses:
+                btnStream: Button = self.streamButtons.pop(host_address)
+                self.layoutStreamButtons.removeWidget(btnStream)
+                btnStream.deleteLater()
+        for index, (host_address, text, tooltip) in enumerate(streams):
+            btnStream = self.streamButtons.get(host_address)
+            if btnStream is None:
+                btnStream = self.create_stream_button(host_address)
+                self.streamButtons[host_address] = btnStream
+                self.layoutStreamButtons.insertWidget(index, btnStream, alignment=Qt.AlignCenter)
+            elif self.layoutStreamButtons.indexOf(btnStream) != index:
+                self.layoutStreamButtons.removeWidget(btnStream)
+                self.layoutStreamButtons.insertWidget(index, btnStream, alignment=Qt.AlignCenter)
+            if btnStream.text() != text:
+                btnStream.setText(text)
+            if btnStream.toolTip() != tooltip:
+                btnStream.setToolTip(tooltip)
+
+    def update_stream_buttons_enabled(self) -> None:
+        for host_address, btnStream in self.streamButtons.items():
+            enabled: bool = f'{ICECAST_URL}{host_address}' not in self.mixedStreams
+            if btnStream.isEnabled() != enabled:
+                btnStream.setEnabled(enabled)
+
+    def update_stream_button_icons(self) -> None:
+        icon: QIcon = resources.icon('icons/play_{color}.png')
+        for btnStream in self.streamButtons.values():
+            btnStream.setIcon(icon)
 
     def update_ui(self) -> None:
-        self.clearLayout(self.layoutStreams)
-        self.active_events = self.find_active_events(html=self.hbni_html)
+        with metrics.timer('ui_update_seconds'):
+            self.render_ui()
+
+    def render_ui(self) -> None:
+        self.lblNetworkError.setVisible(False)
+        self.active_events = self.statusSnapshot.events_html
         self.active_events = self.active_events.replace('h3', 'h1').replace('<p>', '<h2>').replace('</p>', '</h2>').replace('<p class="date">', '<h2>').replace('</div>', '</div><br>')
-        if self.active_events != '' and  'No streams currently online.' in self.hbni_html:
+        streams_online: bool = self.statusSnapshot.online
+        if self.active_events != '' and not streams_online:
             self.lblCallBack.setText('<h2>Upcoming Events:</h2>')
-            lblEvents: ScrollLabel() = ScrollLabel()
-            lblEvents.setText(self.active_events)
-            self.layoutStreams.addWidget(lblEvents)
+            self.lblEvents.setText(self.active_events)
             self.lblActiveListeners.setText('')
             self.kill_all_threads()
+        self.lblEvents.setVisible(self.active_events != '' and not streams_online)
 
-        if 'No streams currently online.' not in self.hbni_html:
-            self.clearLayout(self.layoutStreams)
+        if streams_online:
             self.lblCallBack.setText('<h2>Streams currently online:</h2>')
-            titles: list[str] = self.find_active_streams(tag='data-mnt', html=self.hbni_html)
-            bodies: list[str] = self.find_active_streams(tag='data-stream', html=self.hbni_html)
-            host_addresses: list[str] = self.find_active_streams(tag='data-mnt', html=self.hbni_html, replace_text=False)
-
-            for title, body, host_address in zip(titles, bodies, host_addresses):
-                btnStream: Button = Button(f' {title} - {body}')
-                btnStream.setToolTip(f'http://hbniaudio.hbni.net:8000{host_address}')
-                if self.darkThemeEnabled:
-                    btnStream.setIcon(QIcon('icons/play_white.png'))
-                else:
-                    btnStream.setIcon(QIcon('icons/play_black.png'))
-                btnStream.setStyleSheet('font-size: 18px')
-                btnStream.setEnabled(not self.streamPlaying)
-                btnStream.clicked.connect(
-                    partial(
-                        self.listen_to_stream,
-                        f'http://hbniaudio.hbni.net:8000{host_address}',
-                    )
-                )
-
-                self.layoutStreams.addWidget(btnStream, alignment=Qt.AlignCenter)
-                if not self.streamsOnline and self.settings.contains("Auto start stream") and self.settings.value("Auto start stream") != 'true' and self.enabledNotifications:
-                    toaster.show_toast(__name__,
-                                       f'{titles[0]} just started a stream.',
-                                       icon_path='icons/icon.ico',
-                                       duration=3,
-                                       threaded=True)
+            streams = self.statusSnapshot.streams
+            self.render_stream_buttons([
+                (stream.mount,
+                 f' {stream.title} - {stream.description.replace("/", "").title()}',
+                 '\n'.join(filter(None, (stream.url, stream.details))))
+                for stream in streams
+            ])
+            if streams and not self.streamsOnline and self.settings.contains("Auto start stream") and self.settings.value("Auto start stream") != 'true' and self.enabledNotifications:
+                show_toast(f'{streams[0].title} just started a stream.')
             self.streamsOnline = True
-            if self.settings.contains("Auto start stream") and self.settings.value("Auto start stream") == 'true' and not self.streamPlaying and not self.streamsForceStop:
-                if self.enabledNotifications:
-                    try:
-                        toaster.show_toast(__name__,
-                                           f'Autoplaying currently active stream.\n{titles[0]} - {bodies[0]}',
-                                           icon_path='icons/icon.ico',
-                                           duration=3,
-                                           threaded=True)
-                    except IndexError:
-                        pass
-                self.listen_to_stream(f'http://hbniaudio.hbni.net:8000{host_addresses[0]}')
-        elif self.active_events == '':
-            self.lblCallBack.setText('<h2>No streams currently online or events scheduled</h2>')
-            self.kill_all_threads()
-        if 'No streams currently online.' in self.hbni_html:
+        else:
+            self.render_stream_buttons([])
             self.streamsOnline = False
-        self.active_listeners = self.find_active_lisenters(html=self.hbni_html)
+            if self.active_events == '':
+                self.lblCallBack.setText('<h2>No streams currently online or events scheduled</h2>')
+                self.kill_all_threads()
+        self.active_listeners = self.statusSnapshot.listeners_text
+
+    def auto_start_stream(self) -> None:
+        streams = self.statusSnapshot.streams
+        if streams and self.settings.contains("Auto start stream") and self.settings.value("Auto start stream") == 'true' and not self.streamPlaying and not self.archivePlaying and not self.streamsForceStop:
+            if self.enabledNotifications:
+                show_toast(f'Autoplaying currently active stream.\n{streams[0].title} - {streams[0].description}')
+            self.listen_to_stream(streams[0].url)
 
     def handle_entered(self):
         QApplication.setOverrideCursor(Qt.PointingHandCursor)
@@ -652,32 +1396,86 @@ class MainWindow(QMainWindow):
         webbrowser.open(website)
 
     def check_for_website_changes(self) -> None:
-        try:
-            fp = urllib.request.urlopen("http://hbniaudio.hbni.net", timeout=3)
-            html_bytes: str = fp.read()
-            self.hbni_html = html_bytes.decode("utf8")
-            fp.close()
+        if self.checkingForWebsiteChanges:
+            return
+        self.checkingForWebsiteChanges = True
+        worker = Worker(self.statusPoller.poll)
+        worker.signals.result.connect(self.website_checked)
+        worker.signals.error.connect(self.website_check_failed)
+        worker.signals.finished.connect(self.website_check_finished)
+        self.threadpool.start(worker)
+
+    def website_checked(self, snapshot: StatusSnapshot) -> None:
+        self.pollScheduler.polled(snapshot)
+        self.statusChecked = datetime.now()
+        if snapshot is not None:
+            self.statusSnapshot = snapshot
+            self.networkError = False
             self.update_ui()
-        except (urllib.error.URLError, ConnectionResetError, TimeoutError, Exception):
-            if self.streamPlaying:
-                self.kill_all_threads()
-            self.clearLayout(self.layoutStreams)
-            self.lblCallBack.setText('<h2>Network error</h2>')
-            self.lblActiveListeners.setText('Network error')
-            lblEvents: ScrollLabel() = ScrollLabel()
-            lblEvents.setText('<h3>Check if you are connected to the internet or logged into your network.</h3>')
-            self.layoutStreams.addWidget(lblEvents)
-
+        # Checked on every poll, not just on changes: the engine may have given
+        # up on a stream that is still listed, or auto start was just turned on.
+        if hasattr(self, 'statusSnapshot'):
+            self.auto_start_stream()
+
+    def website_check_failed(self, error: Exception) -> None:
+        self.pollScheduler.failed()
+        self.statusPoller.reset()
+        if self.networkError:
+            return
+        self.networkError = True
+        # A stream that is playing rides out the outage on the engine's own
+        # reconnects; only the status shown here is out of date.
+        self.render_stream_buttons([])
+        self.lblEvents.setVisible(False)
+        self.lblCallBack.setText('<h2>Network error</h2>')
+        self.lblActiveListeners.setText('Network error')
+        self.lblNetworkError.setVisible(True)
+
+    def website_check_finished(self) -> None:
+        self.checkingForWebsiteChanges = False
+        self.schedule_website_check()
+
+    def schedule_website_check(self) -> None:
+        auto_start: bool = self.settings.value("Auto start stream") == 'true' and not self.streamPlaying and not self.archivePlaying and not self.streamsForceStop
+        interval: float = self.pollScheduler.next_interval(hidden=self.isHidden() or self.isMinimized(), auto_start=auto_start)
+        metrics.set_gauge('status_poll_interval_seconds', interval)
+        self.timerCheckForStreams.start(int(interval * 1000))
+        if auto_start and self.pollScheduler.state == DUE:
+            # The stream isn't known yet, but the audio device can be made ready.
+            self.playbackEngine.prewarm()
 
 def restart():
     os.execl(sys.executable, os.path.abspath(__file__), *sys.argv)
 
 
 def main():
-    app: QApplication([]) = QApplication([])
-    app.setAttribute(Qt.ApplicationAttribute.AA_UseHighDpiPixmaps)
-    MainWindow()
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--port', type=int)
+    add_metrics_arguments(parser)
+    args = parser.parse_known_args()[0]
+    port: int = args.port or DEFAULT_CONTROL_PORT
+    # Autostart and a shortcut often both launch the app; the second launch
+    # shows the first one's window instead of polling and playing again.
+    lock: InstanceLock = InstanceLock()
+    if not lock.acquire(port):
+        try:
+            reply: dict = send_to_running_instance('show')
+        except OSError as e:
+            print(f"HBNI Audio Stream Listener is already running but did not answer: {e}")
+            return
+        if not reply.get('ok'):
+            print(f"HBNI Audio Stream Listener is already running: {reply.get('error')}")
+        return
+    configure_metrics(args)
+    with profiler.phase('QApplication'):
+        app: QApplication([]) = QApplication([])
+        app.setAttribute(Qt.ApplicationAttribute.AA_UseHighDpiPixmaps)
+    with profiler.phase('MainWindow'):
+        window: MainWindow = MainWindow()
+    window.start_control_server(port)
     app.exec_()
+    lock.release()
 
 
-main()
+if sys.modules['__main__'].__dict__ is globals():
+    main()
@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from lazysession import LazySession
+from metrics import metrics
+from paths import user_cache_dir
+
+SAVE_INTERVAL: float = 5
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}' if hours else f'{minutes}:{seconds:02d}'
+
+
+def format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f'{size / (1024 * 1024):.0f} MB'
+    return f'{max(size // 1024, 1)} kB'
+
+
+class ArchiveMetadata:
+    '''
+    What an archive recording's first kilobytes say about it: its size,
+    how long it plays and its bitrate, each None if it couldn't be told.
+    '''
+    __slots__ = ('size', 'duration', 'bitrate')
+
+    def __init__(self, size: Optional[int] = None, duration: Optional[float] = None,
+                 bitrate: Optional[int] = None) -> None:
+        self.size: Optional[int] = size
+        self.duration: Optional[float] = duration
+        self.bitrate: Optional[int] = bitrate
+
+    @property
+    def text(self) -> str:
+        '''
+        The details worth showing next to the name, such as
+        "1:12:05 - 64 kbps - 33 MB".
+        '''
+        details: 'List[str]' = []
+        if self.duration:
+            details.append(format_duration(self.duration))
+        if self.bitrate:
+            details.append(f'{self.bitrate} kbps')
+        if self.size:
+            details.append(format_size(self.size))
+        return ' - '.join(details)
+
+    def to_dict(self) -> 'dict[str, object]':
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class MetadataFetcher:
+    '''
+    Probes archive recordings for their size, duration and bitrate in the
+    background, so the archive list can show them without anybody having to
+    open a file.
+
+    Each recording costs one ranged request for its first kilobytes (two if
+    it starts with a big ID3 tag), over one pooled session, with at most
+    workers running at a time. The work is handed to spawn, which the GUI
+    points at its QThreadPool, like DownloadManager. Results are saved in
+    the cache directory keyed by download link, so every recording is only
+    probed once; one that fails is tried again next time the app starts.
+
+    request() replaces what is waiting with the rows the caller needs now,
+    in order, so scrolling past a thousand rows doesn't queue a thousand
+    requests. take_fetched() tells the GUI which rows to repaint.
+    '''
+
+    def __init__(self, spawn: Callable[[Callable[[], None]], None],
+                 download_link: 'Callable[[str], Optional[str]]',
+                 cache_dir: Optional[str] = None, workers: int = 4, timeout: float = 10) -> None:
+        self.spawn: Callable[[Callable[[], None]], None] = spawn
+        self.download_link: 'Callable[[str], Optional[str]]' = download_link
+        self.path: str = os.path.join(cache_dir or user_cache_dir(), 'archiveMetadata.json')
+        self.workers: int = workers
+        self.timeout: float = timeout
+        self.session: LazySession = LazySession(pool_maxsize=workers)
+        self.metadata: 'Dict[str, ArchiveMetadata]' = {}
+        self.loaded: bool = False
+        self.queue: 'Deque[tuple[str, str]]' = deque()
+        self.probing: 'Set[str]' = set()
+        self.failed: 'Set[str]' = set()
+        self.fetched: 'List[str]' = []
+        self.running: int = 0
+        self.saved: float = 0
+        self.dirty: bool = False
+        self.closed: bool = False
+        self.lock: threading.RLock = threading.RLock()
+        # Held from taking a snapshot to replacing the file, so workers
+        # saving at once neither share the temporary file nor put an older
+        # snapshot over a newer one.
+        self.save_lock: threading.Lock = threading.Lock()
+
+    def get(self, file_name: str) -> Optional[ArchiveMetadata]:
+        url: Optional[str] = self.download_link(file_name)
+        return self.metadata.get(url) if url is not None else None
+
+    def busy(self) -> bool:
+        with self.lock:
+            return bool(self.running or self.fetched)
+
+    def request(self, file_names: 'Iterable[str]') -> None:
+        '''
+        request queues file_names, most wanted first, in place of whatever
+        is still waiting. Recordings already known, being probed or failed
+        are skipped.
+        '''
+        with self.lock:
+            self.queue.clear()
+            for file_name in file_names:
+                url: Optional[str] = self.download_link(file_name)
+                if url is not None and url not in self.metadata and url not in self.probing and url not in self.failed:
+                    self.queue.append((file_name, url))
+            while self.queue and self.running < self.workers and not self.closed:
+                self.running += 1
+                self.spawn(self.run)
+
+    def take_fetched(self) -> 'List[str]':
+        '''
+        take_fetched returns the file names whose metadata arrived since the
+        last call.
+        '''
+        with self.lock:
+            fetched, self.fetched = self.fetched, []
+            return fetched
+
+    def run(self) -> None:
+        try:
+            self.load()
+            while True:
+                with self.lock:
+                    if self.closed:
+                        return
+                    while self.queue and self.queue[0][1] in self.metadata:
+                        self.fetched.append(self.queue.popleft()[0])
+                    if not self.queue:
+                        return
+                    file_name, url = self.queue.popleft()
+                    self.probing.add(url)
+                metadata: Optional[ArchiveMetadata] = self.probe(url)
+                with self.lock:
+                    self.probing.discard(url)
+                    if metadata is None:
+                        self.failed.add(url)
+                        continue
+                    self.metadata[url] = metadata
+                    self.fetched.append(file_name)
+                    self.dirty = True
+                self.save()
+        finally:
+            with self.lock:
+                self.running -= 1
+            self.save(force=True)
+
+    def probe(self, url: str) -> Optional[ArchiveMetadata]:
+        import requests
+
+        from rangesource import probe_file
+
+        metrics.increment('archive_metadata_probes')
+        try:
+            with metrics.timer('archive_metadata_probe_seconds'):
+                info, size, _ = probe_file(self.session, url, self.timeout)
+        except (requests.RequestException, OSError, ValueError) as e:
+            metrics.increment('archive_metadata_failures')
+            metrics.event('archive_metadata_failed', url=url, error=str(e))
+            return None
+        # Without the file size only a Xing header says how long it plays.
+        return ArchiveMetadata(size, info.duration if size or info.frames else None, info.bitrate)
+
+    def load(self) -> None:
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    saved: 'Dict[str, dict]' = json.load(f)
+            except (OSError, ValueError):
+                return
+            for url, values in saved.items():
+                try:
+                    self.metadata.setdefault(url, ArchiveMetadata(**values))
+                except TypeError:
+                    continue
+
+    def save(self, force: bool = False) -> None:
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty or not force and time.monotonic() - self.saved < SAVE_INTERVAL:
+                    return
+                self.dirty = False
+                self.saved = time.monotonic()
+                saved: 'Dict[str, dict]' = {url: metadata.to_dict() for url, metadata in self.metadata.items()}
+            temporary_path: str = f'{self.path}.tmp'
+            try:
+                with open(temporary_path, 'w', encoding='utf-8') as f:
+                    json.dump(saved, f)
+                os.replace(temporary_path, self.path)
+            except OSError as e:
+                print(f"Could not save archive metadata: {e}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            self.queue.clear()
+        self.save(force=True)
+        self.session.close()
@@ -0,0 +1,228 @@
+import argparse
+import json
+import logging
+import logging.handlers
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Sequence
+
+DEFAULT_METRICS_PORT: int = 47652
+PREFIX: str = 'hbni_'
+DURATION_BUCKETS: 'tuple[float, ...]' = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LOG_BYTES: int = 5 * 1024 * 1024
+LOG_BACKUPS: int = 3
+SNAPSHOT_INTERVAL: float = 60
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: 'Sequence[float]') -> None:
+        self.buckets: 'tuple[float, ...]' = tuple(buckets)
+        self.counts: 'List[int]' = [0] * len(self.buckets)
+        self.sum: float = 0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Timer:
+    '''
+    Observes how long its with block took, in seconds, into a histogram.
+    '''
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics: 'Metrics', name: str) -> None:
+        self.metrics: Metrics = metrics
+        self.name: str = name
+        self.started: float = 0
+
+    def __enter__(self) -> 'Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+
+
+class Metrics:
+    '''
+    Counters, gauges and histograms for the hot paths (status polls, UI
+    rebuilds, archive loads, playback underruns and reconnects).
+
+    Nothing is recorded until configure is called: every method returns
+    straight away and timer hands back a shared no-op context manager, so
+    instrumented code costs one attribute check while metrics are off. Once
+    on, the values are served in the Prometheus text format on localhost
+    and/or written as JSON lines, one per event plus a snapshot of everything
+    every SNAPSHOT_INTERVAL seconds, to a log that rotates at LOG_BYTES.
+    '''
+
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.counters: 'Dict[str, float]' = {}
+        self.gauges: 'Dict[str, float]' = {}
+        self.histograms: 'Dict[str, Histogram]' = {}
+        self.collectors: 'List[Callable[[], Dict[str, float]]]' = []
+        self.lock: threading.Lock = threading.Lock()
+        self.log: Optional[logging.Logger] = None
+        self.server: Optional['MetricsServer'] = None
+        self.stopping: threading.Event = threading.Event()
+        self.null_timer: nullcontext = nullcontext()
+
+    def configure(self, port: Optional[int] = None, log_path: Optional[str] = None,
+                  host: str = '127.0.0.1') -> None:
+        '''
+        configure turns metrics on.
+
+        Args:
+            port (int): serve /metrics on this port, if given
+            log_path (str): write the JSON log to this file, if given
+
+        Raises:
+            OSError: if the port is taken or the log can't be opened.
+        '''
+        if port is not None:
+            from metricsserver import MetricsServer
+
+            self.server = MetricsServer(self, port, host)
+            self.server.start()
+        if log_path is not None:
+            handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=LOG_BYTES,
+                                                           backupCount=LOG_BACKUPS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.log = logging.getLogger('hbni.metrics')
+            self.log.setLevel(logging.INFO)
+            self.log.propagate = False
+            self.log.addHandler(handler)
+            threading.Thread(target=self.write_snapshots, name='MetricsLog', daemon=True).start()
+        self.enabled = True
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float, buckets: 'Sequence[float]' = DURATION_BUCKETS) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram: Optional[Histogram] = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def timer(self, name: str) -> 'Timer | nullcontext':
+        return Timer(self, name) if self.enabled else self.null_timer
+
+    def add_collector(self, collector: 'Callable[[], Dict[str, float]]') -> None:
+        '''
+        add_collector registers a function whose gauges are read each time
+        the metrics are served or logged, e.g. the playback engine's buffer
+        depth, which changes too often to be pushed.
+        '''
+        self.collectors.append(collector)
+
+    def event(self, name: str, **fields: object) -> None:
+        '''
+        event writes one JSON line to the log, e.g. a failed poll with its
+        error. It is not counted; pair it with increment where needed.
+        '''
+        if self.log is None:
+            return
+        self.log.info(json.dumps({'time': time.time(), 'event': name, **fields}, default=str))
+
+    def collect(self) -> 'Dict[str, float]':
+        gauges: 'Dict[str, float]' = {}
+        for collector in self.collectors:
+            try:
+                gauges.update(collector())
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+        with self.lock:
+            gauges.update(self.gauges)
+        return gauges
+
+    def snapshot(self) -> dict:
+        gauges: 'Dict[str, float]' = self.collect()
+        with self.lock:
+            return {
+                'counters': dict(self.counters),
+                'gauges': gauges,
+                'histograms': {name: {'count': histogram.count, 'sum': histogram.sum}
+                               for name, histogram in self.histograms.items()},
+            }
+
+    def render(self) -> str:
+        '''
+        render returns every metric in the Prometheus text exposition format.
+        '''
+        gauges: 'Dict[str, float]' = self.collect()
+        lines: 'List[str]' = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'# TYPE {PREFIX}{name}_total counter')
+                lines.append(f'{PREFIX}{name}_total {value:g}')
+            for name, value in sorted(gauges.items()):
+                if value is None:
+                    continue
+                lines.append(f'# TYPE {PREFIX}{name} gauge')
+                lines.append(f'{PREFIX}{name} {value:g}')
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f'# TYPE {PREFIX}{name} histogram')
+                cumulative: int = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{PREFIX}{name}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{PREFIX}{name}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f'{PREFIX}{name}_sum {histogram.sum:g}')
+                lines.append(f'{PREFIX}{name}_count {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_snapshots(self) -> None:
+        while not self.stopping.wait(SNAPSHOT_INTERVAL):
+            self.event('snapshot', **self.snapshot())
+
+    def close(self) -> None:
+        self.stopping.set()
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        if self.log is not None:
+            self.event('snapshot', **self.snapshot())
+            for handler in list(self.log.handlers):
+                handler.close()
+                self.log.removeHandler(handler)
+            self.log = None
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--metrics-port', type=int, nargs='?', const=DEFAULT_METRICS_PORT,
+                        help=f'serve Prometheus metrics on localhost (port {DEFAULT_METRICS_PORT} if none is given)')
+    parser.add_argument('--metrics-log', metavar='PATH', help='write metrics and events as rotating JSON lines to PATH')
+
+
+def configure_metrics(args: argparse.Namespace) -> None:
+    if args.metrics_port is None and args.metrics_log is None:
+        return
+    try:
+        metrics.configure(args.metrics_port, args.metrics_log)
+    except OSError as e:
+        print(f"Could not start metrics: {e}")
+
+
+metrics: Metrics = Metrics()
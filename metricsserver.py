@@ -0,0 +1,49 @@
+import http.server
+import json
+import threading
+from typing import Optional
+
+from metrics import DEFAULT_METRICS_PORT, Metrics
+
+
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path == '/metrics':
+            body: bytes = self.server.metrics.render().encode('utf-8')
+            content_type: str = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path == '/metrics.json':
+            body = json.dumps(self.server.metrics.snapshot(), default=str).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class MetricsServer(http.server.ThreadingHTTPServer):
+    '''
+    Serves /metrics (Prometheus) and /metrics.json on localhost.
+    '''
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, metrics: Metrics, port: int = DEFAULT_METRICS_PORT, host: str = '127.0.0.1') -> None:
+        self.metrics: Metrics = metrics
+        self.thread: Optional[threading.Thread] = None
+        super().__init__((host, port), MetricsRequestHandler)
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.serve_forever, name='MetricsServer', daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        if self.thread is not None:
+            self.shutdown()
+        self.server_close()
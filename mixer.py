@@ -0,0 +1,77 @@
+from array import array
+from typing import Iterable, Optional
+
+import numpy as np
+
+INT16_MIN: int = -32768
+INT16_MAX: int = 32767
+
+
+class MixChannel:
+    '''
+    The volume, pan and mute of one stream in the mix. volume is linear
+    (1 is unchanged, up to 2), pan runs from -1 (left ear only) through 0 to
+    1 (right ear only), attenuating the other side linearly so a centred
+    stream plays at its own level.
+
+    The per output channel gains are worked out whenever a setting changes,
+    not per block.
+    '''
+    __slots__ = ('volume', 'pan', 'muted', 'gains')
+
+    def __init__(self, volume: float = 1, pan: float = 0, muted: bool = False) -> None:
+        self.volume: float = volume
+        self.pan: float = pan
+        self.muted: bool = muted
+        self.gains: Optional[np.ndarray] = None
+
+    @property
+    def unity(self) -> bool:
+        return self.volume == 1 and self.pan == 0 and not self.muted
+
+    def update(self, volume: Optional[float] = None, pan: Optional[float] = None,
+               muted: Optional[bool] = None) -> None:
+        if volume is not None:
+            self.volume = min(max(volume, 0), 2)
+        if pan is not None:
+            self.pan = min(max(pan, -1), 1)
+        if muted is not None:
+            self.muted = muted
+        self.gains = None
+
+    def channel_gains(self, nchannels: int) -> np.ndarray:
+        gains: Optional[np.ndarray] = self.gains
+        if gains is None or len(gains) != nchannels:
+            if nchannels == 2:
+                gains = np.array([min(1, 1 - self.pan), min(1, 1 + self.pan)], dtype=np.float32) * self.volume
+            else:
+                gains = np.full(nchannels, self.volume, dtype=np.float32)
+            self.gains = gains
+        return gains
+
+
+def mix(blocks: 'Iterable[tuple[array, MixChannel]]', frames: int, nchannels: int) -> array:
+    '''
+    mix sums blocks of interleaved 16 bit PCM, each scaled by its channel's
+    per ear gains, into one block of frames frames. Blocks shorter than that
+    (a stream that is buffering) are padded with silence, and the sum is
+    clipped to 16 bits.
+
+    Args:
+        blocks (Iterable[tuple[array, MixChannel]]): the samples of each stream
+            and how to mix them
+        frames (int): the number of frames the device asked for
+        nchannels (int): channels per frame
+
+    Returns:
+        array: frames frames of interleaved 16 bit PCM.
+    '''
+    out: np.ndarray = np.zeros((frames, nchannels), dtype=np.float32)
+    for samples, channel in blocks:
+        if channel.muted or not samples:
+            continue
+        pcm: np.ndarray = np.frombuffer(samples, dtype=np.int16)
+        pcm = pcm[:len(pcm) - len(pcm) % nchannels].reshape(-1, nchannels)[:frames]
+        out[:len(pcm)] += pcm * channel.channel_gains(nchannels)
+    np.clip(out, INT16_MIN, INT16_MAX, out=out)
+    return array('h', out.astype(np.int16).tobytes())
@@ -0,0 +1,199 @@
+from typing import List, Optional
+
+# Kbit/s by bitrate index for (MPEG-1 layer I, II, III, MPEG-2/2.5 layer I, II and III).
+BITRATES: 'dict[tuple[bool, int], tuple[int, ...]]' = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+SAMPLE_RATES: 'dict[int, tuple[int, int, int]]' = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000),
+}
+XING_FRAMES: int = 0x1
+XING_BYTES: int = 0x2
+XING_TOC: int = 0x4
+
+
+class FrameHeader:
+    '''
+    The fields of a 4 byte MPEG audio frame header.
+    '''
+    __slots__ = ('version', 'layer', 'bitrate', 'sample_rate', 'padding', 'mono')
+
+    def __init__(self, version: int, layer: int, bitrate: int, sample_rate: int, padding: int, mono: bool) -> None:
+        self.version: int = version
+        self.layer: int = layer
+        self.bitrate: int = bitrate
+        self.sample_rate: int = sample_rate
+        self.padding: int = padding
+        self.mono: bool = mono
+
+    @property
+    def mpeg1(self) -> bool:
+        return self.version == 3
+
+    @property
+    def samples_per_frame(self) -> int:
+        if self.layer == 1:
+            return 384
+        return 1152 if self.mpeg1 or self.layer == 2 else 576
+
+    @property
+    def frame_length(self) -> int:
+        if self.layer == 1:
+            return (12 * self.bitrate * 1000 // self.sample_rate + self.padding) * 4
+        return self.samples_per_frame // 8 * self.bitrate * 1000 // self.sample_rate + self.padding
+
+    @property
+    def side_info_length(self) -> int:
+        if self.mpeg1:
+            return 17 if self.mono else 32
+        return 9 if self.mono else 17
+
+
+def parse_frame_header(data: bytes, offset: int) -> Optional[FrameHeader]:
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version: int = data[offset + 1] >> 3 & 0x3
+    layer: int = 4 - (data[offset + 1] >> 1 & 0x3)
+    bitrate_index: int = data[offset + 2] >> 4
+    sample_rate_index: int = data[offset + 2] >> 2 & 0x3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    return FrameHeader(version, layer,
+                       BITRATES[(version == 3, layer)][bitrate_index],
+                       SAMPLE_RATES[version][sample_rate_index],
+                       data[offset + 2] >> 1 & 0x1,
+                       data[offset + 3] >> 6 == 3)
+
+
+def id3v2_length(data: bytes) -> int:
+    '''
+    id3v2_length is the number of bytes an ID3v2 tag at the start of data
+    takes up, or 0 if there is none.
+    '''
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size: int = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+class Mp3Info:
+    '''
+    Where the audio of an MP3 file starts, how long it plays and how to map a
+    time in it to a byte offset.
+
+    VBR files carry a Xing (or LAME "Info") header in their first frame with
+    the frame count, the audio size and a 100 entry table of contents that
+    maps percentages of the duration to percentages of the size; seeking
+    interpolates in that table. Without one the file is treated as constant
+    bitrate and the mapping is linear.
+    '''
+
+    def __init__(self, header: FrameHeader, audio_start: int, audio_bytes: int,
+                 frames: Optional[int] = None, toc: Optional['List[int]'] = None) -> None:
+        self.header: FrameHeader = header
+        self.audio_start: int = audio_start
+        self.audio_bytes: int = audio_bytes
+        self.frames: Optional[int] = frames
+        self.toc: Optional['List[int]'] = toc
+
+    @property
+    def bitrate(self) -> int:
+        if self.frames and self.duration:
+            return int(self.audio_bytes * 8 / self.duration / 1000)
+        return self.header.bitrate
+
+    @property
+    def duration(self) -> float:
+        if self.frames:
+            return self.frames * self.header.samples_per_frame / self.header.sample_rate
+        return self.audio_bytes * 8 / (self.header.bitrate * 1000)
+
+    def byte_offset(self, seconds: float) -> int:
+        '''
+        byte_offset finds where to start reading to play from a given time.
+
+        Args:
+            seconds (float): position in the recording
+
+        Returns:
+            int: offset into the file, at or just before the frame playing
+            at that time; the decoder resyncs on the next frame header.
+        '''
+        duration: float = self.duration
+        if seconds <= 0 or duration <= 0:
+            return self.audio_start
+        percent: float = min(seconds / duration * 100, 100)
+        if self.toc is None:
+            fraction: float = percent / 100
+        else:
+            index: int = min(int(percent), 99)
+            low: int = self.toc[index]
+            high: int = self.toc[index + 1] if index < 99 else 256
+            fraction = (low + (high - low) * (percent - index)) / 256
+        return self.audio_start + min(int(fraction * self.audio_bytes), max(self.audio_bytes - 1, 0))
+
+
+def parse_mp3_info(data: bytes, file_size: Optional[int] = None, offset: int = 0) -> Mp3Info:
+    '''
+    parse_mp3_info reads the stream layout from the first kilobytes of an MP3.
+
+    Args:
+        data (bytes): the file's bytes from offset on, at least the first frame
+        file_size (int): size of the whole file, if known
+        offset (int): file offset data starts at
+
+    Returns:
+        Mp3Info: the parsed layout.
+
+    Raises:
+        ValueError: if no MPEG audio frame is found in data.
+    '''
+    position: int = id3v2_length(data) if offset == 0 else 0
+    header: Optional[FrameHeader] = None
+    while position + 4 <= len(data):
+        position = data.find(b'\xff', position)
+        if position < 0:
+            break
+        header = parse_frame_header(data, position)
+        if header is not None:
+            following: int = position + header.frame_length
+            # A lone sync pattern inside tag data is common; require the next
+            # frame to line up too when it is in data.
+            if following + 4 > len(data) or parse_frame_header(data, following) is not None:
+                break
+            header = None
+        position += 1
+    if header is None:
+        raise ValueError('No MPEG audio frame found')
+
+    audio_start: int = offset + position
+    audio_bytes: int = (file_size - audio_start) if file_size else len(data) - position
+    xing: int = position + 4 + header.side_info_length
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags: int = int.from_bytes(data[xing + 4:xing + 8], 'big')
+        field: int = xing + 8
+        frames: Optional[int] = None
+        toc: Optional['List[int]'] = None
+        if flags & XING_FRAMES:
+            frames = int.from_bytes(data[field:field + 4], 'big')
+            field += 4
+        if flags & XING_BYTES:
+            audio_bytes = int.from_bytes(data[field:field + 4], 'big') or audio_bytes
+            field += 4
+        if flags & XING_TOC and len(data) >= field + 100:
+            toc = list(data[field:field + 100])
+        # Both the byte count and the table of contents are measured from the
+        # start of the Xing frame itself.
+        return Mp3Info(header, audio_start, audio_bytes, frames, toc)
+    vbri: int = position + 4 + 32
+    if data[vbri:vbri + 4] == b'VBRI':
+        audio_bytes = int.from_bytes(data[vbri + 10:vbri + 14], 'big') or audio_bytes
+        return Mp3Info(header, audio_start, audio_bytes, int.from_bytes(data[vbri + 14:vbri + 18], 'big'))
+    return Mp3Info(header, audio_start, audio_bytes)
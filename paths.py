@@ -0,0 +1,47 @@
+import os
+import sys
+
+APP_NAME: str = "HBNI Audio Stream Listener"
+
+
+def user_cache_dir() -> str:
+    '''
+    user_cache_dir returns the per-user cache directory of the app, creating
+    it if needed, so nothing has to be written next to the executable or in
+    the root of the filesystem.
+
+    Returns:
+        str: the path to the cache directory.
+    '''
+    if sys.platform == 'win32':
+        base: str = os.environ.get('LOCALAPPDATA') or os.path.expanduser(r'~\AppData\Local')
+        path: str = os.path.join(base, APP_NAME, 'Cache')
+    elif sys.platform == 'darwin':
+        path = os.path.join(os.path.expanduser('~/Library/Caches'), APP_NAME)
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        path = os.path.join(base, 'hbni-audio-stream-listener')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def user_downloads_dir() -> str:
+    '''
+    user_downloads_dir returns the directory archive recordings are
+    downloaded to for offline listening. It is created on the first download.
+
+    Returns:
+        str: the path to the downloads directory.
+    '''
+    return os.path.join(os.path.expanduser('~'), 'Downloads', APP_NAME)
+
+
+def user_recordings_dir() -> str:
+    '''
+    user_recordings_dir returns the directory live streams are recorded to
+    while listening. It is created on the first recording.
+
+    Returns:
+        str: the path to the recordings directory.
+    '''
+    return os.path.join(user_downloads_dir(), 'Recordings')
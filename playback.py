@@ -0,0 +1,926 @@
+import queue
+import random
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from lazysession import LazySession
+from metrics import metrics
+from mp3info import Mp3Info
+from recorder import StreamRecorder, TeeSource
+
+STOPPED: str = 'stopped'
+CONNECTING: str = 'connecting'
+BUFFERING: str = 'buffering'
+PLAYING: str = 'playing'
+RECONNECTING: str = 'reconnecting'
+
+FADE_MSEC: int = 20
+
+
+def fade(samples: array, nchannels: int, frames: int, fade_in: bool) -> None:
+    '''
+    Ramps the first (fade_in) or last frames of interleaved samples in place,
+    so audio stopping or resuming around an outage doesn't click.
+    '''
+    frames = min(frames, len(samples) // nchannels)
+    if frames <= 0:
+        return
+    start: int = 0 if fade_in else len(samples) - frames * nchannels
+    for frame in range(frames):
+        gain: float = (frame + 1) / frames if fade_in else (frames - frame - 1) / frames
+        index: int = start + frame * nchannels
+        for channel in range(nchannels):
+            samples[index + channel] = int(samples[index + channel] * gain)
+
+
+class Backoff:
+    '''
+    Exponential backoff with jitter: each delay is between half and all of
+    base * 2 ** attempt, capped at maximum.
+    '''
+
+    def __init__(self, base: float = 0.5, maximum: float = 15) -> None:
+        self.base: float = base
+        self.maximum: float = maximum
+        self.attempt: int = 0
+
+    def reset(self) -> None:
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        delay: float = min(self.maximum, self.base * 2 ** self.attempt)
+        self.attempt += 1
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class JitterBuffer:
+    '''
+    A bounded FIFO of interleaved 16 bit PCM between the thread decoding a
+    stream and the audio device callback.
+
+    The decoder blocks in put() while the buffer is full; the device callback
+    never blocks and takes whatever is there in get(). With overwrite set,
+    put() drops the oldest audio to make room instead, keeping the buffer at
+    the live edge of a stream nobody is listening to yet.
+    '''
+
+    def __init__(self, capacity_frames: int, nchannels: int, overwrite: bool = False) -> None:
+        self.capacity_frames: int = capacity_frames
+        self.nchannels: int = nchannels
+        self.overwrite: bool = overwrite
+        self.chunks: 'Deque[array]' = deque()
+        self.offset: int = 0
+        self.samples: int = 0
+        self.condition: threading.Condition = threading.Condition()
+
+    @property
+    def fill_frames(self) -> int:
+        return self.samples // self.nchannels
+
+    def put(self, samples: array, stop: threading.Event) -> bool:
+        '''
+        put appends decoded samples, waiting for room while the buffer is full.
+
+        Returns:
+            bool: False if stop was set while waiting.
+        '''
+        with self.condition:
+            while self.overwrite and self.chunks and self.samples + len(samples) > self.capacity_frames * self.nchannels:
+                self.samples -= len(self.chunks.popleft()) - self.offset
+                self.offset = 0
+            while self.samples >= self.capacity_frames * self.nchannels:
+                if stop.is_set():
+                    return False
+                self.condition.wait(0.1)
+            self.chunks.append(samples)
+            self.samples += len(samples)
+            return True
+
+    def get(self, frames: int) -> array:
+        '''
+        get takes up to frames frames off the buffer without blocking.
+        '''
+        wanted: int = frames * self.nchannels
+        with self.condition:
+            if not self.chunks:
+                return array('h')
+            chunk: array = self.chunks[0]
+            if self.offset == 0 and len(chunk) == wanted:
+                self.chunks.popleft()
+                self.samples -= wanted
+                self.condition.notify()
+                return chunk
+            out: array = array('h')
+            while self.chunks and len(out) < wanted:
+                chunk = self.chunks[0]
+                end: int = self.offset + wanted - len(out)
+                out.extend(chunk[self.offset:end])
+                if end >= len(chunk):
+                    self.chunks.popleft()
+                    self.offset = 0
+                else:
+                    self.offset = end
+            self.samples -= len(out)
+            self.condition.notify()
+            return out
+
+    def fade_tail(self, frames: int) -> None:
+        '''
+        Fades out the last frames still waiting to be played, used when the
+        stream feeding the buffer drops.
+        '''
+        with self.condition:
+            if self.chunks:
+                fade(self.chunks[-1], self.nchannels, frames, fade_in=False)
+
+    def clear(self) -> None:
+        with self.condition:
+            self.chunks.clear()
+            self.offset = 0
+            self.samples = 0
+            self.condition.notify_all()
+
+
+class StreamSession:
+    '''
+    One stream being decoded into a JitterBuffer on its own reader thread.
+
+    When reconnect is set, a dropped or stalled connection is reopened with
+    exponential backoff for up to reconnect_timeout seconds. Audio already in
+    the buffer keeps playing meanwhile, faded out at its end, and the first
+    audio after the reconnect is faded in.
+
+    A prewarmed session is started before anyone asks to hear it, with
+    warm_until set: its buffer only keeps the latest prefill worth of audio
+    until the engine adopts it with play() or lets it expire.
+    '''
+
+    def __init__(self, url: str, source_factory: Callable[[], 'miniaudio.StreamableSource'],
+                 engine: 'PlaybackEngine', reconnect: bool = True,
+                 warm_until: Optional[float] = None) -> None:
+        self.url: str = url
+        self.source_factory: Callable[[], 'miniaudio.StreamableSource'] = source_factory
+        self.engine: 'PlaybackEngine' = engine
+        self.reconnect: bool = reconnect
+        self.warm_until: Optional[float] = warm_until
+        self.prewarmed: bool = warm_until is not None
+        if warm_until is None:
+            self.buffer: JitterBuffer = JitterBuffer(engine.buffer_frames, engine.nchannels)
+        else:
+            self.buffer = JitterBuffer(engine.prefill_frames + engine.frames_to_read, engine.nchannels, overwrite=True)
+        self.source: Optional['miniaudio.StreamableSource'] = None
+        self.stopping: threading.Event = threading.Event()
+        self.error: Optional[Exception] = None
+        self.buffering: bool = True
+        self.finished: bool = False
+        self.drained: bool = False
+        self.reconnecting: bool = False
+        self.requested: Optional[float] = None
+        self.start_seconds: Optional[float] = None
+        self.played_frames: int = 0
+        self.outage_started: Optional[float] = None
+        self.last_data: float = time.monotonic()
+        self.backoff: Backoff = Backoff()
+        self.thread: threading.Thread = threading.Thread(target=self.read, name=f'StreamSession {url}', daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def read(self) -> None:
+        try:
+            while not self.stopping.is_set():
+                self.decode()
+                # A prewarmed stream that drops is simply let go.
+                if self.stopping.is_set() or not self.reconnect or self.warm_until is not None:
+                    break
+                if self.outage_started is None:
+                    self.outage_started = time.monotonic()
+                    self.reconnecting = True
+                    self.buffer.fade_tail(self.engine.sample_rate * FADE_MSEC // 1000)
+                    self.engine.commands.put(('reconnecting', self))
+                elif time.monotonic() - self.outage_started > self.engine.reconnect_timeout:
+                    break
+                if self.stopping.wait(self.backoff.next_delay()):
+                    break
+        finally:
+            self.finished = True
+
+    def decode(self) -> None:
+        import miniaudio
+
+        stream = None
+        try:
+            self.source = self.source_factory()
+            stream = miniaudio.stream_any(self.source, self.source.audio_format,
+                                          output_format=miniaudio.SampleFormat.SIGNED16,
+                                          nchannels=self.engine.nchannels,
+                                          sample_rate=self.engine.sample_rate,
+                                          frames_to_read=self.engine.frames_to_read)
+            self.last_data = time.monotonic()
+            for samples in stream:
+                if self.outage_started is not None:
+                    fade(samples, self.engine.nchannels, self.engine.sample_rate * FADE_MSEC // 1000, fade_in=True)
+                    self.engine.commands.put(('reconnected', self, time.monotonic() - self.outage_started))
+                    self.outage_started = None
+                    self.reconnecting = False
+                    self.backoff.reset()
+                self.last_data = time.monotonic()
+                if self.stopping.is_set() or not self.buffer.put(samples, self.stopping):
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            if stream is not None:
+                stream.close()
+            self.close_source()
+
+    def close_source(self) -> None:
+        '''
+        Closes the network source, which makes a read blocked on it return,
+        so the decoder ends and the session reconnects or stops.
+        '''
+        source, self.source = self.source, None
+        if source is not None:
+            try:
+                source.close()
+            except Exception:
+                pass
+
+    def adopt(self) -> None:
+        '''
+        Turns a prewarmed session into a normal one, keeping the audio it has
+        buffered so playback can start right away.
+        '''
+        self.warm_until = None
+        self.buffer.capacity_frames = self.engine.buffer_frames
+        self.buffer.overwrite = False
+
+    def is_stalled(self, timeout: float) -> bool:
+        return not self.reconnecting and not self.finished and time.monotonic() - self.last_data > timeout
+
+    def stop(self) -> None:
+        self.stopping.set()
+        self.buffer.clear()
+        self.close_source()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+
+class PlaybackProfile:
+    '''
+    The buffering parameters of the playback pipeline, trading latency to
+    the live speaker against resistance to network jitter and CPU load.
+
+    buffer_msec is the capacity of the decode jitter buffer and prefill_msec
+    how much of it has to fill before audio starts; device_buffer_msec and
+    device_periods size the audio device's own buffer, frames_to_read is the
+    decode chunk size and sample_rate the rate everything is converted to.
+    '''
+    __slots__ = ('name', 'buffer_msec', 'prefill_msec', 'device_buffer_msec',
+                 'device_periods', 'frames_to_read', 'sample_rate')
+
+    def __init__(self, name: str, buffer_msec: int, prefill_msec: int,
+                 device_buffer_msec: int, device_periods: int,
+                 frames_to_read: int, sample_rate: int = 44100) -> None:
+        self.name: str = name
+        self.buffer_msec: int = buffer_msec
+        self.prefill_msec: int = prefill_msec
+        self.device_buffer_msec: int = device_buffer_msec
+        self.device_periods: int = device_periods
+        self.frames_to_read: int = frames_to_read
+        self.sample_rate: int = sample_rate
+
+    def to_dict(self) -> 'dict[str, object]':
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, values: 'dict[str, object]') -> 'PlaybackProfile':
+        return cls(**{slot: values[slot] for slot in cls.__slots__})
+
+
+LOW_LATENCY: PlaybackProfile = PlaybackProfile('Low latency', buffer_msec=600, prefill_msec=150,
+                                               device_buffer_msec=40, device_periods=3, frames_to_read=512)
+BALANCED: PlaybackProfile = PlaybackProfile('Balanced', buffer_msec=2000, prefill_msec=500,
+                                            device_buffer_msec=200, device_periods=0, frames_to_read=1024)
+HIGH_ROBUSTNESS: PlaybackProfile = PlaybackProfile('High robustness', buffer_msec=8000, prefill_msec=3000,
+                                                   device_buffer_msec=400, device_periods=4, frames_to_read=4096)
+PROFILES: 'dict[str, PlaybackProfile]' = {profile.name: profile for profile in (LOW_LATENCY, BALANCED, HIGH_ROBUSTNESS)}
+
+
+class PlaybackEngine:
+    '''
+    Owns the audio device and a single long-lived thread that starts, stops
+    and switches streams on commands sent through a queue, so the GUI never
+    touches miniaudio directly and no thread is left parked per stream.
+
+    Decoded audio goes through a JitterBuffer: playback only starts (and
+    resumes after an underrun) once prefill_msec of audio is buffered. A
+    live stream that stops delivering audio for stall_timeout seconds is
+    treated as dropped and reconnected.
+
+    Archive recordings are played from HttpRangeSources instead, starting at
+    the byte offset the file's MP3 index gives for the requested time, so
+    seeking only downloads from the new position on. With an AudioCache set,
+    what they download is kept on disk and replays are read from there.
+
+    With a recorder set, live streams are also recorded as they play: the
+    compressed bytes are teed to a new file every time the stream connects.
+
+    miniaudio is only imported once something is played, keeping it out of
+    start up.
+
+    The buffer sizes come from a PlaybackProfile. The time from play() to the
+    first sample reaching the device and the average buffer depth while
+    playing are measured, so profiles can be tuned per site.
+
+    More live streams can be played alongside the one started with play(),
+    each with its own reader thread and JitterBuffer, and mixed into the
+    same device with a per-stream volume, pan and mute. A stream that is
+    buffering is mixed in as silence, so it never holds up the others.
+    Mixing needs NumPy, which is only imported once it is used.
+
+    With levels enabled (NumPy again), the RMS and peak level of every block
+    sent to the device is tracked for a level meter, and a live stream that
+    stays silent for silence_timeout seconds is stopped, freeing its
+    connection; silence_stopped tells listeners why.
+
+    prewarm() connects to a live stream the user is likely to play next, for
+    instance the one under the mouse, and opens the audio device, so that
+    play() only has to hand over audio that is already decoded. A prewarmed
+    stream nobody plays is closed after prewarm_timeout seconds. Start
+    latencies of prewarmed and cold starts are measured separately.
+    '''
+
+    def __init__(self, profile: PlaybackProfile = BALANCED, nchannels: int = 2,
+                 stall_timeout: float = 8, reconnect_timeout: float = 120,
+                 backends: Optional['List[miniaudio.Backend]'] = None,
+                 prewarm_timeout: float = 15) -> None:
+        self.nchannels: int = nchannels
+        self.backends: Optional['List[miniaudio.Backend]'] = backends
+        self.apply_profile(profile)
+        self.stall_timeout: float = stall_timeout
+        self.reconnect_timeout: float = reconnect_timeout
+        self.prewarm_timeout: float = prewarm_timeout
+        self.device: Optional['miniaudio.PlaybackDevice'] = None
+        self.session: Optional[StreamSession] = None
+        self.warm: Optional[StreamSession] = None
+        self.monitors: 'tuple[StreamSession, ...]' = ()
+        self.channels: 'Dict[str, MixChannel]' = {}
+        self.unity_channel: Optional['MixChannel'] = None
+        self.mixer: Optional[Callable[..., array]] = None
+        self.level_tracker: Optional['LevelTracker'] = None
+        self.silence_timeout: float = 0
+        self.silence_stopped: bool = False
+        self.state: str = STOPPED
+        self.underruns: int = 0
+        self.reconnects: int = 0
+        self.outages: 'Deque[float]' = deque(maxlen=20)
+        self.start_latencies: 'Deque[float]' = deque(maxlen=20)
+        self.warm_start_latencies: 'Deque[float]' = deque(maxlen=20)
+        self.buffer_depth: float = 0
+        self.http: LazySession = LazySession()
+        self.archive_infos: 'Dict[str, Mp3Info]' = {}
+        self.archive_versions: 'Dict[str, tuple[Optional[int], Optional[str]]]' = {}
+        self.audio_cache: Optional['AudioCache'] = None
+        self.recorder: Optional[StreamRecorder] = None
+        self.listeners: 'List[Callable[[str], None]]' = []
+        self.commands: 'queue.Queue[tuple]' = queue.Queue()
+        self.thread: threading.Thread = threading.Thread(target=self.run, name='PlaybackEngine', daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self) -> Optional[str]:
+        session: Optional[StreamSession] = self.session
+        return session.url if session is not None else None
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        '''
+        Registers a callable that gets the new state on every state change.
+        It is called from the engine thread.
+        '''
+        self.listeners.append(listener)
+
+    def apply_profile(self, profile: PlaybackProfile) -> None:
+        self.profile: PlaybackProfile = profile
+        self.sample_rate: int = profile.sample_rate
+        self.buffer_frames: int = profile.sample_rate * profile.buffer_msec // 1000
+        self.prefill_frames: int = profile.sample_rate * profile.prefill_msec // 1000
+        self.device_buffer_msec: int = profile.device_buffer_msec
+        self.device_periods: int = profile.device_periods
+        self.frames_to_read: int = profile.frames_to_read
+
+    def set_profile(self, profile: PlaybackProfile) -> None:
+        '''
+        Switches to another profile; a stream that is playing is restarted
+        with the new buffer sizes.
+        '''
+        self.commands.put(('profile', profile))
+
+    def play(self, url: str, metadata: Optional['dict[str, object]'] = None) -> None:
+        '''
+        Plays a live stream, stopping whatever was playing; metadata
+        describes it in recordings.
+        '''
+        self.commands.put(('play', url, self.live_source(url, metadata), time.monotonic()))
+
+    def prewarm(self, url: Optional[str] = None, metadata: Optional['dict[str, object]'] = None) -> None:
+        '''
+        Gets ready to play url: opens the audio device and, unless live
+        streams are being recorded (a recording has to start with its
+        connection), connects to url and keeps its latest audio decoded for
+        prewarm_timeout seconds. Calling it again for the same url keeps it
+        warm for longer. Without url only the device is opened.
+        '''
+        source_factory = self.live_source(url, metadata) if url is not None and self.recorder is None else None
+        self.commands.put(('prewarm', url, source_factory))
+
+    def add_stream(self, url: str, metadata: Optional['dict[str, object]'] = None) -> None:
+        '''
+        Plays another live stream mixed with the ones already playing, or on
+        its own if nothing is.
+
+        Raises:
+            ImportError: if NumPy isn't installed.
+        '''
+        self.enable_mixer()
+        self.commands.put(('add', url, self.live_source(url, metadata), time.monotonic()))
+
+    def remove_stream(self, url: str) -> None:
+        '''
+        Stops one of the streams being mixed; the others keep playing.
+        '''
+        self.commands.put(('remove', url))
+
+    def set_mix(self, url: str, volume: Optional[float] = None, pan: Optional[float] = None,
+                muted: Optional[bool] = None) -> None:
+        '''
+        Changes how a stream is mixed; settings left as None are kept. They
+        apply right away and are remembered for the url.
+
+        Raises:
+            ImportError: if NumPy isn't installed.
+        '''
+        from mixer import MixChannel
+
+        self.enable_mixer()
+        channel: Optional[MixChannel] = self.channels.get(url)
+        if channel is None:
+            channel = self.channels[url] = MixChannel()
+        channel.update(volume, pan, muted)
+
+    def enable_mixer(self) -> None:
+        from mixer import MixChannel, mix
+
+        if self.unity_channel is None:
+            self.unity_channel = MixChannel()
+        self.mixer = mix
+
+    def enable_levels(self) -> None:
+        '''
+        Starts tracking the level of the audio played.
+
+        Raises:
+            ImportError: if NumPy isn't installed.
+        '''
+        from levels import LevelTracker
+
+        if self.level_tracker is None:
+            self.level_tracker = LevelTracker(self.sample_rate)
+
+    def set_silence_timeout(self, seconds: float) -> None:
+        '''
+        Stops live streams that stay silent for seconds; 0 turns it off.
+
+        Raises:
+            ImportError: if NumPy isn't installed.
+        '''
+        if seconds:
+            self.enable_levels()
+        self.silence_timeout = seconds
+
+    def streams(self) -> 'List[str]':
+        '''
+        streams returns the urls of the live streams playing, the one started
+        with play() first.
+        '''
+        session: Optional[StreamSession] = self.session
+        return [session.url for session in ((session,) if session is not None else ()) + self.monitors]
+
+    def live_source(self, url: str, metadata: Optional['dict[str, object]']) -> Callable[[], 'miniaudio.StreamableSource']:
+        def open_source() -> 'miniaudio.StreamableSource':
+            from livesource import HttpStreamSource
+
+            source: HttpStreamSource = HttpStreamSource(url, self.http)
+            recorder: Optional[StreamRecorder] = self.recorder
+            if recorder is None:
+                return source
+            try:
+                return TeeSource(source, recorder.start(source.audio_format, {'url': url, **(metadata or {})}))
+            except OSError as e:
+                print(f"Could not start recording: {e}")
+                return source
+
+        return open_source
+
+    def set_recorder(self, recorder: Optional[StreamRecorder]) -> None:
+        '''
+        Turns recording of live streams on or off, from their next connection on.
+        '''
+        self.recorder = recorder
+
+    def set_audio_cache(self, cache: Optional['AudioCache']) -> None:
+        '''
+        Turns caching of archive recordings on or off, from their next
+        start or seek on.
+        '''
+        self.audio_cache = cache
+
+    def play_archive(self, url: str, start_seconds: float = 0) -> None:
+        self.commands.put(('archive', url, start_seconds, time.monotonic()))
+
+    def seek(self, seconds: float) -> None:
+        '''
+        Restarts the archive recording that is playing at another time; does
+        nothing for live streams.
+        '''
+        self.commands.put(('seek', seconds, time.monotonic()))
+
+    def stop(self) -> None:
+        self.commands.put(('stop',))
+
+    def shutdown(self) -> None:
+        self.commands.put(('shutdown',))
+        self.thread.join(timeout=3)
+
+    def position(self) -> 'tuple[Optional[float], Optional[float]]':
+        '''
+        position is where playback of an archive recording is and how long it
+        is, in seconds, or (None, None) for a live stream.
+        '''
+        session: Optional[StreamSession] = self.session
+        if session is None or session.start_seconds is None:
+            return None, None
+        info: Optional[Mp3Info] = self.archive_infos.get(session.url)
+        return (session.start_seconds + session.played_frames / self.sample_rate,
+                info.duration if info is not None else None)
+
+    def stats(self) -> 'dict[str, object]':
+        session: Optional[StreamSession] = self.session
+        buffered: int = session.buffer.fill_frames if session is not None else 0
+        position, duration = self.position()
+        return {
+            'state': self.state,
+            'url': session.url if session is not None else None,
+            'streams': self.streams(),
+            'buffered_frames': buffered,
+            'buffered_msec': buffered * 1000 // self.sample_rate,
+            'buffer_capacity_msec': self.buffer_frames * 1000 // self.sample_rate,
+            'underruns': self.underruns,
+            'reconnects': self.reconnects,
+            'reconnect_attempts': session.backoff.attempt if session is not None and session.reconnecting else 0,
+            'outage_sec': time.monotonic() - session.outage_started if session is not None and session.outage_started is not None else 0,
+            'last_outage_sec': self.outages[-1] if self.outages else None,
+            'total_outage_sec': sum(self.outages),
+            'profile': self.profile.name,
+            'start_latency_msec': int(self.start_latencies[-1] * 1000) if self.start_latencies else None,
+            'average_start_latency_msec': int(sum(self.start_latencies) / len(self.start_latencies) * 1000) if self.start_latencies else None,
+            'average_warm_start_latency_msec': int(sum(self.warm_start_latencies) / len(self.warm_start_latencies) * 1000) if self.warm_start_latencies else None,
+            'prewarmed': self.warm.url if self.warm is not None else None,
+            'buffer_depth_msec': int(self.buffer_depth * 1000 / self.sample_rate),
+            'rms_db': round(self.level_tracker.rms_db, 1) if self.level_tracker is not None else None,
+            'peak_db': round(self.level_tracker.peak_db, 1) if self.level_tracker is not None else None,
+            'silent_sec': round(self.level_tracker.silent_seconds, 1) if self.level_tracker is not None else None,
+            'position_sec': position,
+            'duration_sec': duration,
+        }
+
+    def gauges(self) -> 'dict[str, float]':
+        '''
+        gauges returns the playback values worth graphing, for
+        metrics.add_collector.
+        '''
+        return {
+            'playback_playing': int(self.state == PLAYING),
+            'playback_buffer_depth_seconds': self.buffer_depth / self.sample_rate,
+            'playback_buffer_capacity_seconds': self.buffer_frames / self.sample_rate,
+        }
+
+    def set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        for listener in self.listeners:
+            listener(state)
+
+    def run(self) -> None:
+        while True:
+            try:
+                command: tuple = self.commands.get(timeout=0.5)
+            except queue.Empty:
+                self.check_stall()
+                self.check_silence()
+                self.check_warm()
+                continue
+            name: str = command[0]
+            try:
+                if name == 'play':
+                    self.start_session(command[1], command[2], command[3])
+                elif name == 'add':
+                    self.add_monitor(command[1], command[2], command[3])
+                elif name == 'remove':
+                    self.remove_monitor(command[1])
+                elif name == 'prewarm':
+                    self.start_warm(command[1], command[2])
+                elif name == 'archive':
+                    self.start_archive(command[1], command[2], command[3])
+                elif name == 'seek':
+                    if self.session is not None and self.session.start_seconds is not None:
+                        self.start_archive(self.session.url, command[1], command[2])
+                elif name == 'profile':
+                    self.change_profile(command[1])
+                elif name == 'stop':
+                    self.stop_session()
+                elif name == 'drained':
+                    if command[1] is self.session and not self.monitors:
+                        self.stop_session()
+                    elif command[1] is self.session or command[1] in self.monitors:
+                        self.remove_monitor(command[1].url)
+                elif name == 'buffered':
+                    if command[1] is self.session and self.state == BUFFERING:
+                        self.set_state(PLAYING)
+                elif name == 'started':
+                    if command[1].prewarmed:
+                        self.warm_start_latencies.append(command[2])
+                        metrics.observe('playback_warm_start_latency_seconds', command[2])
+                    else:
+                        metrics.observe('playback_start_latency_seconds', command[2])
+                elif name == 'underrun':
+                    metrics.increment('playback_underruns')
+                    if command[1] is self.session and self.state == PLAYING:
+                        self.set_state(BUFFERING)
+                elif name == 'reconnecting':
+                    metrics.increment('playback_disconnects')
+                    metrics.event('playback_disconnected', url=command[1].url)
+                    if command[1] is self.session:
+                        self.set_state(RECONNECTING)
+                elif name == 'reconnected':
+                    self.reconnects += 1
+                    self.outages.append(command[2])
+                    metrics.increment('playback_reconnects')
+                    metrics.observe('playback_outage_seconds', command[2])
+                    metrics.event('playback_reconnected', url=command[1].url, outage_sec=command[2])
+                    if command[1] is self.session and self.state == RECONNECTING:
+                        self.set_state(PLAYING if not command[1].buffering else BUFFERING)
+                elif name == 'shutdown':
+                    self.stop_session()
+                    self.stop_warm()
+                    if self.device is not None:
+                        self.device.close()
+                        self.device = None
+                    self.http.close()
+                    return
+            except Exception as e:
+                print(f"Playback error: {e}")
+                metrics.increment('playback_errors')
+                metrics.event('playback_error', error=str(e))
+                self.stop_session()
+
+    def check_stall(self) -> None:
+        session: Optional[StreamSession] = self.session
+        for session in ((session,) if session is not None else ()) + self.monitors:
+            if session.reconnect and session.is_stalled(self.stall_timeout):
+                metrics.increment('playback_stalls')
+                session.close_source()
+
+    def check_silence(self) -> None:
+        session: Optional[StreamSession] = self.session
+        tracker: Optional['LevelTracker'] = self.level_tracker
+        if session is None or tracker is None or not self.silence_timeout or session.start_seconds is not None:
+            return
+        if tracker.silent_seconds > self.silence_timeout:
+            print(f"Stopping {session.url}, silent for {int(tracker.silent_seconds)}s")
+            metrics.increment('playback_silence_stops')
+            metrics.event('playback_silence_stop', url=session.url, silent_sec=tracker.silent_seconds)
+            self.silence_stopped = True
+            self.stop_session()
+
+    def start_warm(self, url: Optional[str], source_factory: Optional[Callable[[], 'miniaudio.StreamableSource']]) -> None:
+        self.open_device()
+        if url is None or source_factory is None or url in self.streams():
+            return
+        warm_until: float = time.monotonic() + self.prewarm_timeout
+        if self.warm is not None and self.warm.url == url and not self.warm.finished:
+            self.warm.warm_until = warm_until
+            return
+        self.stop_warm()
+        metrics.increment('playback_prewarms')
+        self.warm = StreamSession(url, source_factory, self, warm_until=warm_until)
+        self.warm.start()
+
+    def take_warm(self, url: str) -> Optional[StreamSession]:
+        '''
+        take_warm hands over the prewarmed session for url, if there is one
+        still connected, and closes any other.
+        '''
+        warm: Optional[StreamSession] = self.warm
+        if warm is None or warm.url != url or warm.finished:
+            self.stop_warm()
+            return None
+        self.warm = None
+        warm.adopt()
+        metrics.increment('playback_prewarm_hits')
+        return warm
+
+    def stop_warm(self) -> None:
+        warm: Optional[StreamSession] = self.warm
+        self.warm = None
+        if warm is not None:
+            warm.stop()
+
+    def check_warm(self) -> None:
+        warm: Optional[StreamSession] = self.warm
+        if warm is not None and (warm.finished or time.monotonic() > warm.warm_until):
+            metrics.increment('playback_prewarm_expired')
+            self.stop_warm()
+
+    def change_profile(self, profile: PlaybackProfile) -> None:
+        session: Optional[StreamSession] = self.session
+        monitors: 'tuple[StreamSession, ...]' = self.monitors
+        position, _ = self.position()
+        self.stop_warm()
+        self.stop_session(CONNECTING if session is not None else STOPPED)
+        if self.device is not None:
+            self.device.close()
+            self.device = None
+        self.apply_profile(profile)
+        self.buffer_depth = 0
+        if session is not None and position is not None:
+            self.start_archive(session.url, position, time.monotonic())
+        elif session is not None:
+            self.start_session(session.url, session.source_factory, time.monotonic())
+            for monitor in monitors:
+                self.add_monitor(monitor.url, monitor.source_factory, time.monotonic())
+
+    def start_archive(self, url: str, start_seconds: float, requested: float) -> None:
+        def open_source() -> 'HttpRangeSource':
+            from rangesource import HttpRangeSource, probe_file
+
+            info: Optional[Mp3Info] = self.archive_infos.get(url)
+            if info is None:
+                info, size, validator = probe_file(self.http, url)
+                self.archive_infos[url] = info
+                self.archive_versions[url] = (size, validator)
+            cache: Optional['AudioCache'] = self.audio_cache
+            size, validator = self.archive_versions.get(url, (None, None))
+            entry: Optional['CacheEntry'] = cache.entry(url, size, validator) if cache is not None and size else None
+            return HttpRangeSource(url, info.byte_offset(start_seconds), self.http, cache=cache, cache_entry=entry)
+
+        self.start_session(url, open_source, requested, reconnect=False, start_seconds=max(start_seconds, 0))
+
+    def start_session(self, url: str, source_factory: Callable[[], 'miniaudio.StreamableSource'],
+                      requested: float, reconnect: bool = True, start_seconds: Optional[float] = None) -> None:
+        self.stop_session(CONNECTING)
+        self.silence_stopped = False
+        if self.level_tracker is not None:
+            self.level_tracker.reset(self.sample_rate)
+        session: Optional[StreamSession] = self.take_warm(url) if start_seconds is None else None
+        if session is None:
+            session = StreamSession(url, source_factory, self, reconnect)
+            session.start()
+        session.requested = requested
+        session.start_seconds = start_seconds
+        self.session = session
+        self.start_device()
+        self.set_state(BUFFERING)
+
+    def stop_session(self, state: str = STOPPED) -> None:
+        session: Optional[StreamSession] = self.session
+        monitors: 'tuple[StreamSession, ...]' = self.monitors
+        self.session = None
+        self.monitors = ()
+        if self.device is not None and self.device.running:
+            self.device.stop()
+        for session in ((session,) if session is not None else ()) + monitors:
+            session.stop()
+        self.set_state(state)
+
+    def add_monitor(self, url: str, source_factory: Callable[[], 'miniaudio.StreamableSource'],
+                    requested: float) -> None:
+        if self.session is None or self.session.start_seconds is not None:
+            self.start_session(url, source_factory, requested)
+            return
+        if url in self.streams():
+            return
+        session: Optional[StreamSession] = self.take_warm(url)
+        if session is None:
+            session = StreamSession(url, source_factory, self)
+            session.start()
+        self.monitors += (session,)
+
+    def remove_monitor(self, url: str) -> None:
+        '''
+        remove_monitor stops one mixed stream. If it is the one started with
+        play(), the next one takes its place.
+        '''
+        session: Optional[StreamSession] = self.session
+        if session is not None and session.url == url:
+            if not self.monitors:
+                self.stop_session()
+                return
+            self.session, self.monitors = self.monitors[0], self.monitors[1:]
+            session.stop()
+            if self.state == PLAYING and self.session.buffering:
+                self.set_state(BUFFERING)
+            return
+        for monitor in self.monitors:
+            if monitor.url == url:
+                self.monitors = tuple(other for other in self.monitors if other is not monitor)
+                monitor.stop()
+
+    def open_device(self) -> None:
+        import miniaudio
+
+        if self.device is None:
+            self.device = miniaudio.PlaybackDevice(output_format=miniaudio.SampleFormat.SIGNED16,
+                                                   nchannels=self.nchannels,
+                                                   sample_rate=self.sample_rate,
+                                                   buffersize_msec=self.device_buffer_msec,
+                                                   callback_periods=self.device_periods,
+                                                   backends=self.backends)
+
+    def start_device(self) -> None:
+        self.open_device()
+        if not self.device.running:
+            feed = self.feed()
+            next(feed)
+            self.device.start(feed)
+
+    def feed(self) -> 'miniaudio.PlaybackCallbackGeneratorType':
+        '''
+        The generator the device callback pulls frames from, on the audio
+        thread. It must never block.
+        '''
+        frames: int = yield b''
+        while True:
+            frames = yield self.pull(frames)
+
+    def pull(self, frames: int) -> array:
+        session: Optional[StreamSession] = self.session
+        if session is None:
+            return array('h')
+        samples: array = self.pull_session(session, frames)
+        playing: bool = bool(samples)
+        mixer: Optional[Callable[..., array]] = self.mixer
+        if mixer is not None:
+            channels: 'Dict[str, MixChannel]' = self.channels
+            blocks: 'List[tuple[array, MixChannel]]' = [(samples, channels.get(session.url, self.unity_channel))]
+            for monitor in self.monitors:
+                blocks.append((self.pull_monitor(monitor, frames), channels.get(monitor.url, self.unity_channel)))
+            samples = mixer(blocks, frames, self.nchannels)
+        tracker: Optional['LevelTracker'] = self.level_tracker
+        if tracker is not None and playing:
+            tracker.update(samples, self.nchannels)
+        return samples
+
+    def pull_monitor(self, session: StreamSession, frames: int) -> array:
+        if session.buffering:
+            if not session.finished and session.buffer.fill_frames < min(self.prefill_frames, self.buffer_frames):
+                return array('h')
+            session.buffering = False
+        samples: array = session.buffer.get(frames)
+        if len(samples) < frames * self.nchannels:
+            if not session.finished:
+                session.buffering = True
+            elif not session.drained:
+                session.drained = True
+                self.commands.put(('drained', session))
+        return samples
+
+    def pull_session(self, session: StreamSession, frames: int) -> array:
+        if session.buffering:
+            if not session.finished and session.buffer.fill_frames < min(self.prefill_frames, self.buffer_frames):
+                return array('h')
+            session.buffering = False
+            self.commands.put(('buffered', session))
+        samples: array = session.buffer.get(frames)
+        session.played_frames += len(samples) // self.nchannels
+        if samples and session.requested is not None:
+            self.start_latencies.append(time.monotonic() - session.requested)
+            self.commands.put(('started', session, self.start_latencies[-1]))
+            session.requested = None
+        if not session.buffering:
+            self.buffer_depth += (session.buffer.fill_frames - self.buffer_depth) * 0.01
+        if len(samples) < frames * self.nchannels:
+            if session.finished:
+                if not session.drained:
+                    session.drained = True
+                    self.commands.put(('drained', session))
+            else:
+                session.buffering = True
+                if not session.reconnecting:
+                    self.underruns += 1
+                    self.commands.put(('underrun', session))
+        return samples
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import time
+from typing import Callable, List, Optional
+
+from lazysession import LazySession
+from metrics import metrics
+from status import (ICECAST_URL, StatusSnapshot, parse_icecast_status,
+                    parse_status_page)
+
+HBNI_URL: str = "http://hbniaudio.hbni.net"
+ICECAST_STATUS_URL: str = f"{ICECAST_URL}/status-json.xsl"
+ICECAST_RETRY_SECONDS: float = 60
+ICECAST_RETRY_MAX_SECONDS: float = 900
+
+
+class StatusSource:
+    '''
+    A page describing which streams are live. Sources share the poller's
+    kept-alive session, send conditional requests and only parse a body
+    that actually changed; otherwise the last snapshot is handed back.
+    '''
+    name: str = ''
+
+    def __init__(self, session: 'requests.Session', url: str,
+                 timeout: float = 3) -> None:
+        self.session: 'requests.Session' = session
+        self.url: str = url
+        self.timeout: float = timeout
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.digest: Optional[bytes] = None
+        self.snapshot: Optional[StatusSnapshot] = None
+
+    def reset(self) -> None:
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self.snapshot = None
+
+    def fetch(self) -> StatusSnapshot:
+        headers: 'dict[str, str]' = {}
+        if self.snapshot is not None:
+            if self.etag is not None:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified is not None:
+                headers['If-Modified-Since'] = self.last_modified
+        response = self.session.get(self.url, headers=headers,
+                                    timeout=self.timeout)
+        if response.status_code == 304 and self.snapshot is not None:
+            metrics.increment('status_not_modified')
+            return self.snapshot
+        response.raise_for_status()
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        digest: bytes = hashlib.sha1(response.content).digest()
+        if digest != self.digest or self.snapshot is None:
+            with metrics.timer('status_parse_seconds'):
+                self.snapshot = self.parse(response.content)
+            self.digest = digest
+        return self.snapshot
+
+    def parse(self, content: bytes) -> StatusSnapshot:
+        raise NotImplementedError
+
+
+class IcecastJsonSource(StatusSource):
+    name = 'icecast'
+
+    def __init__(self, session: 'requests.Session',
+                 url: str = ICECAST_STATUS_URL, timeout: float = 3) -> None:
+        super().__init__(session, url, timeout)
+
+    def parse(self, content: bytes) -> StatusSnapshot:
+        return parse_icecast_status(json.loads(content.decode("utf8")))
+
+
+class HtmlStatusSource(StatusSource):
+    name = 'html'
+
+    def __init__(self, session: 'requests.Session', url: str = HBNI_URL,
+                 timeout: float = 3) -> None:
+        super().__init__(session, url, timeout)
+
+    def parse(self, content: bytes) -> StatusSnapshot:
+        return parse_status_page(content.decode("utf8"))
+
+
+class StatusPoller:
+    '''
+    Polls the live stream status over a single kept-alive session.
+
+    The Icecast JSON status is tried first since it is small and carries
+    per-mount listeners, bitrate and codec. The hbniaudio page is only read
+    for the event schedule while nothing is live, and becomes the source of
+    everything whenever the JSON status can't be fetched or understood.
+    After such a failure the JSON status is left alone for a while, doubling
+    from ICECAST_RETRY_SECONDS up to ICECAST_RETRY_MAX_SECONDS while it keeps
+    failing, so an unreachable Icecast doesn't cost a timeout every poll.
+    '''
+
+    def __init__(self, timeout: float = 3,
+                 icecast_url: str = ICECAST_STATUS_URL,
+                 html_url: str = HBNI_URL,
+                 clock: 'Callable[[], float]' = time.monotonic) -> None:
+        self.session: LazySession = LazySession()
+        self.icecast: IcecastJsonSource = IcecastJsonSource(self.session, icecast_url, timeout)
+        self.html: HtmlStatusSource = HtmlStatusSource(self.session, html_url, timeout)
+        self.sources: 'List[StatusSource]' = [self.icecast, self.html]
+        self.snapshot: Optional[StatusSnapshot] = None
+        self.source: Optional[StatusSource] = None
+        self.clock: 'Callable[[], float]' = clock
+        self.icecast_failures: int = 0
+        self.icecast_retry: float = 0
+
+    def reset(self) -> None:
+        '''
+        Forgets the last status so the next poll returns it even if it has
+        not changed, e.g. after the UI showed a network error.
+        '''
+        for source in self.sources:
+            source.reset()
+        self.snapshot = None
+
+    def fetch(self) -> StatusSnapshot:
+        import requests
+
+        if self.icecast_failures and self.clock() < self.icecast_retry:
+            self.source = self.html
+            return self.html.fetch()
+        try:
+            snapshot: StatusSnapshot = self.icecast.fetch()
+        except (requests.RequestException, ValueError, KeyError, TypeError, AttributeError) as e:
+            metrics.increment('status_html_fallbacks')
+            metrics.event('status_html_fallback', error=str(e))
+            self.icecast_failures += 1
+            self.icecast_retry = self.clock() + min(ICECAST_RETRY_SECONDS * 2 ** (self.icecast_failures - 1),
+                                                    ICECAST_RETRY_MAX_SECONDS)
+            self.source = self.html
+            return self.html.fetch()
+        self.icecast_failures = 0
+        self.source = self.icecast
+        if not snapshot.online:
+            try:
+                events: 'list[str]' = self.html.fetch().events
+            except (requests.RequestException, ValueError, KeyError, TypeError, AttributeError):
+                events = self.snapshot.events if self.snapshot is not None else []
+            snapshot = StatusSnapshot([], events, snapshot.listeners, False)
+        return snapshot
+
+    def poll(self) -> Optional[StatusSnapshot]:
+        '''
+        poll fetches the live stream status if it changed since the last poll.
+
+        Returns:
+            StatusSnapshot: the new status, or None if it is unchanged.
+        '''
+        metrics.increment('status_polls')
+        try:
+            with metrics.timer('status_poll_seconds'):
+                snapshot: StatusSnapshot = self.fetch()
+        except Exception as e:
+            metrics.increment('status_poll_failures')
+            metrics.event('status_poll_failed', error=str(e))
+            raise
+        if snapshot == self.snapshot:
+            return None
+        metrics.increment('status_changes')
+        metrics.set_gauge('streams_online', len(snapshot.streams))
+        if snapshot.listeners is not None:
+            metrics.set_gauge('listeners', snapshot.listeners)
+        self.snapshot = snapshot
+        return snapshot
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,45 @@
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+STARTED: float = time.perf_counter()
+
+
+class StartupProfiler:
+    '''
+    Times the phases of start up (imports, building the window, the first
+    paint) when the app is started with --profile-startup, and prints them
+    once the window is up. Disabled, every method does nothing.
+    '''
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled: bool = enabled
+        self.phases: 'List[tuple[str, float, float]]' = []
+        self.reported: bool = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start - STARTED, time.perf_counter() - start))
+
+    def mark(self, name: str) -> None:
+        if self.enabled:
+            self.phases.append((name, time.perf_counter() - STARTED, 0))
+
+    def report(self) -> None:
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        print(f'{"phase":<32} {"at ms":>8} {"took ms":>8}')
+        for name, at, took in self.phases:
+            print(f'{name:<32} {at * 1000:>8.1f} {took * 1000:>8.1f}')
+
+
+profiler: StartupProfiler = StartupProfiler('--profile-startup' in sys.argv[1:])
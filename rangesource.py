@@ -0,0 +1,197 @@
+import re
+import threading
+from typing import Optional
+
+import miniaudio
+import requests
+
+from audiocache import AudioCache, CacheEntry
+from mp3info import Mp3Info, id3v2_length, parse_mp3_info
+
+CONTENT_RANGE_REGEX = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+PROBE_BYTES: int = 16 * 1024
+
+
+def fetch_range(session: requests.Session, url: str, start: int, end: int,
+                timeout: float = 10) -> 'tuple[bytes, Optional[int], Optional[str]]':
+    '''
+    fetch_range downloads bytes start to end (inclusive) of a file.
+
+    Returns:
+        tuple[bytes, int, str]: the bytes, the size of the whole file if the
+        server said, and its ETag or Last-Modified date if it sent one.
+    '''
+    response = session.get(url, headers={'Range': f'bytes={start}-{end}'}, timeout=timeout, stream=True)
+    with response:
+        response.raise_for_status()
+        validator: Optional[str] = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        if response.status_code == 206:
+            match = CONTENT_RANGE_REGEX.match(response.headers.get('Content-Range', ''))
+            size: Optional[int] = int(match[3]) if match and match[3] != '*' else None
+            return response.raw.read(end - start + 1, decode_content=True), size, validator
+        # The server ignored the range; read just as far as needed.
+        length: Optional[str] = response.headers.get('Content-Length')
+        data: bytes = response.raw.read(end + 1, decode_content=True)
+        return data[start:], int(length) if length else None, validator
+
+
+def probe_file(session: requests.Session, url: str,
+               timeout: float = 10) -> 'tuple[Mp3Info, Optional[int], Optional[str]]':
+    '''
+    probe_file reads the MP3 layout of a remote file from its first few
+    kilobytes, skipping over an ID3v2 tag with a second range request if the
+    tag is bigger than the first one.
+
+    Returns:
+        tuple[Mp3Info, int, str]: the layout, the file's size if known and
+        its ETag or Last-Modified date if the server sent one.
+    '''
+    head, size, validator = fetch_range(session, url, 0, PROBE_BYTES - 1, timeout)
+    tag: int = id3v2_length(head)
+    if tag + 4096 > len(head) and (size is None or tag < size):
+        head, size, validator = fetch_range(session, url, tag, tag + PROBE_BYTES - 1, timeout)
+        return parse_mp3_info(head, size, offset=tag), size, validator
+    return parse_mp3_info(head, size), size, validator
+
+
+def probe(session: requests.Session, url: str, timeout: float = 10) -> Mp3Info:
+    return probe_file(session, url, timeout)[0]
+
+
+class HttpRangeSource(miniaudio.StreamableSource):
+    '''
+    A StreamableSource that downloads a file in chunk_size HTTP range
+    requests on a background thread, starting at a byte offset.
+
+    At most read_ahead bytes are fetched ahead of what the decoder has read,
+    so stopping or seeking wastes little of a metered connection. A failed
+    request is retried from the first byte not yet fetched with exponential
+    backoff, up to retries times in a row.
+
+    With a cache entry, bytes already in the AudioCache are read from disk
+    and only the gaps between them are requested, and everything downloaded
+    is written to the cache as it arrives.
+    '''
+
+    def __init__(self, url: str, start: int = 0, session: Optional[requests.Session] = None,
+                 chunk_size: int = 64 * 1024, read_ahead: int = 512 * 1024,
+                 timeout: float = 10, retries: int = 5,
+                 cache: Optional[AudioCache] = None, cache_entry: Optional[CacheEntry] = None) -> None:
+        self.url: str = url
+        self.audio_format: miniaudio.FileFormat = miniaudio.FileFormat.MP3
+        self.session: requests.Session = session or requests.Session()
+        self.chunk_size: int = chunk_size
+        self.read_ahead: int = read_ahead
+        self.timeout: float = timeout
+        self.retries: int = retries
+        self.position: int = start
+        self.fetched: int = start
+        self.cache: Optional[AudioCache] = cache if cache_entry is not None else None
+        self.cache_entry: Optional[CacheEntry] = cache_entry
+        self.size: Optional[int] = cache_entry.size if cache_entry is not None else None
+        self.downloaded: int = 0
+        self.buffer: bytearray = bytearray()
+        self.eof: bool = False
+        self.closed: bool = False
+        self.error: Optional[Exception] = None
+        self.condition: threading.Condition = threading.Condition()
+        self.thread: threading.Thread = threading.Thread(target=self.fetch, name=f'HttpRangeSource {url}', daemon=True)
+        self.thread.start()
+
+    def read(self, num_bytes: int) -> bytes:
+        with self.condition:
+            while not self.buffer and not self.eof and not self.closed:
+                self.condition.wait(0.1)
+            data: bytes = bytes(self.buffer[:num_bytes])
+            del self.buffer[:num_bytes]
+            self.position += len(data)
+            self.condition.notify_all()
+            return data
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.buffer.clear()
+            self.condition.notify_all()
+
+    def fetch(self) -> None:
+        failures: int = 0
+        try:
+            while not self.closed:
+                try:
+                    more: bool = self.request()
+                except (requests.RequestException, OSError) as e:
+                    if failures >= self.retries:
+                        self.error = e
+                        break
+                    with self.condition:
+                        self.condition.wait_for(lambda: self.closed, min(0.5 * 2 ** failures, 8))
+                    failures += 1
+                    continue
+                failures = 0
+                if not more:
+                    break
+        finally:
+            with self.condition:
+                self.eof = True
+                self.condition.notify_all()
+
+    def request(self) -> bool:
+        '''
+        request fetches the next chunk, waiting for room in the read-ahead
+        window first.
+
+        Returns:
+            bool: False at the end of the file or once closed.
+        '''
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or len(self.buffer) < self.read_ahead)
+            if self.closed:
+                return False
+        if self.size is not None and self.fetched >= self.size:
+            return False
+        end: int = self.fetched + self.chunk_size - 1
+        if self.size is not None:
+            end = min(end, self.size - 1)
+        if self.cache is not None:
+            cached: bytes = self.cache.read(self.cache_entry, self.fetched, self.chunk_size)
+            if cached:
+                return self.append(cached)
+            # Only download up to where the cache can take over again.
+            end = min(end, self.cache_entry.next_cached(self.fetched) - 1)
+        response = self.session.get(self.url, headers={'Range': f'bytes={self.fetched}-{end}'},
+                                    timeout=self.timeout, stream=True)
+        with response:
+            if response.status_code == 416:
+                return False
+            response.raise_for_status()
+            skip: int = 0
+            if response.status_code == 206:
+                match = CONTENT_RANGE_REGEX.match(response.headers.get('Content-Range', ''))
+                if match and match[3] != '*':
+                    self.size = int(match[3])
+            else:
+                # The server ignored the range and sends the whole file:
+                # drop what we already have and keep reading to the end.
+                skip = self.fetched
+            received: int = 0
+            for data in response.iter_content(16 * 1024):
+                if skip:
+                    data, skip = data[skip:], max(skip - len(data), 0)
+                received += len(data)
+                if self.cache is not None:
+                    self.cache.write(self.cache_entry, self.fetched, data)
+                if data and not self.append(data):
+                    return False
+            return response.status_code == 206 and received > 0
+
+    def append(self, data: bytes) -> bool:
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or len(self.buffer) < self.read_ahead)
+            if self.closed:
+                return False
+            self.buffer.extend(data)
+            self.fetched += len(data)
+            self.downloaded += len(data)
+            self.condition.notify_all()
+            return True
@@ -0,0 +1,127 @@
+import json
+import os
+import queue
+import re
+import threading
+from datetime import datetime
+from typing import Optional
+
+UNSAFE_FILE_NAME_REGEX = re.compile(r'[^\w\-]+')
+WRITE_BUFFER_BYTES: int = 256 * 1024
+
+
+def file_extension(audio_format: 'miniaudio.FileFormat') -> str:
+    return {
+        'MP3': '.mp3',
+        'VORBIS': '.ogg',
+        'FLAC': '.flac',
+        'WAV': '.wav',
+    }.get(getattr(audio_format, 'name', ''), '.bin')
+
+
+class Recording:
+    '''
+    One recording file and its JSON sidecar, written on a thread of its own
+    so the network reader only ever hands over references to the bytes it
+    already has.
+
+    The sidecar is written when the recording starts and again with the end
+    time and size when it is closed, so a crash still leaves it describing
+    the audio.
+    '''
+
+    def __init__(self, path: str, metadata: 'dict[str, object]') -> None:
+        self.path: str = path
+        self.sidecar_path: str = f'{os.path.splitext(path)[0]}.json'
+        self.metadata: 'dict[str, object]' = dict(metadata)
+        self.size: int = 0
+        self.chunks: 'queue.Queue[Optional[bytes]]' = queue.Queue()
+        self.file = open(path, 'xb', buffering=WRITE_BUFFER_BYTES)
+        self.write_sidecar()
+        self.thread: threading.Thread = threading.Thread(target=self.run, name=f'Recording {path}', daemon=True)
+        self.thread.start()
+
+    def write(self, data: bytes) -> None:
+        self.chunks.put(data)
+
+    def close(self) -> None:
+        self.chunks.put(None)
+
+    def run(self) -> None:
+        try:
+            while True:
+                data: Optional[bytes] = self.chunks.get()
+                if data is None:
+                    break
+                self.file.write(data)
+                self.size += len(data)
+        except OSError as e:
+            print(f"Recording error: {e}")
+        finally:
+            self.file.close()
+            self.metadata['ended'] = datetime.now().isoformat(timespec='seconds')
+            self.metadata['bytes'] = self.size
+            try:
+                self.write_sidecar()
+            except OSError as e:
+                print(f"Recording error: {e}")
+
+    def write_sidecar(self) -> None:
+        temporary_path: str = f'{self.sidecar_path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(self.metadata, f, indent=4)
+        os.replace(temporary_path, self.sidecar_path)
+
+
+class StreamRecorder:
+    '''
+    Creates the recordings made while listening, named like the archive's
+    recordings (Title_YYYY-MM-DD_HH_MM.mp3) in directory.
+    '''
+
+    def __init__(self, directory: str) -> None:
+        self.directory: str = directory
+
+    def start(self, audio_format: 'miniaudio.FileFormat', metadata: 'dict[str, object]') -> Recording:
+        os.makedirs(self.directory, exist_ok=True)
+        started: datetime = datetime.now()
+        name: str = UNSAFE_FILE_NAME_REGEX.sub('_', str(metadata.get('title') or metadata.get('mount') or 'Stream')).strip('_')
+        stem: str = os.path.join(self.directory, f'{name}_{started:%Y-%m-%d_%H_%M}')
+        extension: str = file_extension(audio_format)
+        metadata = {**metadata, 'started': started.isoformat(timespec='seconds')}
+        # A stream that restarts within the same minute gets a numbered file.
+        for number in range(1, 1000):
+            path: str = f'{stem}{extension}' if number == 1 else f'{stem}_{number}{extension}'
+            try:
+                return Recording(path, metadata)
+            except FileExistsError:
+                continue
+        raise FileExistsError(f'{stem}{extension}')
+
+
+class TeeSource:
+    '''
+    Wraps a network source and copies the compressed bytes the decoder reads
+    from it into a Recording, without decoding or re-encoding them.
+
+    It has the read/seek/close interface of a miniaudio.StreamableSource
+    without subclassing it, so this module doesn't import miniaudio.
+    '''
+
+    def __init__(self, source: 'miniaudio.StreamableSource', recording: Recording) -> None:
+        self.source: 'miniaudio.StreamableSource' = source
+        self.recording: Recording = recording
+        self.audio_format: 'miniaudio.FileFormat' = source.audio_format
+
+    def read(self, num_bytes: int) -> bytes:
+        data: bytes = self.source.read(num_bytes)
+        if data:
+            self.recording.write(data)
+        return data
+
+    def seek(self, offset: int, origin: 'miniaudio.SeekOrigin') -> bool:
+        return False
+
+    def close(self) -> None:
+        self.recording.close()
+        self.source.close()
@@ -0,0 +1,119 @@
+import os
+import threading
+from typing import Dict, Optional
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QIcon, QPixmap
+
+from paths import user_cache_dir
+
+DARK: str = 'dark'
+LIGHT: str = 'light'
+
+
+class ResourceCache:
+    '''
+    Icons, pixmaps and stylesheets loaded once and shared, keyed by
+    (resource, theme, size).
+
+    Resource paths may contain {theme} ("dark"/"light") or {color} ("white"
+    on the dark theme, "black" on the light one), e.g.
+    "icons/play_{color}.png"; those are cached per theme, so switching
+    themes back and forth never touches the disk again. Paths without a
+    placeholder are shared by both themes.
+    '''
+
+    def __init__(self, theme: str = LIGHT, cache_dir: Optional[str] = None) -> None:
+        self.theme: str = theme
+        self.cache_dir: Optional[str] = cache_dir
+        self.icons: 'Dict[tuple, QIcon]' = {}
+        self.pixmaps: 'Dict[tuple, QPixmap]' = {}
+        self.stylesheets: 'Dict[str, str]' = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def set_theme(self, theme: str) -> None:
+        self.theme = theme
+
+    def key(self, path: str, theme: Optional[str], size: Optional[int] = None) -> tuple:
+        theme = theme or self.theme
+        themed: bool = '{theme}' in path or '{color}' in path
+        return (path.format(theme=theme, color='white' if theme == DARK else 'black') if themed else path,
+                theme if themed else None, size)
+
+    def icon(self, path: str, theme: Optional[str] = None) -> QIcon:
+        key: tuple = self.key(path, theme)
+        icon: Optional[QIcon] = self.icons.get(key)
+        if icon is None:
+            icon = self.icons[key] = QIcon(key[0])
+        return icon
+
+    def pixmap(self, path: str, size: Optional[int] = None, theme: Optional[str] = None) -> QPixmap:
+        '''
+        pixmap returns the image at path, scaled to fit a size x size square
+        keeping its aspect ratio if size is given.
+        '''
+        key: tuple = self.key(path, theme, size)
+        pixmap: Optional[QPixmap] = self.pixmaps.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(key[0])
+            if size is not None:
+                pixmap = pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.pixmaps[key] = pixmap
+        return pixmap
+
+    def stylesheet(self, theme: Optional[str] = None) -> str:
+        '''
+        stylesheet returns theme's stylesheet. Importing qdarktheme and
+        generating one takes longer than building the rest of the window, so
+        the last one generated is read back from the cache directory when
+        there is one.
+        '''
+        theme = theme or self.theme
+        with self.lock:
+            stylesheet: Optional[str] = self.stylesheets.get(theme)
+            if stylesheet is None:
+                stylesheet = self.stylesheets[theme] = self.load_stylesheet(theme) or self.generate_stylesheet(theme)
+            return stylesheet
+
+    def stylesheet_path(self, theme: str) -> str:
+        return os.path.join(self.cache_dir or user_cache_dir(), f'stylesheet-{theme}.qss')
+
+    def load_stylesheet(self, theme: str) -> Optional[str]:
+        try:
+            with open(self.stylesheet_path(theme), 'r', encoding='utf-8') as f:
+                return f.read() or None
+        except OSError:
+            return None
+
+    def generate_stylesheet(self, theme: str) -> str:
+        import qdarktheme
+
+        stylesheet: str = qdarktheme.load_stylesheet(theme)
+        path: str = self.stylesheet_path(theme)
+        try:
+            with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+                f.write(stylesheet)
+            os.replace(f'{path}.tmp', path)
+        except OSError as e:
+            print(f"Could not cache the {theme} stylesheet: {e}")
+        return stylesheet
+
+    def precompute_stylesheets(self) -> None:
+        '''
+        Generates both themes' stylesheets afresh and caches them, so a
+        qdarktheme update shows by the next start. qdarktheme builds them in
+        plain Python, so this can run on a worker thread.
+        '''
+        for theme in (DARK, LIGHT):
+            stylesheet: str = self.generate_stylesheet(theme)
+            with self.lock:
+                self.stylesheets[theme] = stylesheet
+
+    def clear(self) -> None:
+        with self.lock:
+            self.icons.clear()
+            self.pixmaps.clear()
+            self.stylesheets.clear()
+
+
+resources: ResourceCache = ResourceCache()
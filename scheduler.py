@@ -0,0 +1,129 @@
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from status import StatusSnapshot, event_start
+
+FAST: str = 'fast'
+LIVE: str = 'live'
+DUE: str = 'due'
+SCHEDULED: str = 'scheduled'
+IDLE: str = 'idle'
+OFFLINE: str = 'offline'
+
+
+class PollScheduler:
+    '''
+    Decides how long to wait before the next status poll, based on what
+    the polls so far have found:
+
+    - fast seconds for settle seconds after a stream starts, and from lead
+      before a scheduled event until grace after its start time;
+    - live seconds while streams stay on;
+    - scheduled seconds while there are events whose time can't be read;
+    - idle seconds when nothing is on or due, waking early for the next
+      event;
+    - doubling from fast up to max_backoff while the status can't be
+      fetched.
+
+    A hidden window polls hidden_factor times less often, up to hidden_max.
+    While auto start is waiting, an event that is due is still polled fast
+    and nothing is polled less often than idle. Every interval is moved by
+    up to jitter of itself either way, so stations that started together
+    don't keep polling the server at the same moment.
+    '''
+
+    def __init__(self, fast: float = 5, live: float = 15, scheduled: float = 30, idle: float = 60,
+                 max_backoff: float = 300, hidden_factor: float = 4, hidden_max: float = 300,
+                 jitter: float = 0.2, settle: float = 120,
+                 lead: timedelta = timedelta(minutes=10), grace: timedelta = timedelta(minutes=30),
+                 clock: 'Callable[[], float]' = time.monotonic) -> None:
+        self.fast: float = fast
+        self.live: float = live
+        self.scheduled: float = scheduled
+        self.idle: float = idle
+        self.max_backoff: float = max_backoff
+        self.hidden_factor: float = hidden_factor
+        self.hidden_max: float = hidden_max
+        self.jitter: float = jitter
+        self.settle: float = settle
+        self.lead: timedelta = lead
+        self.grace: timedelta = grace
+        self.clock: 'Callable[[], float]' = clock
+        self.snapshot: Optional[StatusSnapshot] = None
+        self.event_starts: 'List[Optional[datetime]]' = []
+        self.stream_started: Optional[float] = None
+        self.failures: int = 0
+        self.state: str = FAST
+
+    def polled(self, snapshot: Optional[StatusSnapshot]) -> None:
+        '''
+        polled records a successful poll.
+
+        Args:
+            snapshot (StatusSnapshot): the new status, or None if it didn't
+                change
+        '''
+        self.failures = 0
+        if snapshot is None:
+            return
+        mounts: 'set[str]' = {stream.mount for stream in snapshot.streams}
+        previous: 'set[str]' = {stream.mount for stream in self.snapshot.streams} if self.snapshot is not None else set()
+        if mounts - previous:
+            self.stream_started = self.clock()
+        if self.snapshot is None or snapshot.events != self.snapshot.events:
+            self.event_starts = [event_start(event) for event in snapshot.events]
+        self.snapshot = snapshot
+
+    def failed(self) -> None:
+        self.failures += 1
+
+    def interval(self, now: Optional[datetime] = None) -> float:
+        '''
+        interval is the seconds until the next poll for a visible window,
+        without jitter, and sets state to why.
+        '''
+        if self.failures:
+            self.state = OFFLINE
+            return min(self.fast * 2 ** self.failures, self.max_backoff)
+        snapshot: Optional[StatusSnapshot] = self.snapshot
+        if snapshot is None:
+            self.state = FAST
+            return self.fast
+        if snapshot.streams:
+            if self.stream_started is not None and self.clock() - self.stream_started < self.settle:
+                self.state = FAST
+                return self.fast
+            self.state = LIVE
+            return self.live
+        now = now or datetime.now()
+        interval: float = self.idle
+        self.state = IDLE
+        for start in self.event_starts:
+            if start is None:
+                if self.scheduled < interval:
+                    interval, self.state = self.scheduled, SCHEDULED
+            elif start - self.lead <= now <= start + self.grace:
+                self.state = DUE
+                return self.fast
+            elif now < start - self.lead:
+                interval = min(interval, max((start - self.lead - now).total_seconds(), self.fast))
+        return interval
+
+    def next_interval(self, hidden: bool = False, auto_start: bool = False,
+                      now: Optional[datetime] = None) -> float:
+        '''
+        next_interval is the seconds to wait before the next poll.
+
+        Args:
+            hidden (bool): whether the window is hidden or minimised
+            auto_start (bool): whether a stream would be played as soon as
+                one is found
+            now (datetime, optional): the local time, for the event schedule
+        '''
+        interval: float = self.interval(now)
+        if hidden and self.state != OFFLINE and not (auto_start and self.state == DUE):
+            limit: float = self.idle if auto_start else self.hidden_max
+            interval = max(interval, min(interval * self.hidden_factor, limit))
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
@@ -0,0 +1,284 @@
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+ICECAST_URL: str = "http://hbniaudio.hbni.net:8000"
+
+NO_STREAMS_TEXT: str = 'No streams currently online.'
+NO_EVENTS_TEXT: 'tuple[str, ...]' = ('no schedule', 'no upcoming events', 'no events')
+
+EVENT_TAG: str = '<div class="event">'
+EVENT_DATE_REGEX = re.compile(r'<p class="date">(.*?)</p>', re.S)
+TAG_REGEX = re.compile(r'<[^>]*>')
+WEEKDAY_REGEX = re.compile(r'\b(mon|tues|wednes|thurs|fri|satur|sun)day\b', re.I)
+MERIDIEM_REGEX = re.compile(r'(\d)\s*([ap])\.?m\b\.?', re.I)
+EVENT_DAY_FORMATS: 'tuple[str, ...]' = ('%Y-%m-%d', '%B %d %Y', '%b %d %Y', '%m/%d/%Y', '%B %d', '%b %d')
+EVENT_TIME_FORMATS: 'tuple[str, ...]' = ('%H:%M', '%I:%M %p', '%I %p')
+
+STREAM_ATTRIBUTE_REGEX = re.compile(r"data-(mnt|stream)=([\"'])((?:\\.|(?!\2).)*)\2")
+LISTENERS_REGEX = re.compile(r'Current Number of Listeners: ([0-9]*)')
+
+CODECS: 'dict[str, str]' = {
+    'audio/mpeg': 'MP3',
+    'audio/ogg': 'Ogg',
+    'application/ogg': 'Ogg',
+    'audio/aac': 'AAC',
+    'audio/aacp': 'AAC+',
+    'audio/flac': 'FLAC',
+}
+
+
+class StreamInfo:
+    __slots__ = ('mount', 'title', 'description', 'url', 'listeners',
+                 'bitrate', 'codec', 'started')
+
+    def __init__(self, mount: str, description: str,
+                 listeners: Optional[int] = None,
+                 bitrate: Optional[int] = None,
+                 codec: Optional[str] = None,
+                 started: Optional[datetime] = None) -> None:
+        self.mount: str = mount
+        self.title: str = mount.replace('/', '').title()
+        self.description: str = description
+        self.url: str = f'{ICECAST_URL}{mount}'
+        self.listeners: Optional[int] = listeners
+        self.bitrate: Optional[int] = bitrate
+        self.codec: Optional[str] = codec
+        self.started: Optional[datetime] = started
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, StreamInfo):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot)
+                   for slot in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f'StreamInfo({self.mount!r}, {self.description!r})'
+
+    @property
+    def details(self) -> str:
+        '''
+        The per-mount details only the Icecast status exposes, such as
+        "64 kbps MP3 - 3 listeners - live since 10:02", or '' if unknown.
+        '''
+        details: 'List[str]' = []
+        if self.bitrate:
+            details.append(f'{self.bitrate} kbps {self.codec or ""}'.strip())
+        elif self.codec:
+            details.append(self.codec)
+        if self.listeners is not None:
+            details.append(f'{self.listeners} listener{"" if self.listeners == 1 else "s"}')
+        if self.started is not None:
+            details.append(f'live since {self.started.strftime("%H:%M")}')
+        return ' - '.join(details)
+
+    def metadata(self) -> 'dict[str, object]':
+        '''
+        The stream's details as plain values, for recordings and the control
+        socket.
+        '''
+        return {
+            'mount': self.mount,
+            'title': self.title,
+            'description': self.description,
+            'url': self.url,
+            'listeners': self.listeners,
+            'bitrate': self.bitrate,
+            'codec': self.codec,
+            'stream_started': self.started.isoformat() if self.started else None,
+        }
+
+
+class StatusSnapshot:
+    '''
+    Everything the UI needs from one poll of the hbniaudio status page.
+    '''
+    __slots__ = ('streams', 'events', 'listeners', 'online')
+
+    def __init__(self, streams: 'List[StreamInfo]', events: 'List[str]',
+                 listeners: Optional[int], online: bool) -> None:
+        self.streams: 'List[StreamInfo]' = streams
+        self.events: 'List[str]' = events
+        self.listeners: Optional[int] = listeners
+        self.online: bool = online
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, StatusSnapshot):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot)
+                   for slot in self.__slots__)
+
+    @property
+    def events_html(self) -> str:
+        return ''.join(self.events)
+
+    @property
+    def listeners_text(self) -> str:
+        if self.listeners is None:
+            return ''
+        return f'Current Number of Listeners: {self.listeners}'
+
+    def metadata(self) -> 'dict[str, object]':
+        '''
+        The status as plain values, for the control socket.
+        '''
+        return {
+            'online': self.online,
+            'listeners': self.listeners,
+            'streams': [stream.metadata() for stream in self.streams],
+            'events': self.events,
+        }
+
+
+def find_events(html: str) -> 'List[str]':
+    '''
+    find_events returns every <div class="event"> block of the page, nested
+    divs included, in a single left to right scan.
+
+    Args:
+        html (str): the html of the status page
+
+    Returns:
+        list[str]: the html of each event, empty if no events are scheduled.
+    '''
+    events: 'List[str]' = []
+    start: int = html.find(EVENT_TAG)
+    while start != -1:
+        position: int = start + len(EVENT_TAG)
+        depth: int = 1
+        while depth:
+            close: int = html.find('</div>', position)
+            if close == -1:
+                return events
+            opened: int = html.find('<div', position, close)
+            if opened == -1:
+                depth -= 1
+                position = close + len('</div>')
+            else:
+                depth += 1
+                position = opened + len('<div')
+        events.append(html[start:position])
+        start = html.find(EVENT_TAG, position)
+    if events:
+        text: str = events[0].lower()
+        if any(no_events in text for no_events in NO_EVENTS_TEXT):
+            return []
+    return events
+
+
+def parse_event_time(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    '''
+    parse_event_time reads when an event starts from the text of its date,
+    such as "2022-02-20 10:00" or "Sunday, February 20 at 10:00 a.m.", in
+    local time. A date without a year is taken to be the one closest to now.
+
+    Args:
+        text (str): the date of the event, markup included
+        now (datetime, optional): the time to resolve dates without a year
+            against, now by default
+
+    Returns:
+        datetime: when the event starts, or None if text isn't a date and
+        time this understands.
+    '''
+    text = MERIDIEM_REGEX.sub(lambda match: f'{match[1]} {match[2].upper()}M', WEEKDAY_REGEX.sub(' ', TAG_REGEX.sub(' ', text)))
+    text = ' '.join(word for word in text.replace(',', ' ').split() if word.lower() not in ('at', '@', '-'))
+    for day_format in EVENT_DAY_FORMATS:
+        for time_format in EVENT_TIME_FORMATS:
+            try:
+                start: datetime = datetime.strptime(text, f'{day_format} {time_format}')
+            except ValueError:
+                continue
+            if '%Y' not in day_format:
+                now = now or datetime.now()
+                start = start.replace(year=now.year)
+                if start < now - timedelta(days=183):
+                    start = start.replace(year=now.year + 1)
+                elif start > now + timedelta(days=183):
+                    start = start.replace(year=now.year - 1)
+            return start
+    return None
+
+
+def event_start(event: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    '''
+    When the event, one of the blocks find_events returns, starts according
+    to its <p class="date">, or None if it has no date that can be read.
+    '''
+    match = EVENT_DATE_REGEX.search(event)
+    return parse_event_time(match[1], now) if match is not None else None
+
+
+def parse_status_page(html: str) -> StatusSnapshot:
+    '''
+    parse_status_page turns the hbniaudio status page into a StatusSnapshot.
+
+    Args:
+        html (str): the html of the status page
+
+    Returns:
+        StatusSnapshot: the streams, events and listeners on the page.
+    '''
+    mounts: 'List[str]' = []
+    descriptions: 'List[str]' = []
+    for match in STREAM_ATTRIBUTE_REGEX.finditer(html):
+        if match[1] == 'mnt':
+            mounts.append(match[3])
+        else:
+            descriptions.append(match[3])
+    online: bool = NO_STREAMS_TEXT not in html
+    streams: 'List[StreamInfo]' = [
+        StreamInfo(mount, description)
+        for mount, description in zip(mounts, descriptions)
+    ] if online else []
+    listeners_match = LISTENERS_REGEX.search(html)
+    listeners: Optional[int] = None
+    if listeners_match is not None:
+        listeners = int(listeners_match[1] or 0)
+    return StatusSnapshot(streams, find_events(html), listeners, online)
+
+
+def parse_icecast_date(text: Optional[str]) -> Optional[datetime]:
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text, '%Y-%m-%dT%H:%M:%S%z')
+    except ValueError:
+        return None
+
+
+def parse_icecast_status(data: dict) -> StatusSnapshot:
+    '''
+    parse_icecast_status turns the JSON served by Icecast's status-json.xsl
+    into a StatusSnapshot. Icecast does not know about scheduled events, so
+    the snapshot never has any.
+
+    Args:
+        data (dict): the decoded status-json.xsl document
+
+    Returns:
+        StatusSnapshot: the mounts that are live and their listeners.
+    '''
+    sources = data['icestats'].get('source') or []
+    if isinstance(sources, dict):
+        sources = [sources]
+    streams: 'List[StreamInfo]' = []
+    for source in sources:
+        mount: str = urlsplit(source.get('listenurl') or '').path
+        if not mount:
+            continue
+        bitrate = source.get('bitrate') or source.get('ice-bitrate')
+        if not bitrate and source.get('audio_bitrate'):
+            bitrate = int(source['audio_bitrate']) // 1000
+        server_type: str = source.get('server_type') or ''
+        streams.append(StreamInfo(
+            mount,
+            source.get('server_description') or source.get('server_name') or source.get('title') or '',
+            listeners=source.get('listeners'),
+            bitrate=int(bitrate) if bitrate else None,
+            codec=CODECS.get(server_type, server_type or None),
+            started=parse_icecast_date(source.get('stream_start_iso8601')),
+        ))
+    listeners: int = sum(stream.listeners or 0 for stream in streams)
+    return StatusSnapshot(streams, [], listeners, bool(streams))
@@ -0,0 +1,85 @@
+import http.server
+import os
+import re
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RANGE_REGEX = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class FileRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.0'
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self.respond(head=True)
+
+    def do_GET(self) -> None:
+        self.respond(head=False)
+
+    def respond(self, head: bool) -> None:
+        server: FileServer = self.server
+        server.requests.append((self.command, self.path, self.headers.get('Range')))
+        body = server.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        if server.headers.get('ETag') is not None and self.headers.get('If-None-Match') == server.headers['ETag']:
+            self.send_response(304)
+            self.end_headers()
+            return
+        start, end, status = 0, len(body) - 1, 200
+        match = RANGE_REGEX.fullmatch(self.headers.get('Range', ''))
+        if match is not None and server.ranges and not server.ignore_range:
+            start, status = int(match[1]), 206
+            end = min(int(match[2]), end) if match[2] else end
+        self.send_response(status)
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+        if server.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        if server.lengths:
+            self.send_header('Content-Length', str(end - start + 1))
+        for name, value in server.headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body[start:end + 1])
+
+
+class FileServer(http.server.ThreadingHTTPServer):
+    '''
+    Serves files from memory, with range requests and Content-Length unless
+    ranges or lengths are turned off, answers If-None-Match with 304 when
+    headers has an ETag, and records every request it gets. With
+    ignore_range it still advertises ranges but sends whole files.
+    '''
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super(FileServer, self).__init__(('127.0.0.1', 0), FileRequestHandler)
+        self.files: 'dict[str, bytes]' = {}
+        self.headers: 'dict[str, str]' = {}
+        self.ranges: bool = True
+        self.lengths: bool = True
+        self.ignore_range: bool = False
+        self.requests: 'list[tuple[str, str, str]]' = []
+
+    def url(self, path: str) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+@pytest.fixture
+def file_server():
+    server = FileServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
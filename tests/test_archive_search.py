@@ -0,0 +1,70 @@
+from datetime import date, datetime
+
+from archive_search import (SORT_NAME, SORT_NEWEST, SORT_OLDEST, ArchiveEntry,
+                            ArchiveSearchIndex)
+
+NAMES: 'list[str]' = [
+    'Oak_Bluff_Peter_2001-03-04_10_00.mp3',
+    'Oak_Bluff_John_2001-07-01_09_30.mp3',
+    'Riverside_Peter_2000-12-24_19_00.mp3',
+    'Riverside_Paul_2002-01-06_10_15.mp3',
+    'Untitled recording.mp3',
+]
+
+
+def make_index(names: 'list[str]' = NAMES) -> ArchiveSearchIndex:
+    index = ArchiveSearchIndex()
+    index.update(names)
+    return index
+
+
+def test_entry_fields():
+    entry = ArchiveEntry('Oak_Bluff_Peter_2001-03-04_10_00.mp3')
+    assert entry.location == 'Oak Bluff'
+    assert entry.speaker == 'Peter'
+    assert entry.recorded == datetime(2001, 3, 4, 10, 0)
+    assert ArchiveEntry('Untitled recording.mp3').recorded is None
+
+
+def test_orders():
+    index = make_index()
+    assert index.search(sort=SORT_OLDEST) == [NAMES[4], NAMES[2], NAMES[0], NAMES[1], NAMES[3]]
+    assert index.search(sort=SORT_NEWEST) == index.search(sort=SORT_OLDEST)[::-1]
+    assert index.search(sort=SORT_NAME) == sorted(NAMES, key=str.lower)
+
+
+def test_words_must_all_match():
+    index = make_index()
+    assert index.search('peter', sort=SORT_OLDEST) == [NAMES[2], NAMES[0]]
+    assert index.search('oak peter') == [NAMES[0]]
+    assert index.search('oak:bluff 2001-03') == [NAMES[0]]
+    assert index.search('pe') == [NAMES[0], NAMES[2]]
+    assert index.search('nobody') == []
+
+
+def test_typing_narrows_the_last_query():
+    index = make_index()
+    for end in range(1, len('riverside pa') + 1):
+        assert index.search('riverside pa'[:end]) == make_index().search('riverside pa'[:end])
+    assert index.search('riverside pa') == [NAMES[3]]
+
+
+def test_date_range():
+    index = make_index()
+    assert index.search('', date(2001, 1, 1), date(2001, 12, 31), sort=SORT_OLDEST) == [NAMES[0], NAMES[1]]
+    assert index.search('', date(2001, 1, 1), date(2001, 12, 31), sort=SORT_NEWEST) == [NAMES[1], NAMES[0]]
+    assert index.search('', date(2001, 1, 1), None, sort=SORT_NAME) == [NAMES[1], NAMES[0], NAMES[3]]
+    assert index.search('peter', None, date(2001, 3, 4)) == [NAMES[0], NAMES[2]]
+    assert index.search('', date(2001, 3, 4), date(2001, 3, 4)) == [NAMES[0]]
+
+
+def test_small_updates_keep_the_date_order():
+    base: 'list[str]' = [f'Place_Speaker_{2000 + i % 20}-{i % 12 + 1:02d}-01_10_00.mp3' for i in range(100)]
+    index = make_index(base)
+    changed: 'list[str]' = base[3:] + NAMES
+    assert index.update(changed)
+    fresh = make_index(changed)
+    assert index.by_date == fresh.by_date
+    assert index.dates == fresh.dates
+    assert index.search('', date(2001, 1, 1), date(2001, 12, 31)) == fresh.search('', date(2001, 1, 1), date(2001, 12, 31))
+    assert not index.update(changed)
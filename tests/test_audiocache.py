@@ -0,0 +1,64 @@
+import os
+
+from audiocache import AudioCache, add_range
+
+
+def test_add_range_merges_overlapping_and_adjacent():
+    assert add_range([], 10, 20) == [[10, 20]]
+    assert add_range([[0, 10], [30, 40]], 10, 30) == [[0, 40]]
+    assert add_range([[0, 10], [30, 40]], 15, 20) == [[0, 10], [15, 20], [30, 40]]
+
+
+def test_write_and_read_back(tmp_path):
+    cache = AudioCache(str(tmp_path), budget=1000)
+    entry = cache.entry('http://host/a.mp3', 100, '"1"')
+    assert cache.read(entry, 0, 10) == b''
+    cache.write(entry, 0, b'a' * 40)
+    cache.write(entry, 60, b'b' * 40)
+    assert cache.read(entry, 30, 20) == b'a' * 10
+    assert entry.next_cached(40) == 60
+    assert not entry.complete
+    cache.write(entry, 40, b'c' * 20)
+    assert entry.complete
+    assert cache.read(entry, 0, 100) == b'a' * 40 + b'c' * 20 + b'b' * 40
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_evicts_least_recently_played(tmp_path):
+    cache = AudioCache(str(tmp_path), budget=250)
+    first = cache.entry('http://host/1.mp3', 100, None)
+    cache.write(first, 0, b'1' * 100)
+    second = cache.entry('http://host/2.mp3', 100, None)
+    cache.write(second, 0, b'2' * 100)
+    cache.entry('http://host/1.mp3', 100, None)  # played again
+    third = cache.entry('http://host/3.mp3', 100, None)
+    cache.write(third, 0, b'3' * 100)
+    assert [entry.url for entry in cache.entries.values()] == ['http://host/1.mp3', 'http://host/3.mp3']
+    assert not os.path.exists(cache.path(second))
+    assert cache.total_bytes() == 200
+
+
+def test_too_big_and_changed_recordings(tmp_path):
+    cache = AudioCache(str(tmp_path), budget=100)
+    assert cache.entry('http://host/big.mp3', 101, None) is None
+    old = cache.entry('http://host/a.mp3', 50, '"1"')
+    cache.write(old, 0, b'x' * 50)
+    new = cache.entry('http://host/a.mp3', 50, '"2"')
+    assert new.key != old.key
+    assert list(cache.entries) == [new.key]
+    assert cache.read(new, 0, 50) == b''
+
+
+def test_index_survives_a_restart(tmp_path):
+    cache = AudioCache(str(tmp_path), budget=1000)
+    entry = cache.entry('http://host/a.mp3', 10, None)
+    cache.write(entry, 0, b'0123456789')
+    cache.close()
+    reloaded = AudioCache(str(tmp_path), budget=1000)
+    entry = reloaded.entry('http://host/a.mp3', 10, None)
+    assert entry.complete
+    assert reloaded.read(entry, 2, 3) == b'234'
+    reloaded.set_budget(5)
+    assert reloaded.total_bytes() == 0
+    reloaded.clear()
+    assert os.listdir(tmp_path) == ['index.json']
@@ -0,0 +1,59 @@
+import socket
+
+import pytest
+
+from control import ControlServer, InstanceLock, send_command
+
+
+@pytest.fixture
+def control_server():
+    calls: 'list[tuple[str, list[str]]]' = []
+
+    def handler(command: str, args: 'list[str]') -> dict:
+        calls.append((command, args))
+        if command == 'fail':
+            raise ValueError('no such stream')
+        return {'ok': True, 'command': command, 'args': args}
+
+    server = ControlServer(handler, port=0)
+    server.start()
+    server.calls = calls
+    yield server
+    server.close()
+
+
+def test_command_and_reply(control_server):
+    port: int = control_server.server_address[1]
+    assert send_command('PLAY /oakbluff now', port) == {'ok': True, 'command': 'play', 'args': ['/oakbluff', 'now']}
+    assert send_command('fail', port) == {'ok': False, 'error': 'no such stream'}
+
+
+def test_one_reply_per_line(control_server):
+    with socket.create_connection(('127.0.0.1', control_server.server_address[1]), timeout=3) as connection:
+        connection.sendall(b'status\n\nstop\n')
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile('rb') as f:
+            lines: 'list[bytes]' = f.readlines()
+    assert len(lines) == 2
+    assert [command for command, _ in control_server.calls] == ['status', 'stop']
+
+
+def test_nothing_listening():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port: int = s.getsockname()[1]
+    with pytest.raises(OSError):
+        send_command('status', port, timeout=1)
+
+
+def test_instance_lock(tmp_path):
+    path: str = str(tmp_path / 'instance.lock')
+    first = InstanceLock(path)
+    assert first.acquire(50001)
+    second = InstanceLock(path)
+    assert not second.acquire(50002)
+    assert second.port() == 50001
+    first.release()
+    assert second.acquire(50002)
+    assert InstanceLock(path).port() == 50002
+    second.release()
@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+
+from downloads import (CANCELLED, DONE, DOWNLOADING, FAILED, MIN_SEGMENT_BYTES,
+                       DownloadManager, TokenBucket)
+
+# Not periodic, so bytes written at the wrong offset show.
+BODY: bytes = os.urandom(3 * MIN_SEGMENT_BYTES)
+
+
+class StepSpawner:
+    '''
+    Collects what a DownloadManager spawns so a test can run it step by
+    step, in between closing or cancelling.
+    '''
+
+    def __init__(self) -> None:
+        self.pending: 'list' = []
+
+    def __call__(self, fn) -> None:
+        self.pending.append(fn)
+
+    def run_one(self) -> None:
+        self.pending.pop(0)()
+
+    def run_all(self) -> None:
+        while self.pending:
+            self.run_one()
+
+
+def make_manager(directory, spawn) -> DownloadManager:
+    return DownloadManager(str(directory), spawn, connections=3, timeout=5, retries=1)
+
+
+def test_downloads_in_segments(tmp_path, file_server):
+    file_server.files['/a.mp3'] = BODY
+    manager = make_manager(tmp_path, lambda fn: fn())
+    download = manager.submit(file_server.url('/a.mp3'), 'a.mp3')
+    assert download.status == DONE
+    assert len(download.segments) == 3
+    assert (tmp_path / 'a.mp3').read_bytes() == BODY
+    assert not os.path.exists(download.state_path)
+
+
+def test_downloads_file_of_unknown_size(tmp_path, file_server):
+    file_server.files['/a.mp3'] = BODY[:100000]
+    file_server.lengths = False
+    file_server.ranges = False
+    manager = make_manager(tmp_path, lambda fn: fn())
+    download = manager.submit(file_server.url('/a.mp3'), 'a.mp3')
+    assert download.status == DONE, download.error
+    assert download.size == 100000
+    assert (tmp_path / 'a.mp3').read_bytes() == BODY[:100000]
+
+
+def test_server_ignoring_range_gets_each_segment_right(tmp_path, file_server):
+    file_server.files['/a.mp3'] = BODY
+    file_server.ignore_range = True
+    manager = make_manager(tmp_path, lambda fn: fn())
+    download = manager.submit(file_server.url('/a.mp3'), 'a.mp3')
+    assert download.status == DONE, download.error
+    assert len(download.segments) == 3
+    assert (tmp_path / 'a.mp3').read_bytes() == BODY
+
+
+def test_close_keeps_resume_state(tmp_path, file_server):
+    file_server.files['/a.mp3'] = BODY
+    url: str = file_server.url('/a.mp3')
+    spawner = StepSpawner()
+    manager = make_manager(tmp_path, spawner)
+    download = manager.submit(url, 'a.mp3')
+    spawner.run_one()  # start: plans three segments
+    spawner.run_one()  # the first segment
+    manager.close()
+    spawner.run_all()
+    assert download.status == DOWNLOADING
+    with open(download.state_path, 'r', encoding='utf-8') as f:
+        segments = json.load(f)['segments']
+    assert segments[0][2] == segments[0][1] + 1
+    assert [segment[2] for segment in segments[1:]] == [segment[0] for segment in segments[1:]]
+
+    file_server.requests.clear()
+    manager = make_manager(tmp_path, lambda fn: fn())
+    manager.resume_pending(lambda file_name: url)
+    assert manager.get('a.mp3').status == DONE
+    assert (tmp_path / 'a.mp3').read_bytes() == BODY
+    ranges = [request[2] for request in file_server.requests if request[0] == 'GET']
+    # One small check of the first segment's tail, then the other two segments.
+    assert len(ranges) == 3
+    assert ranges[0].endswith(f'-{MIN_SEGMENT_BYTES - 1}')
+
+
+def test_cancel_deletes_partial_download(tmp_path, file_server):
+    file_server.files['/a.mp3'] = BODY
+    spawner = StepSpawner()
+    manager = make_manager(tmp_path, spawner)
+    download = manager.submit(file_server.url('/a.mp3'), 'a.mp3')
+    spawner.run_one()
+    spawner.run_one()
+    manager.cancel('a.mp3')
+    spawner.run_all()
+    assert download.status == CANCELLED
+    assert not os.path.exists(download.part_path)
+    assert not os.path.exists(download.state_path)
+
+    manager = make_manager(tmp_path, lambda fn: fn())
+    manager.resume_pending(lambda file_name: file_server.url('/a.mp3'))
+    assert manager.get('a.mp3') is None
+
+
+def test_resume_refetches_segment_whose_tail_was_lost(tmp_path, file_server):
+    file_server.files['/a.mp3'] = BODY
+    url: str = file_server.url('/a.mp3')
+    step: int = len(BODY) // 3
+    # A crash after the state was saved but before the bytes reached the disk.
+    with open(tmp_path / 'a.mp3.part', 'wb') as f:
+        f.truncate(len(BODY))
+    with open(tmp_path / 'a.mp3.part.json', 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'size': len(BODY), 'validator': None,
+                   'segments': [[0, step - 1, step], [step, 2 * step - 1, step], [2 * step, len(BODY) - 1, 2 * step]]}, f)
+    manager = make_manager(tmp_path, lambda fn: fn())
+    manager.resume_pending(lambda file_name: url)
+    assert manager.get('a.mp3').status == DONE
+    assert (tmp_path / 'a.mp3').read_bytes() == BODY
+
+
+def test_content_md5_mismatch_fails(tmp_path, file_server):
+    file_server.files['/a.mp3'] = BODY
+    file_server.headers['Content-MD5'] = 'AAAAAAAAAAAAAAAAAAAAAA=='
+    manager = make_manager(tmp_path, lambda fn: fn())
+    download = manager.submit(file_server.url('/a.mp3'), 'a.mp3')
+    assert download.status == FAILED
+    assert not os.path.exists(tmp_path / 'a.mp3')
+    assert not os.path.exists(download.part_path)
+
+
+def test_token_bucket_unlimited():
+    assert TokenBucket(0).consume(10 ** 9, threading.Event())
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(1000000)
+    started: float = time.monotonic()
+    for _ in range(3):
+        assert bucket.consume(100000, threading.Event())
+    assert time.monotonic() - started >= 0.25
+
+
+def test_token_bucket_stops_when_cancelled():
+    cancelled = threading.Event()
+    cancelled.set()
+    assert not TokenBucket(10).consume(100, cancelled)
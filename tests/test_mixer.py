@@ -0,0 +1,38 @@
+from array import array
+
+from mixer import MixChannel, mix
+
+
+def block(*samples: int) -> array:
+    return array('h', samples)
+
+
+def test_unity_channel_passes_through():
+    assert list(mix([(block(100, -100, 200, -200), MixChannel())], 2, 2)) == [100, -100, 200, -200]
+
+
+def test_blocks_are_summed_and_clipped():
+    out = mix([(block(30000, -30000), MixChannel()), (block(10000, -10000), MixChannel())], 1, 2)
+    assert list(out) == [32767, -32768]
+
+
+def test_short_and_muted_blocks():
+    out = mix([(block(100, 100), MixChannel()), (block(500, 500, 500, 500), MixChannel(muted=True))], 2, 2)
+    assert list(out) == [100, 100, 0, 0]
+    assert list(mix([(block(), MixChannel())], 2, 2)) == [0, 0, 0, 0]
+
+
+def test_volume_and_pan():
+    assert list(mix([(block(1000, 1000), MixChannel(volume=0.5))], 1, 2)) == [500, 500]
+    assert list(mix([(block(1000, 1000), MixChannel(pan=1))], 1, 2)) == [0, 1000]
+    assert list(mix([(block(1000, 1000), MixChannel(pan=-0.5))], 1, 2)) == [1000, 500]
+
+
+def test_channel_settings_are_clamped_and_gains_recomputed():
+    channel = MixChannel()
+    assert list(channel.channel_gains(2)) == [1, 1]
+    channel.update(volume=5, pan=-3)
+    assert (channel.volume, channel.pan) == (2, -1)
+    assert list(channel.channel_gains(2)) == [2, 0]
+    assert list(channel.channel_gains(1)) == [2]
+    assert not channel.unity
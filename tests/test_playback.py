@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+
+import pytest
+
+miniaudio = pytest.importorskip('miniaudio')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from playback import BALANCED, PLAYING, PlaybackEngine  # noqa: E402
+from standin_server import StandInServer  # noqa: E402
+
+
+def wait_for(engine: PlaybackEngine, predicate, timeout: float) -> bool:
+    deadline: float = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate(engine.stats()):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_live_stream_reconnects_after_server_drops_it():
+    server = StandInServer(drop_every=2).start()
+    engine = PlaybackEngine(BALANCED, backends=[miniaudio.Backend.NULL])
+    try:
+        engine.play(f'{server.url}/colony0')
+        assert wait_for(engine, lambda stats: stats['state'] == PLAYING, 10)
+        assert wait_for(engine, lambda stats: stats['reconnects'] >= 1, 15)
+        assert wait_for(engine, lambda stats: stats['state'] == PLAYING, 10)
+    finally:
+        engine.shutdown()
+        server.close()
@@ -0,0 +1,87 @@
+import json
+import time
+
+from poller import ICECAST_RETRY_SECONDS, StatusPoller
+from status import NO_STREAMS_TEXT
+
+PAGE: str = ("<html><body><div class='stream'><button data-mnt='/colony' data-stream='Sunday service'>Listen</button></div>"
+             '<p>Current Number of Listeners: 4</p></body></html>')
+ICECAST: dict = {'icestats': {'source': {
+    'listenurl': 'http://hbniaudio.hbni.net:8000/colony',
+    'server_description': 'Sunday service',
+    'listeners': 4,
+    'bitrate': 64,
+    'server_type': 'audio/mpeg',
+}}}
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_poller(file_server, clock=time.monotonic) -> StatusPoller:
+    return StatusPoller(2, file_server.url('/status-json.xsl'), file_server.url('/'), clock)
+
+
+def icecast_requests(file_server) -> int:
+    return sum(path == '/status-json.xsl' for _, path, _ in file_server.requests)
+
+
+def test_unchanged_status_polls_as_none(file_server):
+    file_server.files['/status-json.xsl'] = json.dumps(ICECAST).encode('utf-8')
+    file_server.headers['ETag'] = '"1"'
+    poller = make_poller(file_server)
+    snapshot = poller.poll()
+    assert [stream.mount for stream in snapshot.streams] == ['/colony']
+    assert snapshot.streams[0].details == '64 kbps MP3 - 4 listeners'
+    assert poller.source is poller.icecast
+    assert poller.poll() is None
+    poller.reset()
+    assert poller.poll() == snapshot
+
+
+def test_falls_back_to_the_page_and_backs_off_icecast(file_server):
+    file_server.files['/'] = PAGE.encode('utf-8')
+    clock = Clock()
+    poller = make_poller(file_server, clock)
+    snapshot = poller.poll()
+    assert poller.source is poller.html
+    assert [stream.mount for stream in snapshot.streams] == ['/colony']
+    assert snapshot.listeners == 4
+    assert icecast_requests(file_server) == 1
+
+    poller.poll()
+    assert icecast_requests(file_server) == 1
+
+    clock.now += ICECAST_RETRY_SECONDS + 1
+    poller.poll()
+    assert icecast_requests(file_server) == 2
+
+    # The second failure in a row waits twice as long.
+    clock.now += ICECAST_RETRY_SECONDS + 1
+    poller.poll()
+    assert icecast_requests(file_server) == 2
+
+    file_server.files['/status-json.xsl'] = json.dumps(ICECAST).encode('utf-8')
+    clock.now += ICECAST_RETRY_SECONDS
+    poller.poll()
+    assert icecast_requests(file_server) == 3
+    assert poller.source is poller.icecast
+
+
+def test_keeps_events_when_the_page_cannot_be_read(file_server):
+    file_server.files['/status-json.xsl'] = json.dumps({'icestats': {}}).encode('utf-8')
+    file_server.files['/'] = (f'<html><body><p>{NO_STREAMS_TEXT}</p><div class="event"><p class="date">Sunday 10:00</p>'
+                              'Morning service</div></body></html>').encode('utf-8')
+    poller = make_poller(file_server)
+    snapshot = poller.poll()
+    assert not snapshot.online
+    assert len(snapshot.events) == 1
+
+    file_server.files['/'] = b'\xff\xfe not utf-8'
+    assert poller.poll() is None
+    assert poller.snapshot.events == snapshot.events
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from scheduler import DUE, FAST, IDLE, LIVE, OFFLINE, SCHEDULED, PollScheduler
+from status import StatusSnapshot, StreamInfo, event_start, parse_event_time
+
+NOW: datetime = datetime(2022, 2, 20, 9, 0)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now: float = 1000
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def event(date: str) -> str:
+    return f'<div class="event"><h3>Service</h3><p class="date">{date}</p></div>'
+
+
+def make_scheduler(clock: Clock) -> PollScheduler:
+    return PollScheduler(fast=5, live=15, scheduled=30, idle=60, jitter=0, clock=clock)
+
+
+def test_parse_event_time():
+    assert parse_event_time('2022-02-20 10:00') == datetime(2022, 2, 20, 10, 0)
+    assert parse_event_time('Sunday, February 20 at 10:00 a.m.', NOW) == datetime(2022, 2, 20, 10, 0)
+    assert parse_event_time('<b>Feb 20</b> 7 pm', NOW) == datetime(2022, 2, 20, 19, 0)
+    assert parse_event_time('Dec 31 10:00', NOW) == datetime(2021, 12, 31, 10, 0)
+    assert parse_event_time('Sometime soon', NOW) is None
+    assert event_start(event('02/20/2022 10:00 AM')) == datetime(2022, 2, 20, 10, 0)
+    assert event_start('<div class="event">no date</div>') is None
+
+
+def test_intervals_follow_the_status():
+    clock = Clock()
+    scheduler = make_scheduler(clock)
+    assert scheduler.interval(NOW) == 5 and scheduler.state == FAST
+
+    scheduler.polled(StatusSnapshot([], [], 0, False))
+    assert scheduler.interval(NOW) == 60 and scheduler.state == IDLE
+
+    # Wakes up for the event's lead time, ten minutes before it starts.
+    scheduler.polled(StatusSnapshot([], [event('2022-02-20 09:10')], 0, False))
+    assert scheduler.interval(NOW - timedelta(seconds=20)) == 20 and scheduler.state == IDLE
+    assert scheduler.interval(NOW + timedelta(minutes=25)) == 5 and scheduler.state == DUE
+    assert scheduler.interval(NOW + timedelta(minutes=41)) == 60 and scheduler.state == IDLE
+
+    scheduler.polled(StatusSnapshot([], [event('whenever')], 0, False))
+    assert scheduler.interval(NOW) == 30 and scheduler.state == SCHEDULED
+
+    scheduler.polled(StatusSnapshot([StreamInfo('/oakbluff', '')], [], 1, True))
+    assert scheduler.interval(NOW) == 5 and scheduler.state == FAST
+    clock.now += 121
+    assert scheduler.interval(NOW) == 15 and scheduler.state == LIVE
+    scheduler.polled(None)
+    assert scheduler.interval(NOW) == 15
+
+
+def test_failures_back_off():
+    scheduler = make_scheduler(Clock())
+    intervals: 'list[float]' = []
+    for _ in range(8):
+        scheduler.failed()
+        intervals.append(scheduler.interval(NOW))
+    assert intervals == [10, 20, 40, 80, 160, 300, 300, 300]
+    assert scheduler.state == OFFLINE
+    scheduler.polled(None)
+    assert scheduler.interval(NOW) == 5
+
+
+def test_hidden_window_polls_less_unless_auto_start_is_due():
+    scheduler = make_scheduler(Clock())
+    scheduler.polled(StatusSnapshot([], [], 0, False))
+    assert scheduler.next_interval(hidden=True, now=NOW) == 240
+    assert scheduler.next_interval(hidden=True, auto_start=True, now=NOW) == 60
+    scheduler.polled(StatusSnapshot([], [event('2022-02-20 09:05')], 0, False))
+    assert scheduler.next_interval(hidden=True, auto_start=True, now=NOW) == 5
@@ -0,0 +1,69 @@
+from status import (StatusSnapshot, StreamInfo, find_events,
+                    parse_icecast_status, parse_status_page)
+
+EVENT: str = '<div class="event"><h3>Service</h3><div class="where"><p>Oak Bluff</p></div><p class="date">2022-02-20 10:00</p></div>'
+ONLINE_PAGE: str = (
+    "<html><body>"
+    "<div class='stream'><button data-mnt='/oakbluff' data-stream='Sunday service'>Listen</button></div>"
+    "<div class='stream'><button data-mnt=\"/riverside\" data-stream=\"Choir 'practice'\">Listen</button></div>"
+    f"<div class='events'>{EVENT}</div>"
+    "<p>Current Number of Listeners: 12</p></body></html>"
+)
+OFFLINE_PAGE: str = (
+    "<html><body><p>No streams currently online.</p>"
+    "<div class='events'><div class=\"event\"><p>No upcoming events</p></div></div>"
+    "<p>Current Number of Listeners: </p></body></html>"
+)
+
+
+def test_parse_online_page():
+    snapshot: StatusSnapshot = parse_status_page(ONLINE_PAGE)
+    assert snapshot.online
+    assert [(stream.mount, stream.description) for stream in snapshot.streams] == [
+        ('/oakbluff', 'Sunday service'), ('/riverside', "Choir 'practice'")]
+    assert snapshot.streams[0].title == 'Oakbluff'
+    assert snapshot.streams[0].url.endswith(':8000/oakbluff')
+    assert snapshot.events == [EVENT]
+    assert snapshot.listeners == 12
+    assert snapshot.listeners_text == 'Current Number of Listeners: 12'
+
+
+def test_parse_offline_page():
+    snapshot: StatusSnapshot = parse_status_page(OFFLINE_PAGE)
+    assert not snapshot.online
+    assert snapshot.streams == []
+    assert snapshot.events == []
+    assert snapshot.listeners == 0
+
+
+def test_snapshots_compare_by_value():
+    assert parse_status_page(ONLINE_PAGE) == parse_status_page(ONLINE_PAGE)
+    assert parse_status_page(ONLINE_PAGE) != parse_status_page(OFFLINE_PAGE)
+
+
+def test_find_events_keeps_nested_divs():
+    assert find_events(f'<div>{EVENT}{EVENT}</div>') == [EVENT, EVENT]
+    assert find_events('<div class="event"><div>unclosed') == []
+
+
+def test_parse_icecast_status():
+    snapshot = parse_icecast_status({'icestats': {'source': [
+        {'listenurl': 'http://hbniaudio.hbni.net:8000/oakbluff', 'server_name': 'Sunday service',
+         'listeners': 3, 'audio_bitrate': 64000, 'server_type': 'audio/mpeg',
+         'stream_start_iso8601': '2022-02-20T10:02:00-0600'},
+        {'listenurl': 'http://hbniaudio.hbni.net:8000/riverside', 'listeners': 1, 'server_type': 'audio/x-custom'},
+        {'title': 'no mount'},
+    ]}})
+    assert snapshot.online
+    assert snapshot.listeners == 4
+    assert snapshot.events == []
+    oakbluff, riverside = snapshot.streams
+    assert oakbluff.details == '64 kbps MP3 - 3 listeners - live since 10:02'
+    assert riverside.codec == 'audio/x-custom'
+    assert riverside.details == 'audio/x-custom - 1 listener'
+
+
+def test_parse_icecast_status_single_and_no_source():
+    single = parse_icecast_status({'icestats': {'source': {'listenurl': 'http://host:8000/oakbluff'}}})
+    assert single.streams == [StreamInfo('/oakbluff', '')]
+    assert not parse_icecast_status({'icestats': {}}).online